@@ -0,0 +1,105 @@
+"""
+Chunked Text
+
+Append-only text kept as a list of chunks with a cumulative offset index, used for the text buffer and for the
+unified stream in place of one string grown with +=.
+
+Appending a chunk stores a reference to it (the file texts are shared with the content cache, not copied), so
+building a stream of n files is linear instead of quadratic. A slice is assembled from the chunks it overlaps,
+found by a binary search of the offsets, in O(log n + slice size). ChunkedText supports the len(), slicing and
+rfind() that TextPartition uses, so the partition engine runs on it unchanged. The text is only joined into a
+single string when it is printed or copied as a whole.
+"""
+
+from array import array
+from bisect import bisect_right
+from itertools import count
+from typing import List, Iterable, Union
+
+chunkedTextIds = count(1)
+
+class ChunkedText:
+    """
+    A text made of chunks.
+
+    Args:
+        chunks (Iterable[str]): The initial chunks.
+    """
+
+    def __init__(self, chunks: Iterable[str] = ()):
+        self.chunks: List[str] = []
+        self.offsets = array('q', [0]) # Start offset of each chunk, followed by the total length
+        self.text_id = next(chunkedTextIds) # Unique per instance, the text only grows: (text_id, len) identifies it
+        for chunk in chunks:
+            self.append(chunk)
+        #end
+    #end
+
+    def append(self, text: Union[str, "ChunkedText"]) -> None:
+        if isinstance(text, ChunkedText):
+            for chunk in text.chunks:
+                self.append(chunk)
+            #end
+            return
+        #end
+        if text:
+            self.chunks.append(text)
+            self.offsets.append(self.offsets[-1] + len(text))
+        #end
+    #end
+
+    def __len__(self) -> int:
+        return self.offsets[-1]
+    #end
+
+    def __str__(self) -> str:
+        return "".join(self.chunks)
+    #end
+
+    def __getitem__(self, key: slice) -> str:
+        """Assemble text[start:stop] from the chunks it overlaps (slices without a step only)."""
+        start, stop, _ = key.indices(len(self))
+        if start >= stop:
+            return ""
+        #end
+        offsets = self.offsets
+        first = bisect_right(offsets, start) - 1
+        last = bisect_right(offsets, stop - 1) - 1
+        if first == last:
+            return self.chunks[first][start - offsets[first]:stop - offsets[first]]
+        #end
+        pieces = [self.chunks[first][start - offsets[first]:]]
+        pieces.extend(self.chunks[first + 1:last])
+        pieces.append(self.chunks[last][:stop - offsets[last]])
+        return "".join(pieces)
+    #end
+
+    def rfind(self, sub: str, start: int = 0, end: int = None) -> int:
+        """
+        This function finds the last occurrence of a character within text[start:end], as str.rfind does.
+
+        Args:
+            sub (str): A single character (e.g. '\\n').
+            start (int): The start of the range.
+            end (int): The end of the range, the end of the text if None.
+
+        Returns:
+            int: The offset of the character in the text, or -1 if it is not in the range.
+        """
+        end = len(self) if end is None else min(end, len(self))
+        if start >= end:
+            return -1
+        #end
+        offsets = self.offsets
+        index = bisect_right(offsets, end - 1) - 1
+        while index >= 0 and offsets[index + 1] > start:
+            base = offsets[index]
+            position = self.chunks[index].rfind(sub, max(start - base, 0), end - base)
+            if position >= 0:
+                return base + position
+            #end
+            index -= 1
+        #end
+        return -1
+    #end
+#end
@@ -0,0 +1,149 @@
+"""
+Clipboard Writer
+
+Background writer that copies the text buffer to the clipboard without blocking the control loop.
+
+Every key press submits the buffer, the copy itself (joining the chunks and the clipboard call, which takes a while
+for a multi-MB buffer) runs on a daemon worker thread. Only the latest submitted text is written: a text submitted
+while another one is waiting replaces it, so fast key repeats never queue copies. A text equal to the last one
+written (e.g. after a key that only toggles the legend) is not written again.
+The clipboard itself is a backend: the system clipboard (pyperclip), or an in-memory or file stand-in for the tests
+and the headless machines.
+"""
+
+import os
+import threading
+from typing import Optional, Union
+
+class PyperclipClipboard:
+    """The system clipboard."""
+
+    def copy(self, text: str) -> None:
+        import pyperclip # Only needed with this backend
+        pyperclip.copy(text)
+    #end
+#end
+
+class MemoryClipboard:
+    """A clipboard kept in memory, the text and the number of writes can be checked."""
+
+    def __init__(self):
+        self.text = ""
+        self.writeCount = 0
+    #end
+
+    def copy(self, text: str) -> None:
+        self.text = text
+        self.writeCount += 1
+    #end
+#end
+
+class FileClipboard:
+    """
+    A clipboard kept in a file, replaced as a whole on every write.
+
+    Args:
+        path (str): The file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+    #end
+
+    def copy(self, text: str) -> None:
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, 'w', encoding='utf-8', newline='') as file:
+            file.write(text)
+        #end
+        os.replace(temporary_path, self.path)
+    #end
+#end
+
+class ClipboardWriter:
+    """
+    A single daemon worker thread writing the latest submitted text to a clipboard backend.
+
+    Args:
+        backend: An object with a copy(text) method (PyperclipClipboard, MemoryClipboard, FileClipboard).
+    """
+
+    def __init__(self, backend: Union[PyperclipClipboard, MemoryClipboard, FileClipboard]):
+        self.backend = backend
+        self.condition = threading.Condition()
+        self.pending = None # The text waiting to be written, str() is taken on the worker (e.g. of a ChunkedText)
+        self.busy = False
+        self.last_text: Optional[str] = None # The text written last
+        self.last_error: Optional[Exception] = None
+        self.thread = None
+        self.writtenCount = 0
+        self.coalescedCount = 0
+        self.unchangedCount = 0
+    #end
+
+    def submit(self, text: object) -> None:
+        """Write the text (a str, or an object whose str() is the text, not changed afterwards) in the background."""
+        with self.condition:
+            if self.pending is not None:
+                self.coalescedCount += 1
+            #end
+            self.pending = text
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="ClipboardWriter", daemon=True)
+                self.thread.start()
+            #end
+            self.condition.notify_all()
+        #end
+    #end
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until the submitted text is written, returns False on timeout."""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.pending is None and not self.busy, timeout)
+        #end
+    #end
+
+    def pop_error(self) -> Optional[Exception]:
+        """The error of the last failed write, if any, reported once."""
+        with self.condition:
+            error, self.last_error = self.last_error, None
+            return error
+        #end
+    #end
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                #end
+                text, self.pending = self.pending, None
+                self.busy = True
+            #end
+
+            error = None
+            try:
+                text = str(text)
+                if text == self.last_text:
+                    self.unchangedCount += 1
+                else:
+                    self.backend.copy(text)
+                    self.last_text = text
+                    self.writtenCount += 1
+                #end
+            except Exception as e:
+                error = e
+            #end
+
+            with self.condition:
+                self.last_error = error or self.last_error
+                self.busy = False
+                self.condition.notify_all()
+            #end
+        #end
+    #end
+
+    def get_stats_str(self) -> str:
+        return (f"Clipboard: {self.writtenCount} written, {self.unchangedCount} unchanged, "
+                f"{self.coalescedCount} coalesced ({type(self.backend).__name__})")
+    #end
+#end
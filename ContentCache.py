@@ -0,0 +1,350 @@
+"""
+Content Cache
+
+Bounded LRU cache of decoded file content and computed partitions, shared by the file view and the prefetcher.
+
+Entries are stored with a validator (the size and mtime of the file they were computed from) and are dropped when
+the file no longer matches it. The cache is bounded by a memory budget in bytes: the least recently used entries
+are evicted until the estimated size of the entries fits. Hit/miss statistics are kept for the legend.
+"""
+
+import os
+import sys
+import threading
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Hashable, Tuple, Callable, Iterable, Iterator, Optional
+
+from PartIndex import FilePartIndex
+from TextPartition import fit_parts
+from TextDecoding import read_decoded_text, detect_file_encoding
+
+contentCacheBudget = 64 << 20 # Default memory budget in bytes
+readWorkersLimit = min(32, (os.cpu_count() or 1) + 4) # Threads reading files in parallel (I/O bound)
+readInFlightBytes = 64 << 20 # Bytes of files being read at once by the parallel reads
+readBatchSize = 64 # Files read per task by the parallel reads
+
+def estimate_size(value: Any) -> int:
+    """A rough estimate of the memory held by a cached value."""
+    if isinstance(value, array):
+        return sys.getsizeof(value)
+    #end
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    #end
+    if isinstance(value, FilePartIndex):
+        return sys.getsizeof(value.line_bytes) + (sys.getsizeof(value.line_chars) if value.line_chars else 0)
+    #end
+    return sys.getsizeof(value)
+#end
+
+def get_file_validator(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+#end
+
+class ContentCache:
+    """
+    LRU cache with a memory budget, safe to use from several threads.
+
+    Args:
+        max_bytes (int): The memory budget in bytes.
+        name (str): The name shown in the statistics.
+    """
+
+    def __init__(self, max_bytes: int = contentCacheBudget, name: str = "Content Cache"):
+        self.max_bytes = max_bytes
+        self.name = name
+        self.entries: "OrderedDict[Hashable, Tuple[Hashable, Any, int]]" = OrderedDict() # key -> (validator, value, size)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+    #end
+
+    def get(self, key: Hashable, validator: Hashable, count: bool = True) -> Any:
+        """Return the cached value, or None if it is not cached or was computed from a different version."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == validator:
+                self.entries.move_to_end(key)
+                self.hits += count
+                return entry[1]
+            #end
+            if entry is not None: # Stale
+                self.drop(key)
+            #end
+            self.misses += count
+            return None
+        #end
+    #end
+
+    def put(self, key: Hashable, validator: Hashable, value: Any, size: int = None) -> Any:
+        size = estimate_size(value) if size is None else size
+        with self.lock:
+            if key in self.entries:
+                self.drop(key)
+            #end
+            if size > self.max_bytes:
+                return value # Larger than the whole budget, not cached
+            #end
+            self.entries[key] = (validator, value, size)
+            self.current_bytes += size
+            self.evict()
+        #end
+        return value
+    #end
+
+    def evict(self) -> None:
+        """Drop the least recently used entries until the cache fits its budget (the lock is held)."""
+        while self.current_bytes > self.max_bytes and self.entries:
+            self.drop(next(iter(self.entries)))
+            self.evictions += 1
+        #end
+    #end
+
+    def drop(self, key: Hashable) -> None:
+        """Remove an entry (the lock is held)."""
+        self.current_bytes -= self.entries.pop(key)[2]
+    #end
+
+    def clear(self) -> None:
+        with self.lock:
+            for key in list(self.entries):
+                self.drop(key)
+            #end
+        #end
+    #end
+
+    def get_stats_str(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = 100 * self.hits / lookups if lookups else 0
+        return (f"{self.name}: {self.hits} hits / {self.misses} misses ({hit_rate:.0f}%), "
+                f"{len(self.entries)} entries, {self.current_bytes / 2**20:.1f} of {self.max_bytes / 2**20:.0f} MB")
+    #end
+#end
+
+class SharedPartsCache(ContentCache):
+    """
+    A ContentCache of values that share large parts with each other (the unified streams share the file bodies).
+    A value is put with its own size and the shared parts it holds, and a shared part counts in the budget once,
+    as long as a cached value or the pinned parts (see pin) hold it. The parts are given as {id(part): size}.
+    The value put last (the stream of the current state) is always kept, even over the budget: only the other
+    values are evicted.
+
+    Args:
+        max_bytes (int): The memory budget in bytes, shared parts included.
+        name (str): The name shown in the statistics.
+    """
+
+    def __init__(self, max_bytes: int = contentCacheBudget, name: str = "Content Cache"):
+        super().__init__(max_bytes, name)
+        self.shared_parts: Dict[Hashable, Dict[int, int]] = {} # key -> the parts its value holds
+        self.part_holders: Dict[int, int] = {} # id(part) -> number of values (and pins) holding it
+        self.pinned_parts: Dict[int, int] = {}
+        self.current_key: Optional[Hashable] = None # The key put last, never evicted
+    #end
+
+    def hold(self, parts: Dict[int, int]) -> None:
+        for part_id, size in parts.items():
+            count = self.part_holders.get(part_id, 0)
+            if not count:
+                self.current_bytes += size
+            #end
+            self.part_holders[part_id] = count + 1
+        #end
+    #end
+
+    def release(self, parts: Dict[int, int]) -> None:
+        for part_id, size in parts.items():
+            count = self.part_holders.pop(part_id) - 1
+            if count:
+                self.part_holders[part_id] = count
+            else:
+                self.current_bytes -= size
+            #end
+        #end
+    #end
+
+    def put_shared(self, key: Hashable, validator: Hashable, value: Any, size: int, parts: Dict[int, int]) -> Any:
+        """
+        This function caches a value that holds shared parts.
+
+        Args:
+            key (Hashable): The key.
+            validator (Hashable): The version of the value.
+            value (Any): The value.
+            size (int): The memory held by the value itself, besides the shared parts.
+            parts (Dict[int, int]): The size of each shared part the value holds, by id.
+
+        Returns:
+            Any: The value, kept until another value is put even if it is larger than the whole budget.
+        """
+        with self.lock:
+            if key in self.entries:
+                self.drop(key)
+            #end
+            self.entries[key] = (validator, value, size)
+            self.current_key = key
+            self.shared_parts[key] = parts
+            self.current_bytes += size
+            self.hold(parts)
+            self.evict()
+        #end
+        return value
+    #end
+
+    def pin(self, parts: Dict[int, int]) -> bool:
+        """
+        This function replaces the pinned parts, the parts held outside of the cached values (e.g. the bodies kept
+        for the next rebuild of a stream). The values are evicted until the pinned parts fit the budget.
+
+        Args:
+            parts (Dict[int, int]): The size of each part, by id.
+
+        Returns:
+            bool: False if the parts are larger than the whole budget, nothing is pinned then.
+        """
+        fits = sum(parts.values()) <= self.max_bytes
+        parts = parts if fits else {}
+        with self.lock:
+            self.hold(parts)
+            self.release(self.pinned_parts)
+            self.pinned_parts = parts
+            self.evict()
+        #end
+        return fits
+    #end
+
+    def evict(self) -> None:
+        """Drop the least recently used entries but the current one until the cache fits its budget (the lock is held)."""
+        for key in list(self.entries):
+            if self.current_bytes <= self.max_bytes:
+                break
+            #end
+            if key != self.current_key:
+                self.drop(key)
+                self.evictions += 1
+            #end
+        #end
+    #end
+
+    def drop(self, key: Hashable) -> None:
+        super().drop(key)
+        self.release(self.shared_parts.pop(key, {}))
+    #end
+#end
+
+class FileContentReader:
+    """
+    Reads decoded file content, part indexes, part boundaries and part texts through a ContentCache.
+    Every access stats the file once, so a cached entry is never served for a file that changed.
+
+    Args:
+        cache (ContentCache): The cache to read through.
+        count_stats (bool): Count the lookups in the hit/miss statistics (not for the prefetcher).
+    """
+
+    def __init__(self, cache: ContentCache, count_stats: bool = True):
+        self.cache = cache
+        self.count_stats = count_stats
+    #end
+
+    def read_text(self, path: str, encoding: str = 'utf-8') -> Tuple[str, str]:
+        """Read a whole text file, returns the text and the encoding it decoded with (the fallback if it did not decode)."""
+        validator = get_file_validator(path)
+        entry = self.cache.get(('text', path, encoding), validator, self.count_stats)
+        if entry is None:
+            entry = self.cache.put(('text', path, encoding), validator, read_decoded_text(path, encoding))
+        #end
+        return entry
+    #end
+
+    def read_file(self, path: str, encoding: Optional[str]) -> Tuple[str, Optional[str], Optional[Exception]]:
+        """Read a text file, detecting its encoding if None, returns (encoding, text, None) or (encoding, None, error)."""
+        try:
+            encoding = encoding or detect_file_encoding(path)
+            text, encoding = self.read_text(path, encoding)
+            return encoding, text, None
+        except Exception as e:
+            return encoding, None, e
+        #end
+    #end
+
+    def read_texts(self, jobs: Iterable[Tuple[str, Optional[str], int]], max_workers: int = readWorkersLimit,
+                   max_in_flight_bytes: int = readInFlightBytes) -> Iterator[Tuple[str, Optional[str], Optional[Exception]]]:
+        """
+        This function reads text files on a thread pool, for the storage where the round trips dominate (NFS, SMB).
+        The files are read in batches (of readBatchSize files at most), so that small files do not cost a task each.
+
+        Args:
+            jobs (Iterable[Tuple[str, Optional[str], int]]): The (path, encoding or None to detect it, size) of the files.
+            max_workers (int): The number of reading threads.
+            max_in_flight_bytes (int): Batches are submitted while the files read and not consumed yet fit in this
+                many bytes (a larger file is read on its own).
+
+        Returns:
+            Iterator[Tuple[str, Optional[str], Optional[Exception]]]: The result of read_file for each job, in the
+                order of the jobs. An error is returned in place of its file, the other files are still read.
+        """
+        jobs = iter(jobs)
+        next_job = next(jobs, None)
+        read_batch = lambda batch: [self.read_file(path, encoding) for path, encoding, _ in batch]
+        pending = deque() # (future, batch size in bytes) in job order
+        in_flight = 0
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            while True:
+                while next_job is not None and (not pending or in_flight + next_job[2] <= max_in_flight_bytes):
+                    batch = []
+                    batch_size = 0
+                    while next_job is not None and len(batch) < readBatchSize and (not batch or
+                            in_flight + batch_size + next_job[2] <= max_in_flight_bytes):
+                        batch.append(next_job)
+                        batch_size += next_job[2]
+                        next_job = next(jobs, None)
+                    #end
+                    pending.append((executor.submit(read_batch, batch), batch_size))
+                    in_flight += batch_size
+                #end
+                if not pending:
+                    return
+                #end
+                future, batch_size = pending.popleft()
+                results = future.result()
+                in_flight -= batch_size
+                yield from results
+            #end
+        #end
+    #end
+
+    def get_index(self, path: str, encoding: str = 'utf-8') -> FilePartIndex:
+        stat = os.stat(path)
+        validator = (stat.st_size, stat.st_mtime_ns)
+        index = self.cache.get(('index', path, encoding), validator, self.count_stats)
+        if index is None:
+            index = self.cache.put(('index', path, encoding), validator, FilePartIndex(path, stat, encoding))
+        #end
+        return index
+    #end
+
+    def get_part_starts(self, index: FilePartIndex, key: Hashable, absolute_limit: int, overhead: Callable[[int], int]) -> array:
+        validator = (index.size, index.mtime_ns)
+        starts = self.cache.get(('parts', index.path, index.encoding, key), validator, self.count_stats)
+        if starts is None:
+            _, starts = fit_parts(index.total_chars, absolute_limit, overhead, index.part_starts)
+            self.cache.put(('parts', index.path, index.encoding, key), validator, starts)
+        #end
+        return starts
+    #end
+
+    def read_part(self, index: FilePartIndex, starts: array, key: Hashable, part_n: int) -> str:
+        validator = (index.size, index.mtime_ns)
+        text = self.cache.get(('part', index.path, index.encoding, key, part_n), validator, self.count_stats)
+        if text is None:
+            text = self.cache.put(('part', index.path, index.encoding, key, part_n), validator, index.read_part(starts, part_n))
+        #end
+        return text
+    #end
+#end
@@ -0,0 +1,215 @@
+"""
+Directory Tree
+
+Persistent tree model behind the Tree directory view.
+
+The tree is built once per (path display, Binary switch) combination and then kept in sync with the file record
+store: watcher deltas are applied through the store listeners, and a rescan is diffed against the files already
+in the tree, so only the added and removed paths touch it. The rendered lines are cached until the tree changes,
+and rendering walks the tree with an explicit stack, so very deep trees do not hit the recursion limit.
+"""
+
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import List, Dict, Tuple, Iterator, Optional
+
+from FileRecordStore import FileRecordStore
+
+class TreeNode:
+    """A path component. The children are ordered by (root index, name), matching the scan order."""
+    __slots__ = ("key", "children", "keys", "count", "size")
+
+    def __init__(self, key: Tuple[int, str]):
+        self.key = key
+        self.children: Optional[Dict[str, "TreeNode"]] = None # Created on the first child, files have none
+        self.keys: Optional[List[Tuple[int, str]]] = None
+        self.count = 0 # The number of files at or below this node
+        self.size = 1 # The number of nodes (rendered lines) in the subtree, including this node
+    #end
+#end
+
+class DirectoryTree:
+    """
+    The tree of the displayed paths of one view of the store.
+
+    Args:
+        absolute (bool): Show the absolute paths (AbsolutePath switch), otherwise the relative paths.
+        include_binary (bool): Include the binary files (Binary switch).
+    """
+
+    def __init__(self, absolute: bool, include_binary: bool):
+        self.absolute = absolute
+        self.include_binary = include_binary
+        self.root = TreeNode((0, ""))
+        self.store: FileRecordStore = None
+        self.lines: Optional[List[str]] = None # The rendered lines, None when the tree changed
+    #end
+
+    # --- Synchronisation with the store ---
+    def iter_paths(self, store: FileRecordStore) -> Iterator[Tuple[str, int]]:
+        root_column = store.root_column
+        for slot in store.view(self.include_binary):
+            yield store.display_path(slot, self.absolute), root_column[slot]
+        #end
+    #end
+
+    def attach(self, store: FileRecordStore) -> None:
+        """
+        This function syncs the tree with a store (the same one, or the result of a rescan).
+
+        Args:
+            store (FileRecordStore): The file record store to follow.
+        """
+        if store is self.store:
+            return
+        #end
+
+        if self.store is None:
+            for path, root_index in self.iter_paths(store):
+                self.insert(path, root_index)
+            #end
+        else:
+            self.store.listeners.remove(self.on_store_change)
+            old_paths = Counter(self.iter_paths(self.store))
+            new_paths = Counter(self.iter_paths(store))
+            for (path, root_index), count in (old_paths - new_paths).items():
+                for _ in range(count):
+                    self.remove(path)
+                #end
+            #end
+            for (path, root_index), count in (new_paths - old_paths).items():
+                for _ in range(count):
+                    self.insert(path, root_index)
+                #end
+            #end
+        #end
+
+        self.store = store
+        store.listeners.append(self.on_store_change)
+    #end
+
+    def on_store_change(self, slot: int, added: bool) -> None:
+        store = self.store
+        if not self.include_binary and store.is_binary(slot):
+            return
+        #end
+        path = store.display_path(slot, self.absolute)
+        if added:
+            self.insert(path, store.root_column[slot])
+        else:
+            self.remove(path)
+        #end
+    #end
+
+    # --- Tree updates ---
+    def insert(self, path: str, root_index: int) -> None:
+        parts = path.split('/')
+        node = self.root
+        nodes = [node]
+        for depth, part in enumerate(parts):
+            if node.children is None:
+                node.children = {}
+                node.keys = []
+            #end
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = TreeNode((root_index, part))
+                child.size = len(parts) - depth # The new branch below it is created as well
+                insort(node.keys, child.key)
+            #end
+            node = child
+            nodes.append(node)
+        #end
+
+        created = next((len(parts) - depth for depth, node in enumerate(nodes[1:]) if node.count == 0), 0)
+        for node in nodes:
+            if node.count or node is self.root: # Existing ancestor of the new branch
+                node.size += created
+            #end
+            node.count += 1
+        #end
+        self.lines = None
+    #end
+
+    def remove(self, path: str) -> None:
+        node = self.root
+        nodes = [node]
+        for part in path.split('/'):
+            node = node.children.get(part) if node.children else None
+            if node is None:
+                return # Not in the tree
+            #end
+            nodes.append(node)
+        #end
+
+        pruned = 0
+        for parent, node in zip(reversed(nodes[:-1]), reversed(nodes)):
+            node.count -= 1
+            node.size -= pruned
+            if node.count == 0: # Prune the empty branch
+                del parent.children[node.key[1]]
+                del parent.keys[bisect_left(parent.keys, node.key)]
+                pruned += 1
+            #end
+        #end
+        self.root.count -= 1
+        self.root.size -= pruned
+        self.lines = None
+    #end
+
+    # --- Rendering ---
+    def __len__(self) -> int:
+        """The number of rendered lines."""
+        return self.root.size - 1
+    #end
+
+    def iter_lines(self, start: int = 0, stop: int = None) -> Iterator[str]:
+        """
+        This function renders the tree depth first, with an explicit stack instead of recursion.
+        The subtree sizes are used to skip straight to the first line, so a window costs its own lines only.
+
+        Args:
+            start (int): The first line to render.
+            stop (int): The line to stop at (excluded), None for the end of the tree.
+
+        Returns:
+            Iterator[str]: The rendered lines.
+        """
+        if not self.root.children:
+            return
+        #end
+        remaining = len(self) - start if stop is None else stop - start
+        skip = start
+        stack = [(self.root, iter(self.root.keys), "")]
+        while stack and remaining > 0:
+            parent, keys, prefix = stack[-1]
+            key = next(keys, None)
+            if key is None:
+                stack.pop()
+                continue
+            #end
+            node = parent.children[key[1]]
+            if skip >= node.size: # The whole subtree is above the window
+                skip -= node.size
+                continue
+            #end
+            if skip:
+                skip -= 1 # The window starts below this node
+            else:
+                yield f"{prefix}├── {key[1]}" if node.children else f"{prefix}└── {key[1]}"
+                remaining -= 1
+            #end
+            if node.children:
+                stack.append((node, iter(node.keys), prefix + "│   "))
+            #end
+        #end
+    #end
+
+    def render(self) -> List[str]:
+        """The rendered lines, cached until the tree changes."""
+        if self.lines is None:
+            self.lines = list(self.iter_lines())
+        #end
+        return self.lines
+    #end
+#end
@@ -0,0 +1,462 @@
+"""
+File Record Store
+
+Compact, columnar storage of the scanned files, used in place of a list of dicts.
+
+Every file takes a slot in a set of parallel columns: the name, the id of its (interned) directory, the root
+index, a type flag, the size, the mtime and the id of its encoding once it has been detected. Directory prefixes are stored once however many files they hold,
+and the numeric columns are plain arrays, so a large tree costs a few dozen bytes per file instead of a dict
+and three strings. The full paths are only joined when a record is actually rendered or read.
+
+Slots are stable for as long as the file is in the store, the scan order is kept as a separate array of slots,
+so inserting or removing a file moves 4 bytes per file after it and nothing else. Removed slots are reused.
+The store also maintains a text-only view next to the scan order, so the Binary switch, the file counts and
+the lookup of the selected file never filter the whole store.
+Records are accessed through lightweight FileRecord views, which still support the record['key'] access of
+the old dicts.
+"""
+
+import os
+import itertools
+from array import array
+from typing import List, Dict, Tuple, Iterator, Callable, Optional
+
+from FileScanner import ScanEntry, get_relative_base_length, get_root_prefixes, get_scan_order_key
+
+# Type flags
+TYPE_TEXT = 0
+TYPE_BINARY = 1
+TYPE_FREE = 2 # The slot is not in use
+fileTypeNames = ("txt", "bin", None)
+fileTypeFlags = {"txt": TYPE_TEXT, "bin": TYPE_BINARY}
+
+class FileRecord:
+    """A view of a single slot of the store, the values are read from the columns on access."""
+    __slots__ = ("store", "slot")
+
+    def __init__(self, store: "FileRecordStore", slot: int):
+        self.store = store
+        self.slot = slot
+    #end
+
+    @property
+    def absolute_path(self) -> str:
+        return self.store.absolute_path(self.slot)
+    #end
+
+    @property
+    def relative_path(self) -> str:
+        return self.store.relative_path(self.slot)
+    #end
+
+    @property
+    def name(self) -> str:
+        return self.store.names[self.slot]
+    #end
+
+    @property
+    def type(self) -> str:
+        return fileTypeNames[self.store.type_flags[self.slot]]
+    #end
+
+    @property
+    def is_binary(self) -> bool:
+        return self.store.type_flags[self.slot] == TYPE_BINARY
+    #end
+
+    @property
+    def root_index(self) -> int:
+        return self.store.root_column[self.slot]
+    #end
+
+    @property
+    def size(self) -> int:
+        return self.store.sizes[self.slot]
+    #end
+
+    @property
+    def mtime_ns(self) -> int:
+        return self.store.mtimes[self.slot]
+    #end
+
+    @property
+    def encoding(self) -> Optional[str]:
+        return self.store.get_encoding(self.slot)
+    #end
+
+    def __getitem__(self, key: str):
+        # Dict style access, as in record['absolute_path']
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+        #end
+    #end
+
+    def __repr__(self) -> str:
+        return f"FileRecord([{self.type}] {self.absolute_path})"
+    #end
+#end
+
+class FileRecordStore:
+    """
+    The scanned files, in scan order, with the maintained views and counters used by the navigation.
+
+    Args:
+        roots (List[str]): The input paths, the relative paths are sliced past their common base directory.
+    """
+
+    def __init__(self, roots: List[str] = ()):
+        self.roots = [root for root in roots if root]
+        self.base_length = get_relative_base_length(self.roots)
+        self.root_prefixes = get_root_prefixes(self.roots)
+
+        # Interned directory prefixes (with the trailing '/', or "" for bare file names)
+        self.directories: List[str] = []
+        self.directory_ids: Dict[str, int] = {}
+
+        # Interned encodings, id 0 is for the files whose encoding has not been detected yet
+        self.encodings: List[Optional[str]] = [None]
+        self.encoding_ids: Dict[str, int] = {}
+
+        # The columns, indexed by slot
+        self.names: List[str] = []
+        self.directory_column = array('I')
+        self.root_column = array('H')
+        self.type_flags = bytearray()
+        self.sizes = array('q')
+        self.mtimes = array('q')
+        self.encoding_column = bytearray()
+
+        self.order = array('I') # The slots in scan order
+        self.free_slots: List[int] = []
+
+        # Maintained views and counters, so that the Binary switch and the navigation never filter the files
+        self.all_files = FileView(self, self.order)
+        self.text_files = FileView(self, array('I'))
+        self.type_counts = [0, 0, 0] # By type flag
+
+        # Maximum display path length by (include binary, absolute), for the fixed-width table columns
+        self.max_path_lengths: Dict[Tuple[bool, bool], int] = {}
+
+        # Called as listener(slot, added) when a file is inserted or (before it is) removed
+        self.listeners: List[Callable[[int, bool], None]] = []
+    #end
+
+    @classmethod
+    def from_scan(cls, entries: List[ScanEntry], file_types: List[str], roots: List[str]) -> "FileRecordStore":
+        """
+        This function builds the store from the results of a scan.
+
+        Args:
+            entries (List[ScanEntry]): The scanned files, in scan order.
+            file_types (List[str]): The file type ("bin" or "txt") of each entry.
+            roots (List[str]): The input paths the files were scanned from.
+
+        Returns:
+            FileRecordStore: The store, with the files in the same order.
+        """
+        # The columns are built whole, a column at a time, rather than a slot at a time
+        paths = [entry.path for entry in entries]
+        splits = [path.rfind('/') + 1 for path in paths]
+        directory_ids: Dict[str, int] = {}
+        directory_column = array('I', [directory_ids.setdefault(path[:split], len(directory_ids))
+                                       for path, split in zip(paths, splits)])
+        stats = [entry.stat for entry in entries]
+        return cls.from_columns(roots, list(directory_ids), directory_column,
+                                array('H', [entry.root_index for entry in entries]),
+                                [path[split:] for path, split in zip(paths, splits)],
+                                bytearray(map(fileTypeFlags.__getitem__, file_types)),
+                                array('q', [stat.st_size for stat in stats]), array('q', [stat.st_mtime_ns for stat in stats]))
+    #end
+
+    @classmethod
+    def from_columns(cls, roots: List[str], directories: List[str], directory_column: array, root_column: array,
+                     names: List[str], type_flags: bytearray, sizes: array, mtimes: array) -> "FileRecordStore":
+        """
+        This function builds the store from its columns, the files in scan order (e.g. as kept by the scan index).
+        The columns are taken over, not copied.
+
+        Args:
+            roots (List[str]): The input paths the files were scanned from.
+            directories (List[str]): The directory prefixes, the directory column holds indexes into it.
+            directory_column (array): The directory of each file ('I').
+            root_column (array): The root index of each file ('H').
+            names (List[str]): The name of each file.
+            type_flags (bytearray): The type flag (TYPE_TEXT or TYPE_BINARY) of each file.
+            sizes (array): The size of each file ('q').
+            mtimes (array): The mtime of each file in nanoseconds ('q').
+
+        Returns:
+            FileRecordStore: The store, with the files in the order of the columns.
+        """
+        store = cls(roots)
+        store.directories = directories
+        store.directory_ids = {directory: directory_id for directory_id, directory in enumerate(directories)}
+        store.names = names
+        store.directory_column = directory_column
+        store.root_column = root_column
+        store.type_flags = type_flags
+        store.sizes = sizes
+        store.mtimes = mtimes
+        store.encoding_column = bytearray(len(names))
+        store.order.extend(range(len(names)))
+        store.text_files.order.extend(itertools.compress(range(len(names)), [flag == TYPE_TEXT for flag in type_flags]))
+        store.type_counts = [type_flags.count(TYPE_TEXT), type_flags.count(TYPE_BINARY), 0]
+        return store
+    #end
+
+    def intern_directory(self, directory: str) -> int:
+        directory_id = self.directory_ids.get(directory)
+        if directory_id is None:
+            directory_id = self.directory_ids[directory] = len(self.directories)
+            self.directories.append(directory)
+        #end
+        return directory_id
+    #end
+
+    def add_slot(self, entry: ScanEntry, file_type: str) -> int:
+        """Store a file in a free slot (or a new one) and return the slot, the scan order is not touched."""
+        path = entry.path
+        split = path.rfind('/') + 1
+        directory_id = self.intern_directory(path[:split])
+        stat = entry.stat
+        values = (path[split:], directory_id, entry.root_index, fileTypeFlags[file_type], stat.st_size, stat.st_mtime_ns)
+        self.type_counts[values[3]] += 1
+
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            (self.names[slot], self.directory_column[slot], self.root_column[slot],
+             self.type_flags[slot], self.sizes[slot], self.mtimes[slot]) = values
+            self.encoding_column[slot] = 0
+            return slot
+        #end
+
+        self.names.append(values[0])
+        self.directory_column.append(values[1])
+        self.root_column.append(values[2])
+        self.type_flags.append(values[3])
+        self.sizes.append(values[4])
+        self.mtimes.append(values[5])
+        self.encoding_column.append(0)
+        return len(self.names) - 1
+    #end
+
+    def free_slot(self, slot: int) -> None:
+        self.type_counts[self.type_flags[slot]] -= 1
+        self.names[slot] = ""
+        self.type_flags[slot] = TYPE_FREE
+        self.free_slots.append(slot)
+    #end
+
+    # --- Access by slot ---
+    def absolute_path(self, slot: int) -> str:
+        return self.directories[self.directory_column[slot]] + self.names[slot]
+    #end
+
+    def relative_path(self, slot: int) -> str:
+        return self.absolute_path(slot)[self.base_length:].lstrip('/')
+    #end
+
+    def display_path(self, slot: int, absolute: bool) -> str:
+        return self.absolute_path(slot) if absolute else self.relative_path(slot)
+    #end
+
+    def path_length(self, slot: int, absolute: bool) -> int:
+        return len(self.display_path(slot, absolute))
+    #end
+
+    def file_type(self, slot: int) -> str:
+        return fileTypeNames[self.type_flags[slot]]
+    #end
+
+    def is_binary(self, slot: int) -> bool:
+        return self.type_flags[slot] == TYPE_BINARY
+    #end
+
+    def get_encoding(self, slot: int) -> Optional[str]:
+        return self.encodings[self.encoding_column[slot]]
+    #end
+
+    def set_encoding(self, slot: int, encoding: str) -> None:
+        """Keep the detected encoding of a file, it is reset when the file changes (and its slot is replaced)."""
+        encoding_id = self.encoding_ids.get(encoding)
+        if encoding_id is None:
+            encoding_id = self.encoding_ids[encoding] = len(self.encodings)
+            self.encodings.append(encoding)
+        #end
+        self.encoding_column[slot] = encoding_id
+    #end
+
+    def update_stat(self, slot: int, stat: os.stat_result) -> bool:
+        """Update the size and mtime of a file changed in place, returns False if they did not change."""
+        if self.sizes[slot] == stat.st_size and self.mtimes[slot] == stat.st_mtime_ns:
+            return False
+        #end
+        self.sizes[slot] = stat.st_size
+        self.mtimes[slot] = stat.st_mtime_ns
+        self.encoding_column[slot] = 0 # Detected again
+        return True
+    #end
+
+    def record(self, slot: int) -> FileRecord:
+        return FileRecord(self, slot)
+    #end
+
+    # --- Access by position in scan order ---
+    def __len__(self) -> int:
+        return len(self.order)
+    #end
+
+    def __getitem__(self, position: int) -> FileRecord:
+        return FileRecord(self, self.order[position])
+    #end
+
+    def __iter__(self) -> Iterator[FileRecord]:
+        for slot in self.order:
+            yield FileRecord(self, slot)
+        #end
+    #end
+
+    def view(self, include_binary: bool = True) -> "FileView":
+        """The maintained view matching the Binary switch."""
+        return self.all_files if include_binary else self.text_files
+    #end
+
+    def count_type(self, file_type: str) -> int:
+        return self.type_counts[fileTypeFlags[file_type]]
+    #end
+
+    def find_position(self, path: str) -> Tuple[int, bool]:
+        return self.all_files.find_position(path)
+    #end
+
+    def max_path_length(self, include_binary: bool, absolute: bool) -> int:
+        """
+        This function returns the length of the longest displayed path of a view.
+        It is computed from the directory and name lengths without joining the paths, and is then maintained
+        as files are inserted (and recomputed only when the longest path is removed).
+
+        Args:
+            include_binary (bool): The view, as for view().
+            absolute (bool): Whether the absolute or the relative paths are displayed.
+
+        Returns:
+            int: The maximum length, 0 for an empty view.
+        """
+        key = (include_binary, absolute)
+        if key not in self.max_path_lengths:
+            if absolute:
+                directory_lengths = [len(directory) for directory in self.directories]
+            else:
+                directory_lengths = [len(directory[self.base_length:].lstrip('/')) for directory in self.directories]
+            #end
+            names = self.names
+            directory_column = self.directory_column
+            self.max_path_lengths[key] = max((directory_lengths[directory_column[slot]] + len(names[slot])
+                                              for slot in self.view(include_binary)), default=0)
+        #end
+        return self.max_path_lengths[key]
+    #end
+
+    def update_max_path_lengths(self, slot: int, added: bool) -> None:
+        for key, length in list(self.max_path_lengths.items()):
+            include_binary, absolute = key
+            if not include_binary and self.is_binary(slot):
+                continue
+            #end
+            slot_length = self.path_length(slot, absolute)
+            if added:
+                self.max_path_lengths[key] = max(length, slot_length)
+            elif slot_length >= length:
+                del self.max_path_lengths[key] # Recomputed on the next call
+            #end
+        #end
+    #end
+
+    def insert(self, position: int, entry: ScanEntry, file_type: str) -> int:
+        """Insert a file at a position of the scan order (from find_position), the views are updated as well."""
+        slot = self.add_slot(entry, file_type)
+        self.order.insert(position, slot)
+        if file_type != "bin":
+            text_position, _ = self.text_files.find_position(entry.path)
+            self.text_files.order.insert(text_position, slot)
+        #end
+        self.update_max_path_lengths(slot, True)
+        for listener in self.listeners:
+            listener(slot, True)
+        #end
+        return slot
+    #end
+
+    def pop(self, position: int) -> str:
+        """Remove the file at a position of the scan order and return its type, the views are updated as well."""
+        slot = self.order.pop(position)
+        for listener in self.listeners:
+            listener(slot, False)
+        #end
+        self.update_max_path_lengths(slot, False)
+        file_type = self.file_type(slot)
+        if file_type != "bin":
+            text_position, exists = self.text_files.find_position(self.absolute_path(slot))
+            if exists:
+                del self.text_files.order[text_position]
+            #end
+        #end
+        self.free_slot(slot)
+        return file_type
+    #end
+#end
+
+class FileView:
+    """
+    A maintained, ordered view of the slots of a store (all the files, or the text files only).
+    The view is updated by the store as files are inserted and removed, so the count and the lookup of
+    the n-th file are O(1) and finding a file by path is a binary search.
+    """
+    __slots__ = ("store", "order")
+
+    def __init__(self, store: FileRecordStore, order: array):
+        self.store = store
+        self.order = order # The slots in scan order
+    #end
+
+    def __len__(self) -> int:
+        return len(self.order)
+    #end
+
+    def __getitem__(self, index: int) -> int:
+        return self.order[index]
+    #end
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.order)
+    #end
+
+    def find_position(self, path: str) -> Tuple[int, bool]:
+        """
+        This function binary searches the view for a path.
+
+        Args:
+            path (str): The absolute path of the file.
+
+        Returns:
+            Tuple[int, bool]: The position of the file (or where it would be inserted), and whether it is there.
+        """
+        store = self.store
+        order = self.order
+        root_prefixes = store.root_prefixes
+        key = get_scan_order_key(path, root_prefixes)
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if get_scan_order_key(store.absolute_path(order[middle]), root_prefixes) < key:
+                low = middle + 1
+            else:
+                high = middle
+            #end
+        #end
+        exists = low < len(order) and store.absolute_path(order[low]) == path
+        return low, exists
+    #end
+#end
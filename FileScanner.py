@@ -0,0 +1,464 @@
+"""
+File Scanner
+
+Iterative, os.scandir-based directory walker used by process_input to compile the file structures.
+
+Directories are listed on a bounded thread pool (sibling directories and the command line roots are
+listed concurrently) and the listings are stitched back together in a deterministic depth-first order:
+roots in command line order, entries of each directory sorted by name.
+The stat results cached on the os.DirEntry objects are reused, so every file costs a single stat call at most.
+"""
+
+import os
+import queue
+import codecs
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple, Callable, Optional
+
+from IgnoreRules import IgnoreRules, get_directory_signature
+
+# Upper bound for the number of directory listing workers
+scanWorkersLimit = min(32, (os.cpu_count() or 1) + 4)
+
+## ================= Scan entries and path helpers =================
+
+class ScanEntry:
+    """A single file found by the scanner."""
+    __slots__ = ("path", "relative_path", "root_index", "stat")
+
+    def __init__(self, path: str, relative_path: str, root_index: int, stat: os.stat_result):
+        self.path = path
+        self.relative_path = relative_path
+        self.root_index = root_index
+        self.stat = stat
+    #end
+#end
+
+def get_relative_base_length(paths: List[str]) -> int:
+    """
+    This function computes the length of the common base directory of the input paths.
+    The relative path of a file is obtained by slicing this many characters off its absolute path.
+
+    Args:
+        paths (List[str]): The sanitized input paths (forward slashes).
+
+    Returns:
+        int: The length of the common base directory.
+    """
+    if not paths:
+        return 0
+    #end
+
+    # A file root contributes its parent directory, so that the file name stays in the relative path
+    split_paths = []
+    for path in paths:
+        path = path.rstrip('/') or '/'
+        if not os.path.isdir(path):
+            path = path[:path.rfind('/')] if '/' in path else ''
+        #end
+        split_paths.append(path.split('/'))
+    #end
+
+    common = []
+    for components in zip(*split_paths):
+        if any(c != components[0] for c in components):
+            break
+        #end
+        common.append(components[0])
+    #end
+
+    return len('/'.join(common))
+#end
+
+def make_relative_path(path: str, base_length: int) -> str:
+    return path[base_length:].lstrip('/')
+#end
+
+def join_path(directory: str, name: str) -> str:
+    # Keep forward slashes throughout, the tree view splits the paths on '/'
+    if directory.endswith('/'):
+        return directory + name
+    #end
+    return directory + '/' + name
+#end
+
+def get_root_prefixes(roots: List[str]) -> List[str]:
+    """The prefix shared by all the files under each root (the file path itself for file roots)."""
+    return [join_path(root, "") if os.path.isdir(root) else root for root in roots]
+#end
+
+def get_scan_order_key(path: str, root_prefixes: List[str]) -> Optional[Tuple[int, List[str]]]:
+    """
+    This function returns the sort key matching the order in which scan_paths emits the files:
+    (root index, path components below the root). Returns None if the path is not under any root.
+    """
+    for root_index, prefix in enumerate(root_prefixes):
+        if path == prefix:
+            return (root_index, [])
+        #end
+        if prefix.endswith('/') and path.startswith(prefix):
+            return (root_index, path[len(prefix):].split('/'))
+        #end
+    #end
+    return None
+#end
+
+## ================= Directory listing and walk =================
+
+def list_directory(path: str, root_index: int, relative_start: int, rules: IgnoreRules = None,
+                   chain: Tuple = ()) -> Tuple[List[List[ScanEntry]], List[Tuple[str, bool, Tuple]]]:
+    """
+    This function lists a single directory with os.scandir.
+
+    Args:
+        path (str): The directory to list.
+        root_index (int): The index of the root the directory belongs to.
+        relative_start (int): Where the relative path starts in the paths under this root.
+        rules (IgnoreRules): The ignore rules, excluded entries are dropped (and their subtree never listed).
+        chain (Tuple): The ignore rule chain in effect for this directory.
+
+    Returns:
+        Tuple[List[List[ScanEntry]], List[Tuple[str, bool, Tuple]]]: (runs, subdirectories) in name order.
+            The subdirectories are (path, is_link, rule chain) and runs[i] holds the files sorted before
+            subdirectories[i], so there is always one more run than subdirectories. Directories are never stat-ed.
+    """
+    prefix = join_path(path, "")
+    relative_prefix = prefix[relative_start:]
+    try:
+        with os.scandir(path) as it:
+            dir_entries = sorted(it, key=lambda entry: entry.name)
+        #end
+    except OSError:
+        return [[]], [] # Unreadable directories are treated as empty
+    #end
+
+    if rules is not None:
+        names = [entry.name for entry in dir_entries]
+        if rules.is_virtual_environment(names):
+            return [[]], []
+        #end
+        chain = rules.extend_chain(chain, path, names)
+    #end
+
+    runs = [[]]
+    subdirectories = []
+    for entry in dir_entries:
+        try:
+            is_dir = entry.is_dir()
+            if rules is not None and (rules.is_excluded(chain, entry.name, prefix + entry.name, is_dir) or
+                                      not (is_dir or rules.is_included(entry.name, relative_prefix + entry.name))):
+                continue
+            #end
+            if is_dir:
+                subdirectories.append((prefix + entry.name, entry.is_symlink(), chain))
+                runs.append([])
+            elif entry.is_file():
+                runs[-1].append(ScanEntry(prefix + entry.name, relative_prefix + entry.name, root_index, entry.stat()))
+            #end
+        except OSError:
+            continue # Broken links and entries removed while listing are skipped
+        #end
+    #end
+    return runs, subdirectories
+#end
+
+def scan_paths(paths: List[str], recursive: bool = True, max_workers: int = scanWorkersLimit,
+               progress_callback: Callable[[str, int, int], None] = None, rules: IgnoreRules = None,
+               directories: Optional[Dict[Tuple[int, str], Tuple]] = None) -> List[ScanEntry]:
+    """
+    This function walks the input paths and returns all the files found, in a deterministic order.
+
+    Args:
+        paths (List[str]): The sanitized input paths. Invalid (None) paths are ignored.
+        recursive (bool): If False only the file paths given directly are returned.
+        max_workers (int): The bound on the directory listing thread pool.
+        progress_callback (Callable[[str, int, int], None]): Called as (directory, listed, total) after each listing.
+        rules (IgnoreRules): Include/exclude rules applied while listing. Files given as roots are always kept.
+        directories (Optional[Dict[Tuple[int, str], Tuple]]): If given, the signature (get_directory_signature) of
+            every directory listed is added to it by (root index, path), taken before the directory is listed.
+
+    Returns:
+        List[ScanEntry]: The files, roots in input order and each directory depth-first sorted by name.
+    """
+    roots = [path for path in paths if path]
+    base_length = get_relative_base_length(roots)
+
+    listings: Dict[Tuple[int, str], Tuple] = {}
+    requested = set()
+    visited_links = set()
+    link_targets: Dict[str, str] = {} # The real path of each linked directory found
+    relative_starts: Dict[int, int] = {}
+
+    def list_task(root_index: int, directory: str, relative_start: int, chain: Tuple) -> Tuple:
+        if directories is not None:
+            directories[(root_index, directory)] = get_directory_signature(directory)
+        #end
+        return list_directory(directory, root_index, relative_start, rules, chain)
+    #end
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        # Finished listings are handed back through a queue, so each completion costs O(1)
+        completed = queue.Queue()
+        pending = [0]
+
+        def submit(root_index: int, directory: str, relative_start: int, chain: Tuple) -> bool:
+            key = (root_index, directory)
+            if key in requested:
+                return False
+            #end
+            requested.add(key)
+            pending[0] += 1
+            future = executor.submit(list_task, root_index, directory, relative_start, chain)
+            future.add_done_callback(lambda future: completed.put((key, relative_start, future)))
+            return True
+        #end
+
+        for root_index, root in enumerate(roots):
+            if os.path.isdir(root) and recursive:
+                # All the files under the root share its prefix, so the relative path starts at the same index
+                relative_starts[root_index] = base_length + (join_path(root, "")[base_length:base_length + 1] == '/')
+                submit(root_index, root, relative_starts[root_index], rules.root_chain(root) if rules is not None else ())
+            #end
+        #end
+
+        total = pending[0]
+        listed = 0
+        while pending[0]:
+            key, relative_start, future = completed.get()
+            pending[0] -= 1
+            listings[key] = future.result()
+            listed += 1
+
+            for path, is_link, chain in listings[key][1]:
+                # Only links can create cycles, follow each linked directory once. The first listing to finish claims
+                # it, the stitch below decides which link is kept (the first one in scan order)
+                if is_link:
+                    real_path = link_targets[path] = os.path.realpath(path)
+                    if real_path in visited_links:
+                        continue
+                    #end
+                    visited_links.add(real_path)
+                #end
+                if submit(key[0], path, relative_start, chain):
+                    total += 1
+                #end
+            #end
+
+            if progress_callback:
+                progress_callback(key[1], listed, total)
+            #end
+        #end
+    #end
+
+    def get_listing(root_index: int, directory: str, chain: Tuple) -> Tuple:
+        listing = listings.get((root_index, directory))
+        if listing is None: # Under a link the walk did not follow, another link to its target finished first
+            listing = listings[(root_index, directory)] = list_task(root_index, directory, relative_starts[root_index], chain)
+        #end
+        return listing
+    #end
+
+    # Stitch the listings together depth-first with an explicit stack of (listing, position). A linked directory is
+    # followed at its first link in this order, whichever listing finished first, so the output does not depend on
+    # the timing of the workers
+    entries = []
+    stitched_links = set()
+    for root_index, root in enumerate(roots):
+        if os.path.isfile(root):
+            try:
+                entries.append(ScanEntry(root, make_relative_path(root, base_length), root_index, os.stat(root)))
+            except OSError:
+                pass
+            #end
+            continue
+        #end
+
+        if (root_index, root) not in listings:
+            continue
+        #end
+
+        stack = [(listings[(root_index, root)], 0)]
+        while stack:
+            (runs, subdirectories), position = stack.pop()
+            entries.extend(runs[position])
+            if position < len(subdirectories):
+                stack.append(((runs, subdirectories), position + 1))
+                path, is_link, chain = subdirectories[position]
+                if is_link:
+                    real_path = link_targets.get(path) or os.path.realpath(path)
+                    if real_path in stitched_links:
+                        continue
+                    #end
+                    stitched_links.add(real_path)
+                #end
+                stack.append((get_listing(root_index, path, chain), 0))
+            #end
+        #end
+    #end
+
+    return entries
+#end
+
+## ================= File classification =================
+
+# Extensions that can be classified without opening the file
+textExtensions = frozenset([
+    ".txt", ".md", ".rst", ".csv", ".tsv", ".log", ".ini", ".cfg", ".conf", ".toml", ".yaml", ".yml",
+    ".json", ".xml", ".html", ".htm", ".css", ".scss", ".less", ".svg",
+    ".py", ".pyi", ".pyx", ".ipynb", ".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".vue",
+    ".c", ".h", ".cc", ".cpp", ".cxx", ".hpp", ".hh", ".cs", ".java", ".kt", ".kts", ".scala", ".go", ".rs",
+    ".rb", ".php", ".pl", ".pm", ".lua", ".r", ".m", ".swift", ".dart", ".sql", ".graphql",
+    ".sh", ".bash", ".zsh", ".fish", ".bat", ".cmd", ".ps1", ".cmake", ".mk", ".gradle",
+    ".tex", ".bib", ".gitignore", ".gitattributes", ".editorconfig", ".env", ".properties",
+])
+binaryExtensions = frozenset([
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".tif", ".tiff", ".webp", ".psd",
+    ".mp3", ".wav", ".flac", ".ogg", ".mp4", ".mkv", ".avi", ".mov", ".webm",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".tar", ".zst", ".jar", ".whl",
+    ".exe", ".dll", ".so", ".dylib", ".o", ".obj", ".a", ".lib", ".pyc", ".pyo", ".pyd", ".class",
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".odt",
+    ".ttf", ".otf", ".woff", ".woff2", ".eot", ".sqlite", ".db", ".bin", ".dat", ".pkl", ".npy", ".npz",
+])
+
+# Magic numbers of binary formats that may not contain a null byte in the sniffed sample
+binaryMagicNumbers = (
+    b"\x7fELF", b"%PDF", b"PK\x03\x04", b"\x89PNG", b"GIF87a", b"GIF89a", b"\xff\xd8\xff", b"\x1f\x8b",
+    b"\xfd7zXZ", b"7z\xbc\xaf\x27\x1c", b"Rar!", b"\xca\xfe\xba\xbe", b"\xcf\xfa\xed\xfe", b"OggS",
+    b"SQLite format 3", b"\x00asm", b"wOFF", b"\x28\xb5\x2f\xfd",
+)
+
+textByteOrderMarks = (codecs.BOM_UTF8, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE, codecs.BOM_UTF32_BE) # UTF-32-LE starts with UTF-16-LE
+sniffSampleSize = 512
+sniffBatchSize = 64
+
+def classify_sample(sample: bytes) -> str:
+    """Classify a sniffed file header as "bin" or "txt"."""
+    if sample.startswith(textByteOrderMarks): # UTF-16/32 text is full of null bytes
+        return "txt"
+    #end
+    if sample.startswith(binaryMagicNumbers) or b'\x00' in sample:
+        return "bin"
+    #end
+    return "txt"
+#end
+
+def sniff_file_type(path: str) -> str:
+    """Sniff the first bytes of the file. Unreadable files count as binary."""
+    try:
+        with open(path, "rb") as file:
+            return classify_sample(file.read(sniffSampleSize))
+        #end
+    except OSError:
+        return "bin"
+    #end
+#end
+
+def is_binary_file(path: str) -> bool:
+    return sniff_file_type(path) == "bin"
+#end
+
+def get_file_type_by_name(path: str) -> Optional[str]:
+    """Classify the file from its extension alone, returns None if the extension is not known."""
+    name = path[path.rfind('/') + 1:].lower()
+    extension = name[name.rfind('.'):] if '.' in name else ""
+    if extension in textExtensions:
+        return "txt"
+    #end
+    if extension in binaryExtensions:
+        return "bin"
+    #end
+    return None
+#end
+
+def make_stat_key(path: str, dev: int, ino: int, size: int, mtime_ns: int) -> Tuple:
+    # The inode is not always reported (e.g. cached Windows directory entries), fall back to the path
+    if ino:
+        return (dev, ino, size, mtime_ns)
+    #end
+    return (path, size, mtime_ns)
+#end
+
+def get_stat_key(path: str, stat: os.stat_result) -> Tuple:
+    return make_stat_key(path, stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+#end
+
+class FileClassifier:
+    """
+    Binary/text classification stage with fast paths and a memo.
+
+    Files are classified, in order of preference, from the memo keyed by (device, inode, size, mtime),
+    from the table of known extensions, as empty files, and finally by sniffing the file header.
+    The files that need to be sniffed are read in batches on a worker pool.
+    """
+
+    def __init__(self, max_workers: int = scanWorkersLimit):
+        self.max_workers = max_workers
+        self.memo: Dict[Tuple, str] = {}
+        self.sniffCount = 0
+    #end
+
+    def classify(self, entries: List[ScanEntry], progress_callback: Callable[[str, int, int], None] = None,
+                 known_types: List[Optional[str]] = None) -> List[str]:
+        """
+        This function classifies the scanned files.
+
+        Args:
+            entries (List[ScanEntry]): The scanned files.
+            progress_callback (Callable[[str, int, int], None]): Called as (path, classified, total).
+            known_types (List[Optional[str]]): Types already known (e.g. from the scan index), None where unknown.
+
+        Returns:
+            List[str]: The file type ("bin" or "txt") of each entry.
+        """
+        total = len(entries)
+        file_types = list(known_types) if known_types else [None] * total
+        keys = [None] * total
+        to_sniff = []
+
+        for i, entry in enumerate(entries):
+            if file_types[i] is not None:
+                continue
+            #end
+            keys[i] = get_stat_key(entry.path, entry.stat)
+            file_type = self.memo.get(keys[i])
+            if file_type is None:
+                file_type = get_file_type_by_name(entry.path)
+            #end
+            if file_type is None and entry.stat.st_size == 0:
+                file_type = "txt"
+            #end
+            if file_type is None:
+                to_sniff.append(i)
+            else:
+                file_types[i] = file_type
+                self.memo[keys[i]] = file_type
+            #end
+        #end
+
+        classified = total - len(to_sniff)
+        if progress_callback and total:
+            progress_callback(entries[-1].path, classified, total)
+        #end
+
+        if to_sniff:
+            batches = [to_sniff[i:i + sniffBatchSize] for i in range(0, len(to_sniff), sniffBatchSize)]
+            sniff_batch = lambda batch: [sniff_file_type(entries[i].path) for i in batch]
+
+            with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+                for batch, batch_types in zip(batches, executor.map(sniff_batch, batches)):
+                    for i, file_type in zip(batch, batch_types):
+                        file_types[i] = file_type
+                        self.memo[keys[i]] = file_type
+                    #end
+                    classified += len(batch)
+                    if progress_callback:
+                        progress_callback(entries[batch[-1]].path, classified, total)
+                    #end
+                #end
+            #end
+            self.sniffCount += len(to_sniff)
+        #end
+
+        return file_types
+    #end
+#end
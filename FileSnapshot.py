@@ -0,0 +1,79 @@
+"""
+File Snapshot
+
+Per-file content hashes recorded by an export, so that a later export can send only the files changed since.
+
+The snapshot is a JSON file with the size, mtime, content hash and type of every file, keyed by its path relative
+to the inputs (so that it still matches when the checkout is moved). The files are compared with it by path: a file
+with the same size and mtime is unchanged without being read again, the others are compared by content hash (a
+file that was only touched is not a change).
+"""
+
+import os
+import json
+import time
+from typing import Dict, List, Tuple, Optional
+
+snapshotFileName = "snapshot.json"
+
+SnapshotEntry = Tuple[int, int, Optional[str], str] # (size, mtime_ns, content hash, type)
+
+def load_snapshot(path: str) -> Optional[Tuple[str, Dict[str, SnapshotEntry]]]:
+    """
+    This function loads a snapshot.
+
+    Args:
+        path (str): The snapshot file.
+
+    Returns:
+        Optional[Tuple[str, Dict[str, SnapshotEntry]]]: The time the snapshot was taken and its entries by relative
+            path, or None if there is no snapshot file.
+    """
+    if not os.path.isfile(path):
+        return None
+    #end
+    with open(path, encoding='utf-8') as file:
+        snapshot = json.load(file)
+    #end
+    return snapshot["created"], {relative_path: tuple(entry) for relative_path, entry in snapshot["files"].items()}
+#end
+
+def save_snapshot(path: str, files: Dict[str, SnapshotEntry]) -> None:
+    """Write a snapshot, replacing the previous one only once it is complete."""
+    temporary_path = path + ".tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        json.dump({"created": time.strftime('%Y-%m-%dT%H:%M:%S%z'), "files": files}, file, separators=(',', ':'))
+    #end
+    os.replace(temporary_path, path)
+#end
+
+def is_unchanged(previous: Optional[SnapshotEntry], size: int, mtime_ns: int) -> bool:
+    """A file with the same size and mtime as in the snapshot is taken as unchanged without hashing it."""
+    return previous is not None and previous[0] == size and previous[1] == mtime_ns and previous[2] is not None
+#end
+
+def compare_snapshots(previous: Dict[str, SnapshotEntry], current: Dict[str, SnapshotEntry]) -> Tuple[List[str], List[str], List[str]]:
+    """
+    This function compares the files with a previous snapshot.
+
+    Args:
+        previous (Dict[str, SnapshotEntry]): The entries of the previous snapshot.
+        current (Dict[str, SnapshotEntry]): The entries of the current files.
+
+    Returns:
+        Tuple[List[str], List[str], List[str]]: The added, modified and deleted relative paths, the added and modified
+            ones in the order of the current files, the deleted ones in the order of the snapshot.
+    """
+    added = []
+    modified = []
+    for relative_path, entry in current.items():
+        previous_entry = previous.get(relative_path)
+        if previous_entry is None:
+            added.append(relative_path)
+        elif previous_entry[2] != entry[2] or previous_entry[2] is None:
+            modified.append(relative_path)
+        #end
+    #end
+    deleted = [relative_path for relative_path in previous if relative_path not in current]
+    return added, modified, deleted
+#end
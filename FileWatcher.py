@@ -0,0 +1,440 @@
+"""
+File Watcher
+
+Watches the input roots and reports the files added, removed and modified since the last poll,
+so that the file structures can be updated in place instead of being rescanned.
+
+Two watchers are available:
+    InotifyWatcher - Linux inotify (through ctypes), the cost of a poll scales with the number of events.
+    PollingWatcher - Portable fallback that rescans and compares size/mtime. poll() is synchronous, so
+                     it can also be driven by hand (e.g. from tests or scripts).
+The BackgroundWatcher runs either of them on a daemon thread and queues the deltas for the control loop.
+Both apply the same ignore rules as the scanner, edits to .gitignore files take effect at the next rescan.
+"""
+
+import os
+import queue
+import select
+import struct
+import threading
+from typing import List, Dict, Set, Tuple
+
+from FileScanner import ScanEntry, scan_paths, join_path, get_relative_base_length, make_relative_path
+from IgnoreRules import IgnoreRules
+
+# A delta is a (kind, path) tuple
+DELTA_ADD = "add"
+DELTA_REMOVE = "remove"
+DELTA_MODIFY = "modify"
+
+def coalesce_deltas(deltas: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """
+    This function merges the deltas of each path into at most one delta, keeping the order of first appearance.
+    (add, modify) -> add, (add, remove) -> nothing, (remove, add) -> modify, (modify, remove) -> remove.
+    """
+    merged: Dict[str, str] = {}
+    for kind, path in deltas:
+        previous = merged.get(path)
+        if previous is None:
+            merged[path] = kind
+        elif previous == DELTA_ADD:
+            merged[path] = None if kind == DELTA_REMOVE else DELTA_ADD
+        elif previous == DELTA_REMOVE:
+            merged[path] = DELTA_MODIFY if kind == DELTA_ADD else DELTA_REMOVE
+        else:
+            merged[path] = DELTA_REMOVE if kind == DELTA_REMOVE else DELTA_MODIFY
+        #end
+    #end
+    return [(kind, path) for path, kind in merged.items() if kind]
+#end
+
+## ================= Polling watcher =================
+
+class PollingWatcher:
+    """Rescan the roots on every poll and compare (size, mtime, inode) with the previous snapshot."""
+
+    def __init__(self, roots: List[str], recursive: bool, entries: List[ScanEntry], rules: IgnoreRules = None):
+        self.roots = roots
+        self.recursive = recursive
+        self.rules = rules
+        self.snapshot = {entry.path: self.signature(entry.stat) for entry in entries}
+    #end
+
+    @staticmethod
+    def signature(stat: os.stat_result) -> Tuple[int, int, int]:
+        return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    #end
+
+    def poll(self, timeout: float = 0) -> List[Tuple[str, str]]:
+        """Return the deltas since the previous poll. The timeout is accepted for interface parity and ignored."""
+        entries = scan_paths(self.roots, self.recursive, rules=self.rules)
+        current = {entry.path: self.signature(entry.stat) for entry in entries}
+        deltas = []
+        for path, signature in current.items():
+            previous = self.snapshot.get(path)
+            if previous is None:
+                deltas.append((DELTA_ADD, path))
+            elif previous != signature:
+                deltas.append((DELTA_MODIFY, path))
+            #end
+        #end
+        for path in self.snapshot:
+            if path not in current:
+                deltas.append((DELTA_REMOVE, path))
+            #end
+        #end
+        self.snapshot = current
+        return deltas
+    #end
+
+    def close(self) -> None:
+        pass
+    #end
+#end
+
+## ================= Linux inotify watcher =================
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+inotifyWatchMask = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                    IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+inotifyEventHeader = struct.Struct("iIII")
+
+def load_inotify():
+    """Return the libc handle if inotify is available, None otherwise."""
+    if not hasattr(os, "uname") or os.uname().sysname != "Linux":
+        return None
+    #end
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        return libc
+    except (OSError, AttributeError, ImportError):
+        return None
+    #end
+#end
+
+class InotifyWatcher:
+    """
+    Watch every directory under the roots with inotify.
+
+    The watcher keeps, per directory, the set of files and subdirectories it contains, so that a removed or
+    moved-away directory can be turned into file deltas without looking at the rest of the tree.
+    """
+
+    def __init__(self, roots: List[str], recursive: bool, entries: List[ScanEntry], rules: IgnoreRules = None, libc=None):
+        self.libc = libc or load_inotify()
+        if self.libc is None:
+            raise OSError("inotify is not available")
+        #end
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError("inotify_init1 failed")
+        #end
+
+        self.roots = roots
+        self.recursive = recursive
+        self.rules = rules
+        self.base_length = get_relative_base_length(roots)
+        self.dir_chains: Dict[str, Tuple] = {}
+        self.watches: Dict[int, str] = {}
+        self.watch_descriptors: Dict[str, int] = {}
+        self.dir_files: Dict[str, Set[str]] = {}
+        self.dir_subdirs: Dict[str, Set[str]] = {}
+        self.file_roots: Set[str] = set()
+
+        try:
+            for root in roots:
+                if os.path.isfile(root):
+                    self.file_roots.add(root)
+                    self.add_directory_watch(self.parent(root))
+                elif os.path.isdir(root) and recursive:
+                    self.add_tree(root, emit=False, chain=rules.root_chain(root) if rules else ())
+                #end
+            #end
+        except OSError:
+            self.close()
+            raise
+        #end
+        for entry in entries:
+            self.dir_files.setdefault(self.parent(entry.path), set()).add(entry.path)
+        #end
+    #end
+
+    @staticmethod
+    def parent(path: str) -> str:
+        # Relative file roots without a directory live in the working directory, represented by ""
+        if '/' not in path:
+            return ""
+        #end
+        return path[:path.rfind('/')] or '/'
+    #end
+
+    def add_directory_watch(self, directory: str) -> None:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory or "."), inotifyWatchMask)
+        if wd < 0:
+            raise OSError(f"inotify_add_watch failed for [{directory}], the watch limit may have been reached")
+        #end
+        self.watches[wd] = directory
+        self.watch_descriptors[directory] = wd
+    #end
+
+    def remove_directory_watch(self, directory: str) -> None:
+        wd = self.watch_descriptors.pop(directory, None)
+        if wd is not None and self.watches.pop(wd, None) is not None:
+            self.libc.inotify_rm_watch(self.fd, wd)
+        #end
+    #end
+
+    def is_ignored(self, directory: str, name: str, path: str, is_dir: bool) -> bool:
+        if self.rules is None:
+            return False
+        #end
+        return (self.rules.is_excluded(self.dir_chains.get(directory, ()), name, path, is_dir) or
+                not (is_dir or self.rules.is_included(name, make_relative_path(path, self.base_length))))
+    #end
+
+    def add_tree(self, directory: str, emit: bool, chain: Tuple = ()) -> List[Tuple[str, str]]:
+        """Watch a directory tree, skipping ignored entries. If emit is set, a delta is returned for every file in it."""
+        deltas = []
+        stack = [(directory, chain)]
+        while stack:
+            current, chain = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    dir_entries = list(it)
+                #end
+            except OSError:
+                continue
+            #end
+            if self.rules is not None:
+                names = [entry.name for entry in dir_entries]
+                if self.rules.is_virtual_environment(names):
+                    continue
+                #end
+                chain = self.rules.extend_chain(chain, current, names)
+            #end
+
+            self.add_directory_watch(current)
+            self.dir_chains[current] = chain
+            files = self.dir_files.setdefault(current, set())
+            subdirs = self.dir_subdirs.setdefault(current, set())
+            for entry in dir_entries:
+                path = join_path(current, entry.name)
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if self.is_ignored(current, entry.name, path, is_dir):
+                        continue
+                    #end
+                    if is_dir:
+                        subdirs.add(path)
+                        stack.append((path, chain))
+                    elif emit and entry.is_file():
+                        files.add(path)
+                        deltas.append((DELTA_ADD, path))
+                    #end
+                except OSError:
+                    continue
+                #end
+            #end
+        #end
+        return deltas
+    #end
+
+    def remove_tree(self, directory: str) -> List[Tuple[str, str]]:
+        """Forget a directory tree and return a remove delta for every file that was in it."""
+        deltas = []
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            self.remove_directory_watch(current)
+            self.dir_chains.pop(current, None)
+            deltas.extend((DELTA_REMOVE, path) for path in self.dir_files.pop(current, ()))
+            stack.extend(self.dir_subdirs.pop(current, ()))
+        #end
+        self.dir_subdirs.get(self.parent(directory), set()).discard(directory)
+        return deltas
+    #end
+
+    def is_watched_file(self, directory: str, path: str) -> bool:
+        # Directories given as roots are watched recursively, file roots only for their own path
+        return directory in self.dir_subdirs or path in self.file_roots
+    #end
+
+    def poll(self, timeout: float = 0) -> List[Tuple[str, str]]:
+        """Return the deltas for the events received since the previous poll, waiting up to timeout seconds."""
+        if timeout and not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        #end
+
+        deltas = []
+        while True:
+            try:
+                data = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                break
+            #end
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = inotifyEventHeader.unpack_from(data, offset)
+                name = data[offset + inotifyEventHeader.size:offset + inotifyEventHeader.size + length].rstrip(b'\0')
+                offset += inotifyEventHeader.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    deltas.extend(self.resync())
+                    continue
+                #end
+                directory = self.watches.get(wd)
+                if directory is None:
+                    continue
+                #end
+                if mask & IN_IGNORED:
+                    del self.watches[wd]
+                    if self.watch_descriptors.get(directory) == wd:
+                        del self.watch_descriptors[directory]
+                    #end
+                    continue
+                #end
+                if not name:
+                    continue # Events on the watched directory itself are reported by its parent
+                #end
+
+                name = os.fsdecode(name)
+                path = join_path(directory, name) if directory else name
+                if mask & IN_ISDIR:
+                    if not self.recursive or directory not in self.dir_subdirs:
+                        continue
+                    #end
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        if self.is_ignored(directory, name, path, True):
+                            continue
+                        #end
+                        self.dir_subdirs[directory].add(path)
+                        deltas.extend(self.add_tree(path, emit=True, chain=self.dir_chains.get(directory, ())))
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        deltas.extend(self.remove_tree(path))
+                    #end
+                    continue
+                #end
+
+                if not self.is_watched_file(directory, path):
+                    continue
+                #end
+                if path not in self.file_roots and self.is_ignored(directory, name, path, False):
+                    continue
+                #end
+                files = self.dir_files.setdefault(directory, set())
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    files.add(path)
+                    deltas.append((DELTA_ADD, path))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    files.discard(path)
+                    deltas.append((DELTA_REMOVE, path))
+                elif mask & (IN_MODIFY | IN_CLOSE_WRITE | IN_ATTRIB):
+                    deltas.append((DELTA_MODIFY, path))
+                #end
+            #end
+        #end
+        return deltas
+    #end
+
+    def resync(self) -> List[Tuple[str, str]]:
+        """The event queue overflowed, compare the known files with a fresh scan."""
+        known = set()
+        for files in self.dir_files.values():
+            known.update(files)
+        #end
+        current = set(entry.path for entry in scan_paths(self.roots, self.recursive, rules=self.rules))
+        deltas = [(DELTA_REMOVE, path) for path in known - current]
+        deltas += [(DELTA_ADD, path) for path in current - known]
+        deltas += [(DELTA_MODIFY, path) for path in current & known]
+        self.dir_files = {}
+        for path in current:
+            self.dir_files.setdefault(self.parent(path), set()).add(path)
+        #end
+        return deltas
+    #end
+
+    def close(self) -> None:
+        os.close(self.fd)
+    #end
+#end
+
+def create_watcher(roots: List[str], recursive: bool, entries: List[ScanEntry], rules: IgnoreRules = None):
+    """Create an inotify watcher where possible, fall back to the polling watcher otherwise."""
+    roots = [root for root in roots if root]
+    try:
+        return InotifyWatcher(roots, recursive, entries, rules)
+    except OSError:
+        return PollingWatcher(roots, recursive, entries, rules)
+    #end
+#end
+
+## ================= Background watcher thread =================
+
+class BackgroundWatcher:
+    """Poll a watcher on a daemon thread and queue its deltas until the control loop collects them."""
+
+    def __init__(self, watcher, interval: float = 1.0):
+        self.watcher = watcher
+        self.interval = interval
+        self.deltas = queue.Queue()
+        self.stopEvent = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="FileWatcher", daemon=True)
+    #end
+
+    def start(self) -> "BackgroundWatcher":
+        self.thread.start()
+        return self
+    #end
+
+    def run(self) -> None:
+        while not self.stopEvent.is_set():
+            try:
+                deltas = self.watcher.poll(self.interval)
+            except OSError:
+                deltas = []
+            #end
+            for delta in deltas:
+                self.deltas.put(delta)
+            #end
+            if isinstance(self.watcher, PollingWatcher):
+                self.stopEvent.wait(self.interval)
+            #end
+        #end
+        self.watcher.close()
+    #end
+
+    def get_deltas(self) -> List[Tuple[str, str]]:
+        """Return (and clear) the coalesced deltas received so far."""
+        deltas = []
+        while True:
+            try:
+                deltas.append(self.deltas.get_nowait())
+            except queue.Empty:
+                break
+            #end
+        #end
+        return coalesce_deltas(deltas)
+    #end
+
+    def stop(self) -> None:
+        self.stopEvent.set()
+    #end
+#end
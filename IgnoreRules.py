@@ -0,0 +1,283 @@
+"""
+Ignore Rules
+
+Include/exclude glob patterns and .gitignore handling for the file scanner.
+
+The patterns use the .gitignore syntax ('*', '?', '[...]', '**', leading '/' to anchor, trailing '/' for
+directories only, '!' to re-include) and are compiled to regular expressions once. The scanner applies them
+while listing each directory, so excluded subtrees are never listed at all.
+
+Rules are kept as a chain of rule sets, one per .gitignore file (plus the command line and default rules at
+the root). A deeper rule set takes precedence over its parents and, within a set, the last matching pattern wins.
+"""
+
+import os
+import re
+from typing import List, Tuple, Optional
+
+# Directories that are excluded by default (version control, dependencies, build output and caches)
+defaultExcludedDirectories = (
+    ".git", ".hg", ".svn", "node_modules", "__pycache__", "build", ".venv", "venv",
+    ".tox", ".nox", ".mypy_cache", ".pytest_cache", ".ruff_cache",
+)
+
+# A directory holding this file is a Python virtual environment, whatever its name
+virtualEnvironmentMarker = "pyvenv.cfg"
+
+def glob_to_regex(pattern: str) -> str:
+    """Translate a .gitignore style glob (without the '!', leading '/' and trailing '/') to a regular expression."""
+    i, n = 0, len(pattern)
+    regex = ""
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern[i:i + 3] == "**/":
+                regex += "(?:.*/)?" # Zero or more directories
+                i += 3
+                continue
+            #end
+            if pattern[i:i + 2] == "**":
+                regex += ".*"
+                i += 2
+                continue
+            #end
+            regex += "[^/]*"
+        elif c == '?':
+            regex += "[^/]"
+        elif c == '[':
+            j = pattern.find(']', i + 2)
+            if j < 0:
+                regex += re.escape(c)
+            else:
+                body = pattern[i + 1:j]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                #end
+                regex += '[' + body.replace('\\', '\\\\') + ']'
+                i = j
+            #end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            regex += re.escape(pattern[i])
+        else:
+            regex += re.escape(c)
+        #end
+        i += 1
+    #end
+    return regex
+#end
+
+class IgnorePattern:
+    """A single compiled pattern."""
+    __slots__ = ("source", "regex", "negated", "dir_only", "anchored")
+
+    def __init__(self, source: str):
+        self.source = source
+        pattern = source
+        self.negated = pattern.startswith('!')
+        if self.negated:
+            pattern = pattern[1:]
+        #end
+        self.dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+        # A pattern with a slash (other than a trailing one) is relative to its base, otherwise it matches names
+        self.anchored = '/' in pattern
+        pattern = pattern.lstrip('/')
+        self.regex = re.compile(glob_to_regex(pattern) + r"\Z", re.DOTALL)
+    #end
+
+    def matches(self, name: str, relative_path: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        #end
+        return self.regex.match(relative_path if self.anchored else name) is not None
+    #end
+#end
+
+class IgnoreRuleSet:
+    """The patterns of one source (a .gitignore file, the command line, the defaults) and the directory they apply to."""
+    __slots__ = ("base", "anchor", "patterns", "name_filter", "path_filter")
+
+    def __init__(self, base: str, patterns: List[str], anchor: str = ""):
+        self.base = base # Directory prefix, with a trailing '/' (or "" for the working directory)
+        self.anchor = anchor # Path from the directory of the patterns to base, for the .gitignore of an ancestor
+        self.patterns = [IgnorePattern(pattern) for pattern in patterns]
+
+        # Combined prefilters, a path that matches neither cannot match any pattern of the set
+        name_regexes = [p.regex.pattern for p in self.patterns if not p.anchored]
+        path_regexes = [p.regex.pattern for p in self.patterns if p.anchored]
+        self.name_filter = re.compile("|".join(f"(?:{r})" for r in name_regexes), re.DOTALL) if name_regexes else None
+        self.path_filter = re.compile("|".join(f"(?:{r})" for r in path_regexes), re.DOTALL) if path_regexes else None
+    #end
+
+    def match(self, name: str, path: str, is_dir: bool) -> Optional[bool]:
+        """Return True if excluded, False if re-included and None if no pattern of the set matches."""
+        relative_path = self.anchor + path[len(self.base):] if self.anchor else path[len(self.base):]
+        if not ((self.name_filter and self.name_filter.match(name)) or
+                (self.path_filter and self.path_filter.match(relative_path))):
+            return None
+        #end
+        for pattern in reversed(self.patterns):
+            if pattern.matches(name, relative_path, is_dir):
+                return not pattern.negated
+            #end
+        #end
+        return None
+    #end
+#end
+
+def read_gitignore(path: str) -> List[str]:
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as file:
+            lines = file.read().splitlines()
+        #end
+    except OSError:
+        return []
+    #end
+    patterns = []
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith('#'):
+            continue
+        #end
+        patterns.append(line[1:] if line.startswith('\\#') or line.startswith('\\!') else line)
+    #end
+    return patterns
+#end
+
+def directory_prefix(directory: str) -> str:
+    return directory if not directory or directory.endswith('/') else directory + '/'
+#end
+
+def get_gitignore_signature(directory: str) -> Optional[Tuple[int, int]]:
+    """The size and mtime of the .gitignore of a directory, None if it has none."""
+    try:
+        stat = os.stat(directory_prefix(directory) + ".gitignore")
+    except OSError:
+        return None
+    #end
+    return (stat.st_size, stat.st_mtime_ns)
+#end
+
+def get_directory_signature(directory: str) -> Optional[Tuple[int, Optional[Tuple[int, int]]]]:
+    """
+    This function returns the mtime of a directory and the signature of its .gitignore, they change whenever its
+    listing or its rules do. None if the directory cannot be stat-ed.
+    """
+    try:
+        mtime = os.stat(directory or ".").st_mtime_ns
+    except OSError:
+        return None
+    #end
+    return (mtime, get_gitignore_signature(directory))
+#end
+
+class IgnoreRules:
+    """
+    The ignore configuration of a scan.
+
+    Args:
+        include_patterns (List[str]): If given, only the files matching one of these patterns are kept.
+        exclude_patterns (List[str]): Patterns excluded under every root.
+        use_gitignore (bool): Honour the .gitignore files found under (and above) the roots.
+        use_defaults (bool): Exclude the default directories and virtual environments.
+    """
+
+    def __init__(self, include_patterns: List[str] = (), exclude_patterns: List[str] = (),
+                 use_gitignore: bool = True, use_defaults: bool = True):
+        self.include_patterns = list(include_patterns)
+        self.exclude_patterns = list(exclude_patterns)
+        self.use_gitignore = use_gitignore
+        self.use_defaults = use_defaults
+        self.includes = IgnoreRuleSet("", self.include_patterns) if self.include_patterns else None
+    #end
+
+    def root_chain(self, root: str) -> Tuple[IgnoreRuleSet, ...]:
+        """The rule chain that applies at a root directory, before its own .gitignore is read."""
+        chain = []
+        base = directory_prefix(root)
+        if self.use_defaults:
+            chain.append(IgnoreRuleSet(base, [name + '/' for name in defaultExcludedDirectories]))
+        #end
+        if self.use_gitignore:
+            chain.extend(self.ancestor_rule_sets(root))
+        #end
+        if self.exclude_patterns:
+            chain.append(IgnoreRuleSet(base, self.exclude_patterns))
+        #end
+        return tuple(chain)
+    #end
+
+    def ancestor_rule_sets(self, root: str) -> List[IgnoreRuleSet]:
+        """The .gitignore files of the parent directories, up to the repository the root belongs to (if any)."""
+        rule_sets = []
+        absolute_root = os.path.abspath(root or ".")
+        prefix = directory_prefix(root)
+        directory = absolute_root
+        while not os.path.isdir(os.path.join(directory, ".git")):
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return [] # Not inside a repository
+            #end
+            directory = parent
+
+            # The patterns are anchored at the ancestor: the paths under the root as given (".", "./src", "../x")
+            # are matched with the normalised path of the root relative to the ancestor in place of their prefix
+            relative_root = os.path.relpath(absolute_root, directory).replace("\\", "/")
+            patterns = read_gitignore(os.path.join(directory, ".gitignore"))
+            if patterns:
+                rule_sets.insert(0, IgnoreRuleSet(prefix, patterns, relative_root + '/'))
+            #end
+        #end
+        return rule_sets
+    #end
+
+    def get_root_signature(self, root: str) -> Tuple:
+        """The configuration and the .gitignore files read by ancestor_rule_sets, they decide the rules at the root."""
+        signature = [tuple(self.include_patterns), tuple(self.exclude_patterns), self.use_gitignore, self.use_defaults,
+                     defaultExcludedDirectories]
+        directory = os.path.abspath(root or ".")
+        while self.use_gitignore and not os.path.isdir(os.path.join(directory, ".git")):
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                break
+            #end
+            directory = parent
+            signature.append(get_gitignore_signature(directory))
+        #end
+        return tuple(signature)
+    #end
+
+    def extend_chain(self, chain: Tuple[IgnoreRuleSet, ...], directory: str, names: List[str]) -> Tuple[IgnoreRuleSet, ...]:
+        """Add the .gitignore of a directory (if it has one among its names) to the chain."""
+        if self.use_gitignore and ".gitignore" in names:
+            patterns = read_gitignore(directory_prefix(directory) + ".gitignore")
+            if patterns:
+                return chain + (IgnoreRuleSet(directory_prefix(directory), patterns),)
+            #end
+        #end
+        return chain
+    #end
+
+    def is_virtual_environment(self, names: List[str]) -> bool:
+        return self.use_defaults and virtualEnvironmentMarker in names
+    #end
+
+    def is_excluded(self, chain: Tuple[IgnoreRuleSet, ...], name: str, path: str, is_dir: bool) -> bool:
+        for rule_set in reversed(chain):
+            excluded = rule_set.match(name, path, is_dir)
+            if excluded is not None:
+                return excluded
+            #end
+        #end
+        return False
+    #end
+
+    def is_included(self, name: str, relative_path: str) -> bool:
+        """Check a file against the include patterns, relative_path is relative to its root."""
+        if self.includes is None:
+            return True
+        #end
+        return self.includes.match(name, relative_path, False) is True
+    #end
+#end
@@ -0,0 +1,112 @@
+"""
+Part Export
+
+Writes the parts of the headless export (--export) to numbered files, with a JSON manifest describing them.
+
+Each group of parts (the per-file parts, the unified stream parts) gets a directory of its own, with the parts
+written as part_000001.txt, part_000002.txt, ... exactly as they would be copied to the clipboard (header, text and
+footer). A part is written as soon as it is made and the manifest entries are streamed to the manifest file as
+they come, so the memory held does not depend on the number or the size of the parts.
+"""
+
+import os
+import json
+import time
+from typing import Dict, List, Any
+
+from PartGenerator import Part
+
+exportPartFileName = "part_{:06d}.txt"
+exportManifestName = "manifest.json"
+exportWriteBufferSize = 1 << 20 # Bytes buffered per file written
+
+class PartExporter:
+    """
+    Writes the parts and the manifest of an export, use as a context manager (the manifest is completed on exit).
+
+    Args:
+        directory (str): The export directory, created if it does not exist.
+        settings (Dict[str, Any]): The settings of the export, recorded at the top of the manifest.
+    """
+
+    def __init__(self, directory: str, settings: Dict[str, Any]):
+        self.directory = directory
+        self.errors: List[Dict[str, str]] = []
+        self.counts: Dict[str, int] = {} # Parts written per group
+        self.characters: Dict[str, int] = {} # Characters written per group
+        self.summaries: Dict[str, Dict[str, Any]] = {} # Added to the totals of the group
+        os.makedirs(directory, exist_ok=True)
+
+        self.manifest = open(os.path.join(directory, exportManifestName), 'w', encoding='utf-8', buffering=exportWriteBufferSize)
+        header = dict(created=time.strftime('%Y-%m-%dT%H:%M:%S%z'), **settings)
+        self.manifest.write(json.dumps(header, indent=1)[:-2] + ',\n "parts": [')
+        self.first_entry = True
+    #end
+
+    def start_group(self, group: str) -> None:
+        """Create the directory of a group, the parts of a previous export to it are removed."""
+        group_directory = os.path.join(self.directory, group)
+        os.makedirs(group_directory, exist_ok=True)
+        for name in os.listdir(group_directory):
+            if name.startswith("part_") and name.endswith(".txt"):
+                os.remove(os.path.join(group_directory, name))
+            #end
+        #end
+        self.counts[group] = 0
+        self.characters[group] = 0
+    #end
+
+    def write_part(self, group: str, part: Part) -> str:
+        """
+        This function writes a part to the next numbered file of its group and adds it to the manifest.
+
+        Args:
+            group (str): The group of the part, also the directory it is written to (see start_group).
+            part (Part): The part.
+
+        Returns:
+            str: The path of the written file, relative to the export directory.
+        """
+        number = self.counts[group] + 1
+        relative_path = f"{group}/{exportPartFileName.format(number)}"
+        with open(os.path.join(self.directory, relative_path), 'w', encoding='utf-8', newline='\n',
+                  buffering=exportWriteBufferSize) as file:
+            file.write(part.text)
+        #end
+        self.counts[group] = number
+        self.characters[group] += len(part.text)
+
+        entry = {"file": relative_path, "group": group, "source": part.source, "part": part.part_n, "parts": part.tot_parts,
+                 "characters": len(part.text), "start": part.start, "stop": part.stop, "files": part.files}
+        self.manifest.write(("\n  " if self.first_entry else ",\n  ") + json.dumps(entry))
+        self.first_entry = False
+        return relative_path
+    #end
+
+    def add_error(self, group: str, source: str, error: str) -> None:
+        self.errors.append({"group": group, "source": source, "error": error})
+    #end
+
+    def add_summary(self, group: str, summary: Dict[str, Any]) -> None:
+        self.summaries.setdefault(group, {}).update(summary)
+    #end
+
+    def close(self) -> None:
+        """Complete the manifest with the errors and the totals per group."""
+        if self.manifest.closed:
+            return
+        #end
+        totals = {group: {"parts": count, "characters": self.characters[group], **self.summaries.get(group, {})}
+                  for group, count in self.counts.items()}
+        self.manifest.write("\n ],\n \"errors\": " + json.dumps(self.errors) + ",\n \"totals\": " + json.dumps(totals) + "\n}\n")
+        self.manifest.close()
+    #end
+
+    def __enter__(self) -> "PartExporter":
+        return self
+    #end
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    #end
+#end
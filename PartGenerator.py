@@ -0,0 +1,724 @@
+"""
+Part Generator
+
+Scanning of the inputs and generation of the parts: of each file, of the unified stream of all the files, and of
+the changes since a snapshot. The tool (main.py) builds its views and its headless export (--export) on these
+functions, and the PartStream library API uses them directly, without the console or the interactive dependencies.
+
+The functions read the control states they depend on from a CTL argument: the ControlStructure of the tool, or a
+PartSettings with the same attributes for the callers without one. They never touch the terminal.
+"""
+
+import os
+import itertools
+from array import array
+from typing import List, Dict, Tuple, Callable, Optional, Iterator, Any
+
+from IgnoreRules import IgnoreRules
+from FileScanner import scan_paths, FileClassifier, ScanEntry
+from FileRecordStore import FileRecordStore
+from DirectoryTree import DirectoryTree
+from TableRenderer import FixedWidthTable
+from TextPartition import fit_parts, compute_part_text_limit, SegmentPartitioner, get_line_ends, iter_chunked_parts
+from TextDecoding import detect_file_encoding, iter_decoded_chunks
+from PartIndex import FilePartIndex
+from FileSnapshot import SnapshotEntry, is_unchanged, compare_snapshots
+from ScanIndex import (open_scan_indexes, match_scan_indexes, update_scan_indexes, get_index_root, compute_content_hash,
+                       get_listing_signatures, load_indexed_scan, save_scan_listings)
+
+# Part modes
+PARTS_FILES = "files" # The parts of each text file, as the file view shows them
+PARTS_UNIFIED = "unified" # The parts of the unified stream of all the files, as the unified continuous mode shows them
+PARTS_DELTA = "delta" # The parts of the files added or modified since a snapshot, with the list of the changes
+
+class Part:
+    """
+    A part, and where its content comes from.
+
+    Args:
+        text (str): The part as it is copied: header, content and footer.
+        source (str): The file the part belongs to, or the name of the unified stream.
+        part_n (int): The number of the part within its source, starting from 1.
+        tot_parts (int): The number of parts of its source.
+        start (int): The character offset of the content of the part within its source.
+        stop (int): The character offset of the end of the content within its source.
+        files (List[Tuple[str, int, int]]): The (path, start, stop) character range of each file whose content is in
+            the part, the offsets within the decoded text of the file.
+    """
+    __slots__ = ("text", "source", "part_n", "tot_parts", "start", "stop", "files")
+
+    def __init__(self, text: str, source: str, part_n: int, tot_parts: int, start: int, stop: int,
+                 files: List[Tuple[str, int, int]]):
+        self.text = text
+        self.source = source
+        self.part_n = part_n
+        self.tot_parts = tot_parts
+        self.start = start
+        self.stop = stop
+        self.files = files
+    #end
+
+    def __repr__(self) -> str:
+        return f"Part({self.source!r}, {self.part_n}/{self.tot_parts}, [{self.start}, {self.stop}), {len(self.files)} file(s))"
+    #end
+#end
+
+## ================= Settings =================
+
+class Setting:
+    """A control state of PartSettings (the tool uses its ControlStateVariable)."""
+    __slots__ = ("state", "options")
+
+    def __init__(self, state: Any, options: Optional[List[Any]] = None):
+        self.state = state
+        self.options = options
+    #end
+#end
+
+class PartSettings:
+    """
+    The control states the scan and the parts depend on, with the defaults of the tool. The ControlStructure of the
+    tool has the same attributes and can be passed in its place.
+
+    Args:
+        limit (int): The character limit of a part, header and footer included.
+        simple_headers (bool): Use the simple headers and footers.
+        absolute_paths (bool): Show the absolute paths of the files instead of the paths relative to the inputs.
+        binary (bool): List the binary files in the directory structure of the unified stream.
+        deduplicate (bool): Show the files with the same content as an earlier file as a reference to it in the
+            unified stream.
+        recursive (bool): Scan the directories recursively.
+        directory_view_mode (str): The directory listing of the unified stream, "Tree", "List" or "Table".
+    """
+
+    def __init__(self, limit: int = 4096, simple_headers: bool = False, absolute_paths: bool = True, binary: bool = True,
+                 deduplicate: bool = True, recursive: bool = True, directory_view_mode: str = "Tree"):
+        self.Limit = Setting(limit)
+        self.SimpleHeaderFooter = Setting(simple_headers)
+        self.AbsolutePath = Setting(absolute_paths)
+        self.Binary = Setting(binary)
+        self.Deduplicate = Setting(deduplicate)
+        self.Recursive = Setting(recursive)
+        self.DirectoryViewMode = Setting(directory_view_mode, ["Tree", "List", "Table"])
+        self.Partition = Setting(True)
+        self.Continuous = Setting(False)
+    #end
+#end
+
+## ================= Input scan =================
+
+persistent_file_classifier = FileClassifier()
+persistent_scan_indexes = {} # Open scan indexes by index root
+
+def scan_files(paths: List[str], recursive: bool = True, rules: Optional[IgnoreRules] = None, scan_index: bool = True,
+               index_directory: Optional[str] = None, progress_callback: Optional[Callable[[str, int, int, str], None]] = None,
+               keep_entries: bool = True) -> Tuple[FileRecordStore, Optional[List[ScanEntry]]]:
+    """
+    This function scans the input paths and classifies the files found into a file record store.
+
+    Args:
+        paths (List[str]): The sanitized input paths. Invalid (None) paths are ignored.
+        recursive (bool): If False only the file paths given directly are kept.
+        rules (Optional[IgnoreRules]): Include/exclude rules applied while walking the directories.
+        scan_index (bool): Use the persistent scan index of each root, for the types and hashes of the unchanged files.
+        index_directory (Optional[str]): The directory of the scan index files, the user cache directory if None.
+        progress_callback (Optional[Callable[[str, int, int, str], None]]): Called as (stage, processed, total, path).
+        keep_entries (bool): Return the scanned entries (for the watcher), a scan served by the index only makes
+            them if asked to.
+
+    Returns:
+        Tuple[FileRecordStore, Optional[List[ScanEntry]]]: The file record store, and the scanned entries (None if
+            not kept).
+    """
+    progress = progress_callback or (lambda stage, processed, total, path: None)
+
+    # The persistent index serves the roots none of whose directories changed since the last walk, the files are
+    # only stat-ed
+    indexes = {}
+    signatures = None
+    if scan_index:
+        indexes = open_scan_indexes(paths, persistent_scan_indexes, index_directory)
+        if recursive:
+            signatures = get_listing_signatures(paths, rules)
+            indexed = load_indexed_scan(indexes, paths, signatures, persistent_file_classifier.classify, keep_entries)
+            if indexed is not None:
+                return indexed
+            #end
+        #end
+    #end
+
+    # Walk the directories (in parallel) and collect the files in a deterministic order, pruning ignored subtrees
+    directories = {} if signatures is not None else None
+    entries = scan_paths(paths, recursive, progress_callback=lambda path, listed, total: progress("Scan", listed, total, path),
+                         rules=rules, directories=directories)
+
+    # The persistent index already knows the types of the files that did not change since the last session
+    known_types = match_scan_indexes(indexes, paths, entries) if indexes else None
+
+    # Classify the files, unchanged files are answered from the memo without being read again
+    file_types = persistent_file_classifier.classify(entries,
+                         progress_callback=lambda path, classified, total: progress("Classification", classified, total, path),
+                         known_types=known_types)
+
+    if indexes:
+        update_scan_indexes(indexes, paths, entries, file_types, known_types, recursive)
+        if signatures is not None:
+            save_scan_listings(indexes, paths, signatures, entries, file_types, directories)
+        #end
+    #end
+
+    # Compile the columnar file record store, the paths are only joined again when rendered
+    return FileRecordStore.from_scan(entries, file_types, paths), entries if keep_entries else None
+#end
+
+def get_file_encoding(file_structures: FileRecordStore, slot: int) -> str:
+    """
+    This function returns the encoding of a text file, detecting it from its BOM or a sample on first use.
+    The detected encoding is kept in the file records until the file changes.
+
+    Args:
+        file_structures (FileRecordStore): The file record store.
+        slot (int): The slot of the file.
+
+    Returns:
+        str: The encoding to read the file with.
+    """
+    encoding = file_structures.get_encoding(slot)
+    if encoding is None:
+        encoding = detect_file_encoding(file_structures.absolute_path(slot))
+        file_structures.set_encoding(slot, encoding)
+    #end
+    return encoding
+#end
+
+## ================= Directory listing =================
+
+persistent_directory_trees = {}# DirectoryTree by (absolute path, include binary), kept in sync with the file record store
+
+def get_directory_tree(file_structures: FileRecordStore, CTL: PartSettings) -> DirectoryTree:
+    tree_key = (CTL.AbsolutePath.state, CTL.Binary.state)
+    if tree_key not in persistent_directory_trees:
+        persistent_directory_trees[tree_key] = DirectoryTree(*tree_key)
+    #end
+    tree = persistent_directory_trees[tree_key]
+    tree.attach(file_structures) # Applies the changes of a rescan, if any
+    return tree
+#end
+
+def get_directory_renderer(file_structures: FileRecordStore, CTL: PartSettings) -> Tuple[int, Callable[[int, int], str], int]:
+    """
+    This function prepares the directory view of the current DirectoryViewMode.
+
+    Args:
+        file_structures (FileRecordStore): The file record store.
+        CTL (PartSettings): The control states (or the ControlStructure of the tool).
+
+    Returns:
+        Tuple[int, Callable[[int, int], str], int]: The number of rows, the function that renders the [first, last)
+            rows, and the number of lines a row takes (to size the pages of the viewport).
+    """
+    # Filter out binary files if Binary is set to False
+    slots = file_structures.view(CTL.Binary.state)
+
+    # Choose the path to display based on the AbsolutePath setting
+    absolute = CTL.AbsolutePath.state
+
+    # Each view gives the number of rows and renders a [first, last) range of them, only the visible page is rendered
+    row_lines = 1
+    if CTL.DirectoryViewMode.state == CTL.DirectoryViewMode.options[0]:  # Tree
+        # Print as a tree, the tree model is cached and updated as the files change
+        tree = get_directory_tree(file_structures, CTL)
+        total = len(tree)
+        render = lambda first, last: "\n".join(tree.render() if (first, last) == (0, total) else tree.iter_lines(first, last))
+
+    elif CTL.DirectoryViewMode.state == CTL.DirectoryViewMode.options[1]:  # List
+        # Print as a list
+        total = len(slots)
+        to_line = lambda slot: f"[{file_structures.file_type(slot)}] {file_structures.display_path(slot, absolute)}"
+        render = lambda first, last: "\n".join(map(to_line, slots.order[first:last]))
+
+    elif CTL.DirectoryViewMode.state == CTL.DirectoryViewMode.options[2]:  # Table
+        # Print as a table, the column widths come from the maximum path length maintained by the store
+        table = FixedWidthTable(["Type", "Path"], [3, file_structures.max_path_length(CTL.Binary.state, absolute)])
+        total = len(slots)
+        to_row = lambda slot: (file_structures.file_type(slot), file_structures.display_path(slot, absolute))
+        render = lambda first, last: table.render(map(to_row, slots.order[first:last]))
+        row_lines = 2 # Each row takes two lines with its separator
+
+    else:
+        raise Exception("Invalid DirectoryViewMode state")
+    #end
+    return total, render, row_lines
+#end
+
+## ================= Headers and footers =================
+
+def compute_header_footer(CTL: PartSettings, file_path: str, part_n: int = None, tot_parts: int = None) -> Tuple[str, str]:
+    """
+    This function computes and returns the header and footer strings.
+
+    Args:
+        CTL (PartSettings): The control states (or the ControlStructure of the tool).
+        file_path (str): The path to the file.
+        part_n: int = 0 Default total file parts 
+        tot_parts: int = 0 Default file part 
+
+    Returns:
+        Tuple[str, str]: The header and footer strings.
+    """
+    part_info = None
+    if CTL.Partition.state:
+        if tot_parts is None or part_n is None:
+            tot_parts = CTL.currentFile_TotalParts
+            part_n = CTL.currentFile_CurrentPart
+        #end
+        part_info = f'Part {part_n}/{tot_parts}'
+    #end
+
+    if CTL.Continuous.state:
+        stream = "Text Stream"
+    else:
+        stream = "File"
+    #end
+
+    if CTL.SimpleHeaderFooter.state:    
+        header = f'{stream}: "{file_path}" {part_info if part_info else ""}:\n"\n'
+        footer = f'"'
+    else:
+        header = f'{stream}: "{file_path}"\n--- Beginning of {stream} {part_info if part_info else ""} ---\n'
+        footer = f'\n--- End of {stream} {part_info if part_info else ""} ---\n'
+    #end
+
+    return header, footer
+#end
+
+partNewlineCount = 3 # The '\n' after the header, the text and the footer of a part (see printTextPart)
+
+def get_header_footer_overhead(CTL: PartSettings, file_path: str) -> Callable[[int], int]:
+    """
+    This function computes the header plus footer length of part p of p, for the partition engine.
+    The length only depends on the number of digits of p, so it is computed once per digit count up front,
+    and the returned function does not read the control structure (it can be called from the prefetcher).
+    The header, the text and the footer are each followed by a '\n' in the copied part, those are counted too.
+
+    Args:
+        CTL (PartSettings): The control states (or the ControlStructure of the tool).
+        file_path (str): The path shown in the header.
+
+    Returns:
+        Callable[[int], int]: The overhead of part p of p.
+    """
+    lengths = [sum(map(len, compute_header_footer(CTL, file_path, 10**digits - 1, 10**digits - 1))) + partNewlineCount
+               for digits in range(1, 19)]
+    return lambda p: lengths[len(str(p)) - 1]
+#end
+
+def call_with_part_states(CTL: PartSettings, partition: bool, continuous: bool, function: Callable, *args):
+    """
+    This function calls function(CTL, *args) with the Partition and Continuous states set, for the headers and
+    footers of a given kind of part, and restores the previous states (those of the tool) even if it raises.
+
+    Args:
+        CTL (PartSettings): The control states (or the ControlStructure of the tool).
+        partition (bool): The Partition state of the call.
+        continuous (bool): The Continuous state of the call.
+        function (Callable): The function, compute_header_footer or get_header_footer_overhead.
+
+    Returns:
+        The result of the function.
+    """
+    states = (CTL.Partition.state, CTL.Continuous.state)
+    CTL.Partition.state, CTL.Continuous.state = partition, continuous
+    try:
+        return function(CTL, *args)
+    finally:
+        CTL.Partition.state, CTL.Continuous.state = states
+    #end
+#end
+
+## ================= Unified stream =================
+
+unifiedStreamName = "Continuous file stream." # The name shown in the headers of the unified stream parts
+
+def get_unified_preamble(file_structures: FileRecordStore, CTL: PartSettings) -> str:
+    """The start of the unified stream, before the files: the directory file structure."""
+    separator = get_unified_separator(CTL)
+    total, render, _ = get_directory_renderer(file_structures, CTL)
+    listing = render(0, total)
+    return (f"{separator}File structure:{separator}\n" + (listing + "\n" if listing else "") +
+            f"{separator}File(s) Content:{separator}\n")
+#end
+
+def get_unified_separator(CTL: PartSettings) -> str:
+    return '\n' + (0 if CTL.SimpleHeaderFooter.state else 30) * '=' + '\n'
+#end
+
+def get_unified_file_framing(file_structures: FileRecordStore, slot: int, CTL: PartSettings,
+                             duplicate_of: int = None) -> Tuple[str, str]:
+    """
+    This function computes the text before and after a file in the unified stream.
+    The file header and footer are the ones of a whole file (partition and continuous states off).
+
+    Args:
+        file_structures (FileRecordStore): The file record store.
+        slot (int): The slot of the file.
+        CTL (PartSettings): The control states (or the ControlStructure of the tool).
+        duplicate_of (int): The slot of the earlier file with the same content, if the file is shown as a reference to it.
+
+    Returns:
+        Tuple[str, str]: The text before the file content and the text after it, a binary file or a duplicate is
+            only a line before.
+    """
+    file_path = file_structures.absolute_path(slot)
+    if file_structures.is_binary(slot):
+        return f"{get_unified_separator(CTL)}[INFO] binary file: {file_path}\n", ""
+    #end
+    if duplicate_of is not None:
+        return f"{get_unified_separator(CTL)}[INFO] duplicate file: {file_path} (same content as: {file_structures.absolute_path(duplicate_of)})\n", ""
+    #end
+    header, footer = call_with_part_states(CTL, False, False, compute_header_footer, file_path)
+    return get_unified_separator(CTL) + header, footer + "\n"
+#end
+
+# The content hash of the files hashed for the deduplication, as path -> ((size, mtime_ns), hash)
+persistent_content_hashes: Dict[str, Tuple[Tuple[int, int], Optional[str]]] = {}
+
+def get_content_hash(file_structures: FileRecordStore, slot: int) -> Optional[str]:
+    """
+    This function returns the content hash of a file, from the session, else from the scan index of its root (which
+    keeps the hashes across sessions), else streamed through SHA-1.
+
+    Args:
+        file_structures (FileRecordStore): The file record store.
+        slot (int): The slot of the file.
+
+    Returns:
+        Optional[str]: The hex digest, or None if the file cannot be read.
+    """
+    file_path = file_structures.absolute_path(slot)
+    validator = (file_structures.sizes[slot], file_structures.mtimes[slot])
+    cached = persistent_content_hashes.get(file_path)
+    if cached is not None and cached[0] == validator:
+        return cached[1]
+    #end
+    index = persistent_scan_indexes.get(get_index_root(file_structures.roots[file_structures.root_column[slot]]))
+    if index is not None:
+        content_hash = index.get_content_hash(file_path)
+    else:
+        try:
+            content_hash = compute_content_hash(file_path)
+        except OSError:
+            content_hash = None
+        #end
+    #end
+    persistent_content_hashes[file_path] = (validator, content_hash)
+    return content_hash
+#end
+
+def find_duplicate_files(file_structures: FileRecordStore, slots: List[int]) -> Dict[int, int]:
+    """
+    This function finds the text files with the same content as an earlier file of the list.
+    Only the files of the same size as another one are hashed, a file of a unique size cannot be a duplicate.
+
+    Args:
+        file_structures (FileRecordStore): The file record store.
+        slots (List[int]): The files, in stream order.
+
+    Returns:
+        Dict[int, int]: The slot of the first file with the same content, by slot of each duplicate.
+    """
+    slots_by_size: Dict[int, List[int]] = {}
+    for slot in slots:
+        if not file_structures.is_binary(slot) and file_structures.sizes[slot]:
+            slots_by_size.setdefault(file_structures.sizes[slot], []).append(slot)
+        #end
+    #end
+    duplicates = {}
+    for same_size in slots_by_size.values():
+        if len(same_size) < 2:
+            continue
+        #end
+        first_by_hash = {}
+        for slot in same_size:
+            content_hash = get_content_hash(file_structures, slot)
+            if content_hash is None:
+                continue
+            #end
+            first = first_by_hash.setdefault(content_hash, slot)
+            if first != slot:
+                duplicates[slot] = first
+            #end
+        #end
+    #end
+    return duplicates
+#end
+
+def get_deduplication_summary(duplicates: Dict[int, int], file_structures: FileRecordStore, saved_characters: int,
+                              text_length: int, CTL: PartSettings) -> Dict[str, int]:
+    """
+    The files, bytes, characters and (about) parts at the current limit saved by the deduplication of a unified stream.
+    The characters saved are negative when the references are longer than the small files they stand for.
+    """
+    overhead = call_with_part_states(CTL, True, True, get_header_footer_overhead, unifiedStreamName)
+    try:
+        text_limit, _ = compute_part_text_limit(text_length, CTL.Limit.state, overhead)
+    except ValueError: # The limit cannot hold a part, reported when the stream is partitioned
+        text_limit = 0
+    #end
+    return {"duplicates": len(duplicates), "saved_bytes": sum(file_structures.sizes[slot] for slot in duplicates),
+            "saved_characters": saved_characters, "saved_parts": max(saved_characters, 0) // text_limit if text_limit else 0}
+#end
+
+## ================= Parts =================
+
+def iter_file_parts(file_structures: FileRecordStore, CTL: PartSettings, errors: List[Tuple[str, str]]) -> Iterator[Part]:
+    """
+    This function makes the parts of every text file, as the file view shows them with partitioning on.
+    Each file is read a part at a time through its part index, so only one part is held in memory.
+
+    Args:
+        file_structures (FileRecordStore): The file record store.
+        CTL (PartSettings): The control states (or the ControlStructure of the tool).
+        errors (List[Tuple[str, str]]): The (path, error) of the files that could not be read are added to it.
+
+    Returns:
+        Iterator[Part]: The parts of each file in turn, the offsets within the file.
+    """
+    for slot in file_structures.view(False):
+        file_path = file_structures.absolute_path(slot)
+        display_path = file_structures.display_path(slot, CTL.AbsolutePath.state)
+        try:
+            encoding = get_file_encoding(file_structures, slot)
+            index = FilePartIndex(file_path, os.stat(file_path), encoding)
+            if index.encoding != encoding: # It did not decode past the detection sample
+                file_structures.set_encoding(slot, index.encoding)
+            #end
+            overhead = call_with_part_states(CTL, True, False, get_header_footer_overhead, display_path)
+            _, starts = fit_parts(index.total_chars, CTL.Limit.state, overhead, index.part_starts)
+            tot_parts = len(starts) - 1
+            for part_n in range(1, tot_parts + 1):
+                header, footer = call_with_part_states(CTL, True, False, compute_header_footer, display_path, part_n, tot_parts)
+                start, stop = starts[part_n - 1], min(starts[part_n], index.total_chars)
+                yield Part(f"{header}\n{index.read_part(starts, part_n)}\n{footer}\n", display_path, part_n, tot_parts,
+                           start, stop, [(display_path, start, stop)])
+            #end
+        except Exception as e:
+            errors.append((display_path, str(e)))
+        #end
+    #end
+#end
+
+def iter_unified_parts(file_structures: FileRecordStore, CTL: PartSettings, errors: List[Tuple[str, str]],
+                       summary: Optional[Dict[str, int]] = None, slots: Optional[List[int]] = None,
+                       preamble: Optional[str] = None, stream_name: str = unifiedStreamName) -> Iterator[Part]:
+    """
+    This function makes the parts of the unified stream, the same as the unified continuous mode shows them, without
+    holding the stream in memory.
+    A first pass partitions the stream from the part indexes of the files (their line offsets) and the framing text,
+    the second one streams the decoded files and cuts them into the parts. The first pass is repeated in the rare
+    cases where the number of parts changes the header length (see fit_parts).
+
+    Args:
+        file_structures (FileRecordStore): The file record store.
+        CTL (PartSettings): The control states (or the ControlStructure of the tool).
+        errors (List[Tuple[str, str]]): The (path, error) of the files that could not be read are added to it, the
+            files are left out of the stream, as in the unified continuous mode.
+        summary (Optional[Dict[str, int]]): The deduplication summary (see get_deduplication_summary) is written to it.
+        slots (Optional[List[int]]): The files of the stream, all of them if None.
+        preamble (Optional[str]): The text before the files, the directory file structure if None.
+        stream_name (str): The name shown in the headers of the parts.
+
+    Returns:
+        Iterator[Part]: The parts of the stream, the offsets within the stream, and within the files for their files.
+    """
+    preamble = get_unified_preamble(file_structures, CTL) if preamble is None else preamble
+    slots = list(file_structures.view()) if slots is None else slots
+    duplicates = find_duplicate_files(file_structures, slots) if CTL.Deduplicate.state else {}
+    failed = {}
+    bodies = [] # The (path, start, stop) range of the content of each text file in the stream
+    saved_characters = [0]
+
+    def partition(text_limit: int) -> array:
+        bodies.clear()
+        body_lengths = {} # Of the files that have duplicates
+        saved_characters[0] = 0
+        partitioner = SegmentPartitioner(text_limit)
+        add_text = lambda text: partitioner.add(len(text), get_line_ends(text))
+        add_text(preamble)
+        for slot in slots:
+            prefix, suffix = get_unified_file_framing(file_structures, slot, CTL)
+            if slot in duplicates:
+                reference = get_unified_file_framing(file_structures, slot, CTL, duplicates[slot])[0]
+                add_text(reference)
+                if duplicates[slot] in body_lengths:
+                    saved_characters[0] += len(prefix) + body_lengths[duplicates[slot]] + len(suffix) - len(reference)
+                #end
+                continue
+            #end
+            if file_structures.is_binary(slot):
+                add_text(prefix)
+                continue
+            #end
+            try:
+                file_path = file_structures.absolute_path(slot)
+                encoding = get_file_encoding(file_structures, slot)
+                index = FilePartIndex(file_path, os.stat(file_path), encoding)
+                file_structures.set_encoding(slot, index.encoding) # The one the file decodes with, for the second pass
+            except Exception as e:
+                failed[slot] = str(e)
+                continue
+            #end
+            add_text(prefix)
+            body_lengths[slot] = index.total_chars
+            bodies.append((file_structures.display_path(slot, CTL.AbsolutePath.state), partitioner.length,
+                           partitioner.length + index.total_chars))
+            partitioner.add(index.total_chars, (index.line_chars or index.line_bytes)[1:])
+            add_text(suffix)
+        #end
+        return partitioner.finish()
+    #end
+
+    # The first guess of the stream length only sets the number of digits of the part numbers
+    overhead = call_with_part_states(CTL, True, True, get_header_footer_overhead, stream_name)
+    text_length = len(preamble) + sum(file_structures.sizes[slot] for slot in slots if slot not in duplicates)
+    min_parts = 1
+    while True:
+        text_limit, max_parts = compute_part_text_limit(text_length, CTL.Limit.state, overhead, min_parts)
+        starts = partition(text_limit)
+        text_length = starts[-1] - 1
+        if compute_part_text_limit(text_length, CTL.Limit.state, overhead, min_parts)[0] != text_limit:
+            continue # The guess was off by a digit
+        #end
+        if len(starts) - 1 <= max_parts:
+            break
+        #end
+        min_parts = len(starts) - 1
+    #end
+    errors.extend((file_structures.absolute_path(slot), error) for slot, error in failed.items())
+    if summary is not None:
+        summary.update(get_deduplication_summary(duplicates, file_structures, saved_characters[0], text_length, CTL))
+    #end
+
+    def iter_chunks() -> Iterator[str]:
+        yield preamble
+        for slot in slots:
+            if slot in failed:
+                continue
+            #end
+            if slot in duplicates:
+                yield get_unified_file_framing(file_structures, slot, CTL, duplicates[slot])[0]
+                continue
+            #end
+            prefix, suffix = get_unified_file_framing(file_structures, slot, CTL)
+            yield prefix
+            if not file_structures.is_binary(slot):
+                yield from iter_decoded_chunks(file_structures.absolute_path(slot), file_structures.get_encoding(slot), 'replace')
+                yield suffix
+            #end
+        #end
+    #end
+
+    tot_parts = len(starts) - 1
+    first_body = 0 # The first file not entirely before the part, the parts come in stream order
+    for part_n, text in enumerate(iter_chunked_parts(iter_chunks(), starts), 1):
+        start, stop = starts[part_n - 1], min(starts[part_n], text_length)
+        while first_body < len(bodies) and bodies[first_body][2] <= start:
+            first_body += 1
+        #end
+        files = []
+        for path, body_start, body_stop in itertools.islice(bodies, first_body, None):
+            if body_start >= stop:
+                break
+            #end
+            if body_stop > body_start:
+                files.append((path, max(start, body_start) - body_start, min(stop, body_stop) - body_start))
+            #end
+        #end
+        header, footer = call_with_part_states(CTL, True, True, compute_header_footer, stream_name, part_n, tot_parts)
+        yield Part(f"{header}\n{text}\n{footer}\n", stream_name, part_n, tot_parts, start, stop, files)
+    #end
+#end
+
+deltaStreamName = "Changes since snapshot." # The name shown in the headers of the delta parts
+
+def make_snapshot(file_structures: FileRecordStore, previous: Dict[str, SnapshotEntry]) -> Dict[str, SnapshotEntry]:
+    """
+    This function records the size, mtime, content hash and type of every file, by relative path.
+    Only the files whose size or mtime differ from the previous snapshot are hashed (through the scan index).
+
+    Args:
+        file_structures (FileRecordStore): The file record store.
+        previous (Dict[str, SnapshotEntry]): The entries of the previous snapshot, empty if there is none.
+
+    Returns:
+        Dict[str, SnapshotEntry]: The entries of the files, in scan order.
+    """
+    files = {}
+    for slot in file_structures.view():
+        relative_path = file_structures.relative_path(slot)
+        size, mtime_ns = file_structures.sizes[slot], file_structures.mtimes[slot]
+        previous_entry = previous.get(relative_path)
+        content_hash = previous_entry[2] if is_unchanged(previous_entry, size, mtime_ns) else get_content_hash(file_structures, slot)
+        files[relative_path] = (size, mtime_ns, content_hash, file_structures.file_type(slot))
+    #end
+    return files
+#end
+
+def iter_delta_parts(file_structures: FileRecordStore, CTL: PartSettings, errors: List[Tuple[str, str]],
+                     snapshot: Optional[Tuple[str, Dict[str, SnapshotEntry]]], current: Dict[str, SnapshotEntry],
+                     summary: Optional[Dict[str, int]] = None) -> Iterator[Part]:
+    """
+    This function makes the parts of the changes since a snapshot: the list of the added, modified and deleted files,
+    then the content of the added and modified files, framed as in the unified stream.
+
+    Args:
+        file_structures (FileRecordStore): The file record store.
+        CTL (PartSettings): The control states (or the ControlStructure of the tool).
+        errors (List[Tuple[str, str]]): The (path, error) of the files that could not be read are added to it.
+        snapshot (Optional[Tuple[str, Dict[str, SnapshotEntry]]]): The previous snapshot (see load_snapshot), all the
+            files are added if None.
+        current (Dict[str, SnapshotEntry]): The snapshot of the current files (see make_snapshot).
+        summary (Optional[Dict[str, int]]): The number of added, modified, deleted and unchanged files is written to it.
+
+    Returns:
+        Iterator[Part]: The parts of the changes.
+    """
+    created, previous = snapshot if snapshot is not None else ("(none)", {})
+    added, modified, deleted = compare_snapshots(previous, current)
+    changed = set(added) | set(modified)
+    slots = [slot for slot in file_structures.view() if file_structures.relative_path(slot) in changed]
+
+    separator = get_unified_separator(CTL)
+    changes = [f"[added] {path}" for path in added] + [f"[modified] {path}" for path in modified] + [f"[deleted] {path}" for path in deleted]
+    preamble = (f"{separator}Changes since the snapshot of {created}:{separator}\n" + "".join(line + "\n" for line in changes) +
+                f"{separator}Changed File(s) Content:{separator}\n")
+    if summary is not None:
+        summary.update(added=len(added), modified=len(modified), deleted=len(deleted), unchanged=len(current) - len(changed))
+    #end
+    yield from iter_unified_parts(file_structures, CTL, errors, summary, slots, preamble, deltaStreamName)
+#end
+
+def check_export_limit(file_structures: FileRecordStore, groups: List[str], CTL: PartSettings) -> None:
+    """
+    This function checks that the limit holds the header and footer of the parts of every group, before anything
+    is written: of the file with the longest path for the parts of each file, of the stream name for the others.
+
+    Args:
+        file_structures (FileRecordStore): The file record store.
+        groups (List[str]): The parts to export, PARTS_FILES, PARTS_UNIFIED and/or PARTS_DELTA.
+        CTL (PartSettings): The settings of the export.
+
+    Raises:
+        ValueError: If the limit is not larger than the header and footer of a part.
+    """
+    if PARTS_FILES in groups and file_structures.count_type("txt"):
+        longest = max(file_structures.view(False), key=lambda slot: file_structures.path_length(slot, CTL.AbsolutePath.state))
+        display_path = file_structures.display_path(longest, CTL.AbsolutePath.state)
+        compute_part_text_limit(0, CTL.Limit.state, call_with_part_states(CTL, True, False, get_header_footer_overhead, display_path))
+    #end
+    for group, stream_name in ((PARTS_UNIFIED, unifiedStreamName), (PARTS_DELTA, deltaStreamName)):
+        if group in groups:
+            compute_part_text_limit(0, CTL.Limit.state, call_with_part_states(CTL, True, True, get_header_footer_overhead, stream_name))
+        #end
+    #end
+#end
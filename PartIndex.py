@@ -0,0 +1,252 @@
+"""
+Part Index
+
+Seekable part-offset index of a text file, so that showing part k of a file is a seek and a read of that part only.
+
+The index is built once per file (and rebuilt when its size or mtime changes) with a newline scan over an mmap of
+the file: it keeps the byte offset and the character offset of the start of every line. The part boundaries for a
+given text limit are then found with a binary search per part. The indexes and the part boundaries are kept in the
+content cache, keyed by (path, Limit, header mode) and validated against the size and mtime of the file.
+The parts are the same as TextPartition.split_text_starts makes of the whole text (whole lines when they fit,
+over-long lines hard-split), with the universal newlines ('\\r\\n' and a lone '\\r') counted as the single '\\n'
+they are read as.
+
+UTF-8 and single-byte files are scanned for b'\\n' (and b'\\r') directly. Other encodings (UTF-16/32) are fed through an
+incremental decoder a chunk at a time, and the byte offsets of the lines are counted by encoding them back, so
+the file is never held as a single string. A file that does not decode with its detected encoding is indexed
+with the fallback encoding instead (see TextDecoding).
+"""
+
+import os
+import re
+import mmap
+from array import array
+from bisect import bisect_left, bisect_right
+import codecs
+
+from TextDecoding import fallbackEncoding, split_bom, is_single_byte_encoding
+
+scanChunkSize = 1 << 20 # Bytes checked at a time for non-ASCII content and carriage returns
+
+# Translation table that deletes everything but the UTF-8 continuation bytes, to count characters from bytes
+nonContinuationBytes = bytes(b for b in range(256) if not 0x80 <= b < 0xC0)
+
+# The line breaks of the universal newlines mode
+lineBreakPattern = re.compile('\r\n|\r|\n')
+
+class FilePartIndex:
+    """
+    The line offsets of a file and the parts computed from them.
+
+    Args:
+        path (str): The path of the file.
+        stat (os.stat_result): The stat of the file, the index is valid for as long as its size and mtime match.
+        encoding (str): The detected encoding of the file.
+    """
+
+    def __init__(self, path: str, stat: os.stat_result, encoding: str = 'utf-8'):
+        self.path = path
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.encoding = encoding # The fallback encoding if the file did not decode with the detected one
+        self.codec = encoding # Decodes from any line start (without the BOM handling)
+        self.bom_length = 0
+
+        # Byte and character offsets of the start of each line, the character offsets are None when they are
+        # the same as the byte offsets (ASCII or single-byte content without '\r' and without a BOM)
+        self.line_bytes = array('q', [0])
+        self.line_chars = None
+        self.total_chars = 0
+
+        if self.size:
+            with open(path, 'rb') as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    self.bom_length, self.codec = split_bom(mapped[:4], encoding)
+                    try:
+                        self.scan(mapped)
+                    except UnicodeDecodeError:
+                        self.encoding = self.codec = fallbackEncoding
+                        self.bom_length = 0
+                        self.line_bytes = array('q', [0])
+                        self.line_chars = None
+                        self.scan(mapped)
+                    #end
+                #end
+            #end
+        #end
+    #end
+
+    def scan(self, mapped: mmap.mmap) -> None:
+        """Collect the line offsets of the mapped file, raises UnicodeDecodeError if it does not decode."""
+        name = codecs.lookup(self.codec).name
+        if name == 'utf-8' or is_single_byte_encoding(name):
+            self.scan_bytes(mapped, name == 'utf-8')
+        else:
+            self.scan_decoded(mapped)
+        #end
+    #end
+
+    def scan_bytes(self, mapped: mmap.mmap, is_utf8: bool) -> None:
+        """Collect the line offsets with a find() scan, for the encodings where b'\\n' and b'\\r' are always newlines."""
+        size = self.size
+        line_bytes = self.line_bytes
+        line_bytes[0] = self.bom_length
+        find = mapped.find
+        position = find(b'\n')
+        while position >= 0:
+            line_bytes.append(position + 1)
+            position = find(b'\n', position + 1)
+        #end
+
+        # A '\r' not followed by '\n' is a line break of its own (old Mac line ends), merged into the line starts
+        position = find(b'\r')
+        has_cr = position >= 0
+        lone_cr_ends = []
+        while position >= 0:
+            if mapped[position + 1:position + 2] != b'\n':
+                lone_cr_ends.append(position + 1)
+            #end
+            position = find(b'\r', position + 1)
+        #end
+        if lone_cr_ends:
+            line_bytes = self.line_bytes = array('q', sorted(line_bytes + array('q', lone_cr_ends)))
+        #end
+
+        is_ascii = is_utf8 and all(mapped[i:i + scanChunkSize].isascii() for i in range(0, size, scanChunkSize))
+        if (is_ascii or not is_utf8) and not self.bom_length and not has_cr:
+            self.total_chars = size
+            return
+        #end
+
+        if is_utf8 and not is_ascii: # Validate the whole file before relying on the byte counts
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            for i in range(self.bom_length, size, scanChunkSize):
+                decoder.decode(mapped[i:i + scanChunkSize])
+            #end
+            decoder.decode(b'', True)
+        #end
+
+        # Character offsets: the UTF-8 continuation bytes and the '\r' of '\r\n' are not characters of their own
+        count_chars = len
+        if is_utf8 and not is_ascii:
+            count_chars = lambda line: len(line) - len(line.translate(None, nonContinuationBytes))
+        #end
+        line_chars = array('q', [0])
+        chars = 0
+        for start, stop in zip(line_bytes, line_bytes[1:]):
+            line = mapped[start:stop]
+            chars += count_chars(line) - line.endswith(b'\r\n')
+            line_chars.append(chars)
+        #end
+        self.total_chars = chars + count_chars(mapped[line_bytes[-1]:size])
+        self.line_chars = line_chars
+    #end
+
+    def scan_decoded(self, mapped: mmap.mmap) -> None:
+        """Collect the line offsets from the decoded text, a chunk at a time, for the other encodings."""
+        decoder = codecs.getincrementaldecoder(self.codec)()
+        encoder = codecs.getincrementalencoder(self.codec)()
+        line_bytes = self.line_bytes
+        line_chars = array('q', [0])
+        byte_position = line_bytes[0] = self.bom_length
+        chars = 0
+        carry = "" # A '\r' ending a chunk is held back, it is a '\r\n' if the next chunk starts with '\n'
+
+        for i in range(self.bom_length, self.size + 1, scanChunkSize):
+            is_final = i + scanChunkSize > self.size
+            chunk = carry + decoder.decode(mapped[i:i + scanChunkSize], is_final)
+            carry = ""
+            if not is_final and chunk.endswith('\r'):
+                chunk, carry = chunk[:-1], '\r'
+            #end
+            start = 0
+            for line_break in lineBreakPattern.finditer(chunk):
+                line = chunk[start:line_break.end()]
+                byte_position += len(encoder.encode(line))
+                chars += len(line) - (len(line_break.group()) == 2) # '\r\n' is read as a single '\n'
+                line_bytes.append(byte_position)
+                line_chars.append(chars)
+                start = line_break.end()
+            #end
+            rest = chunk[start:]
+            if rest:
+                byte_position += len(encoder.encode(rest))
+                chars += len(rest)
+            #end
+        #end
+        self.total_chars = chars
+        self.line_chars = line_chars
+    #end
+
+    def is_valid(self, stat: os.stat_result) -> bool:
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+    #end
+
+    def part_starts(self, text_limit: int) -> array:
+        """
+        This function computes the parts for a text limit: each part takes as many whole lines as fit.
+
+        Args:
+            text_limit (int): The maximum number of characters of the text of a part.
+
+        Returns:
+            array: The character offset of the start of each part, followed by the end (with the final '\n').
+        """
+        # Character offset of the start of each line, the text is partitioned with a '\n' added after the last line
+        offsets = self.line_chars or self.line_bytes
+        end = self.total_chars + 1
+
+        starts = array('q', [0])
+        start = 0
+        while start < end:
+            limit = start + text_limit
+            if limit >= end:
+                start = end
+            else:
+                # Cut at the last line starting within the limit, or hard-split a line longer than the limit
+                line_start = offsets[bisect_right(offsets, limit) - 1]
+                start = line_start if line_start > start else limit
+            #end
+            starts.append(start)
+        #end
+        return starts
+    #end
+
+    def read_part(self, starts: array, part_n: int) -> str:
+        """
+        This function reads a single part of the file.
+
+        Args:
+            starts (array): The result of part_starts.
+            part_n (int): The part to read, starting from 1.
+
+        Returns:
+            str: The text of the part, newlines translated and with the trailing '\\n' of the last line.
+        """
+        start, stop = starts[part_n - 1], starts[part_n]
+        if self.line_chars is None: # Plain ASCII, the character offsets are the byte offsets
+            with open(self.path, 'rb') as file:
+                file.seek(start)
+                text = file.read(min(stop, self.size) - start).decode(self.codec, 'replace')
+            #end
+            return text + '\n' if stop > self.size else text
+        #end
+
+        # Read the lines the part spans, and slice the part out of them (it may start or stop within a line)
+        offsets = self.line_chars
+        first_line = bisect_right(offsets, start) - 1
+        last_line = bisect_left(offsets, stop)
+        byte_start = self.line_bytes[first_line]
+        byte_stop = self.line_bytes[last_line] if last_line < len(offsets) else self.size
+        with open(self.path, 'rb') as file:
+            file.seek(byte_start)
+            data = file.read(byte_stop - byte_start)
+        #end
+        text = data.decode(self.codec, 'replace').replace('\r\n', '\n').replace('\r', '\n')
+        base = offsets[first_line]
+        if stop > self.total_chars:
+            return text[start - base:] + '\n'
+        #end
+        return text[start - base:stop - base]
+    #end
+#end
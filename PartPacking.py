@@ -0,0 +1,179 @@
+"""
+Part Packing
+
+Packing of the files of the unified stream into parts, so that small files are never cut across two parts.
+
+The stream is described by its blocks: a (label, start, stop) range per file (and for the listing before them).
+A block that fits in a part is an item of its own, a block larger than a part is split at line boundaries
+(TextPartition) into items of at most a part each, and only those are ever cut. The items are then packed into
+parts under the text limit, either in stream order, looking a few items ahead for the ones that still fit in
+the part being filled, or first-fit decreasing, which takes the fewest parts but reorders the files.
+A part is a list of items, its text is assembled from the stream ranges of its items.
+"""
+
+from typing import List, Tuple, Callable
+
+from TextPartition import compute_part_text_limit, split_text_starts
+
+PackItem = Tuple[str, int, int] # (label, start, stop) range of the stream
+
+# Packing modes
+PACK_STREAM = "Stream" # No packing, the stream is cut at line boundaries only
+PACK_IN_ORDER = "In Order"
+PACK_FIRST_FIT_DECREASING = "First Fit Decreasing"
+
+packingLookahead = 16 # Items skipped over (left for the next parts) before a part is closed, in order mode
+
+def make_pack_items(text: str, blocks: List[PackItem], text_limit: int) -> List[PackItem]:
+    """
+    This function makes the items to pack: the blocks, with the blocks larger than a part split into pieces.
+
+    Args:
+        text (str): The stream (a str or a ChunkedText).
+        blocks (List[PackItem]): The blocks of the stream, in order.
+        text_limit (int): The maximum number of characters of a part.
+
+    Returns:
+        List[PackItem]: The items, in stream order. The pieces of a split block are labelled "label [i/n]".
+    """
+    items = []
+    for label, start, stop in blocks:
+        if stop <= start:
+            continue
+        #end
+        if stop - start <= text_limit:
+            items.append((label, start, stop))
+            continue
+        #end
+        starts = split_text_starts(text, text_limit, start, stop)
+        count = len(starts) - 1
+        for i in range(count):
+            items.append((f"{label} [{i + 1}/{count}]", starts[i], starts[i + 1]))
+        #end
+    #end
+    return items
+#end
+
+def pack_in_order(items: List[PackItem], text_limit: int, lookahead: int = packingLookahead) -> List[List[PackItem]]:
+    """
+    This function fills the parts in stream order. When the next item does not fit, up to lookahead following
+    items are tried in its place before the part is closed. An item longer than text_limit takes a part of its own.
+
+    Args:
+        items (List[PackItem]): The items, each at most text_limit long (see make_pack_items).
+        text_limit (int): The maximum number of characters of a part.
+        lookahead (int): The number of items that may be skipped over.
+
+    Returns:
+        List[List[PackItem]]: The items of each part.
+    """
+    taken = bytearray(len(items))
+    parts = []
+    first = 0 # The first item not taken yet
+    while first < len(items):
+        part = []
+        room = text_limit
+        skipped = 0
+        i = first
+        while i < len(items) and skipped <= lookahead and room > 0:
+            if not taken[i]:
+                size = items[i][2] - items[i][1]
+                if size <= room or not part: # An item too long for any part is not skipped forever
+                    part.append(items[i])
+                    taken[i] = 1
+                    room -= size
+                else:
+                    skipped += 1
+                #end
+            #end
+            i += 1
+        #end
+        parts.append(part)
+        while first < len(items) and taken[first]:
+            first += 1
+        #end
+    #end
+    return parts
+#end
+
+def pack_first_fit_decreasing(items: List[PackItem], text_limit: int) -> List[List[PackItem]]:
+    """
+    This function puts each item, largest first, in the first part it fits in.
+    The first part with enough room is found with a max tree over the room left in the parts, in O(log n).
+    An item longer than text_limit takes a part of its own.
+
+    Args:
+        items (List[PackItem]): The items, each at most text_limit long (see make_pack_items).
+        text_limit (int): The maximum number of characters of a part.
+
+    Returns:
+        List[List[PackItem]]: The items of each part in stream order, the parts ordered by their first item.
+    """
+    leaves = 1
+    while leaves < len(items):
+        leaves *= 2
+    #end
+    room = [text_limit] * (2 * leaves) # Max tree, every part (leaf) starts empty
+    parts: List[List[PackItem]] = []
+
+    for item in sorted(items, key=lambda item: item[1] - item[2]):
+        size = min(item[2] - item[1], text_limit) # An item too long fills a part (the first empty one)
+        node = 1
+        while node < leaves: # Descend to the leftmost part with enough room
+            node = 2 * node if room[2 * node] >= size else 2 * node + 1
+        #end
+        part_index = node - leaves
+        if part_index == len(parts):
+            parts.append([])
+        #end
+        parts[part_index].append(item)
+        room[node] -= size
+        node //= 2
+        while node:
+            room[node] = max(room[2 * node], room[2 * node + 1])
+            node //= 2
+        #end
+    #end
+
+    for part in parts:
+        part.sort(key=lambda item: item[1])
+    #end
+    parts.sort(key=lambda part: part[0][1]) # The parts in the order of their first item in the stream
+    return parts
+#end
+
+def pack_parts(text: str, blocks: List[PackItem], absolute_limit: int, overhead: Callable[[int], int],
+               mode: str = PACK_IN_ORDER) -> List[List[PackItem]]:
+    """
+    This function packs the blocks of a stream into parts that fit the absolute limit with their header and footer.
+
+    Args:
+        text (str): The stream (a str or a ChunkedText).
+        blocks (List[PackItem]): The blocks of the stream, in order.
+        absolute_limit (int): The character limit of a part including its header and footer.
+        overhead (Callable[[int], int]): The header plus footer length of part p of p.
+        mode (str): PACK_IN_ORDER or PACK_FIRST_FIT_DECREASING.
+
+    Returns:
+        List[List[PackItem]]: The items of each part.
+    """
+    text_length = sum(stop - start for _, start, stop in blocks)
+    min_parts = 1
+    while True:
+        text_limit, max_parts = compute_part_text_limit(text_length, absolute_limit, overhead, min_parts)
+        items = make_pack_items(text, blocks, text_limit)
+        if mode == PACK_FIRST_FIT_DECREASING:
+            parts = pack_first_fit_decreasing(items, text_limit)
+        else:
+            parts = pack_in_order(items, text_limit)
+        #end
+        if len(parts) <= max_parts:
+            return parts
+        #end
+        min_parts = len(parts)
+    #end
+#end
+
+def get_packed_part(text: str, part: List[PackItem]) -> str:
+    return "".join(text[start:stop] for _, start, stop in part)
+#end
@@ -0,0 +1,110 @@
+"""
+Part Stream
+
+Library API to generate the parts of a set of files, for embedding in another pipeline without the console.
+
+iter_parts scans the paths like the tool does and yields the parts lazily, one Part at a time, with the text that
+would be copied to the clipboard and the files and character offsets the part covers. It runs the same code as the
+headless export (--export) and needs none of the interactive dependencies (keyboard, pyperclip, pywin32):
+    from PartStream import iter_parts, PARTS_UNIFIED
+    for part in iter_parts(["src"], limit=20000, mode=PARTS_UNIFIED):
+        send(part.text)
+"""
+
+import os
+from typing import List, Tuple, Iterator, Optional
+
+from IgnoreRules import IgnoreRules
+from FileRecordStore import FileRecordStore
+from FileSnapshot import load_snapshot, save_snapshot
+from PartGenerator import (Part, PARTS_FILES, PARTS_UNIFIED, PARTS_DELTA, PartSettings, scan_files, iter_file_parts,
+                           iter_unified_parts, iter_delta_parts, make_snapshot)
+
+# Header styles
+HEADERS_FULL = "full"
+HEADERS_SIMPLE = "simple"
+
+def iter_parts(paths: List[str], limit: int = 4096, mode: str = PARTS_FILES, header_style: str = HEADERS_FULL,
+               absolute_paths: bool = False, binary: bool = True, deduplicate: bool = True, since: Optional[str] = None,
+               errors: Optional[List[Tuple[str, str]]] = None, scan_index: bool = False,
+               index_directory: Optional[str] = None) -> Iterator[Part]:
+    """
+    This function generates the parts of the files found in the paths, lazily: a file (or the unified stream) is
+    read a part at a time, the corpus is never held in memory.
+
+    Args:
+        paths (List[str]): The files and directories to process.
+        limit (int): The character limit of a part, header and footer included.
+        mode (str): PARTS_FILES, PARTS_UNIFIED or PARTS_DELTA.
+        header_style (str): HEADERS_FULL or HEADERS_SIMPLE.
+        absolute_paths (bool): Show the absolute paths of the files instead of the paths relative to the inputs.
+        binary (bool): List the binary files in the directory structure of the unified stream.
+        deduplicate (bool): Show the files with the same content as an earlier file as a reference to it in the
+            unified stream.
+        since (Optional[str]): The snapshot file (see take_snapshot) the PARTS_DELTA parts are the changes since, all
+            the files are added if None.
+        errors (Optional[List[Tuple[str, str]]]): The (path, error) of the files that could not be read are added to it.
+        scan_index (bool): Use (and update) the persistent scan index of the tool, off by default so that a library
+            call writes nothing besides its own outputs.
+        index_directory (Optional[str]): The directory of the scan index files, the user cache directory if None.
+
+    Returns:
+        Iterator[Part]: The parts, in order.
+
+    Raises:
+        FileNotFoundError: If a path or the since snapshot does not exist.
+    """
+    if mode not in (PARTS_FILES, PARTS_UNIFIED, PARTS_DELTA):
+        raise ValueError(f"Invalid part mode: {mode}")
+    #end
+    if header_style not in (HEADERS_FULL, HEADERS_SIMPLE):
+        raise ValueError(f"Invalid header style: {header_style}")
+    #end
+    CTL = PartSettings(limit, header_style == HEADERS_SIMPLE, absolute_paths, binary, deduplicate)
+    if since and not os.path.isfile(since):
+        raise FileNotFoundError(f"Snapshot does not exist: {since}")
+    #end
+    file_structures = scan_input(paths, CTL, scan_index, index_directory)
+    errors = [] if errors is None else errors
+
+    if mode == PARTS_FILES:
+        yield from iter_file_parts(file_structures, CTL, errors)
+    elif mode == PARTS_UNIFIED:
+        yield from iter_unified_parts(file_structures, CTL, errors)
+    else:
+        snapshot = load_snapshot(since) if since else None
+        current = make_snapshot(file_structures, snapshot[1] if snapshot else {})
+        yield from iter_delta_parts(file_structures, CTL, errors, snapshot, current)
+    #end
+#end
+
+def take_snapshot(paths: List[str], snapshot_path: str, scan_index: bool = False, index_directory: Optional[str] = None) -> None:
+    """
+    This function records the content hashes of the files found in the paths, for the PARTS_DELTA parts of a later
+    iter_parts. The files unchanged since the snapshot already at snapshot_path (if any) are not hashed again.
+
+    Args:
+        paths (List[str]): The files and directories to process, as they will be given to iter_parts.
+        snapshot_path (str): The snapshot file to write.
+        scan_index (bool): Use (and update) the persistent scan index, as for iter_parts.
+        index_directory (Optional[str]): The directory of the scan index files, the user cache directory if None.
+    """
+    file_structures = scan_input(paths, PartSettings(), scan_index, index_directory)
+    previous = load_snapshot(snapshot_path)
+    save_snapshot(snapshot_path, make_snapshot(file_structures, previous[1] if previous else {}))
+#end
+
+def scan_input(paths: List[str], CTL: PartSettings, scan_index: bool = False, index_directory: Optional[str] = None) -> FileRecordStore:
+    """Scan the paths like the tool does (with its default ignore rules), without reporting the progress."""
+    sanitized_paths = []
+    for path in paths:
+        sanitized_path = path.strip().replace("\\", "/")
+        if not os.path.exists(sanitized_path):
+            raise FileNotFoundError(f"Path does not exist: {path}")
+        #end
+        sanitized_paths.append(sanitized_path)
+    #end
+    file_structures, _ = scan_files(sanitized_paths, CTL.Recursive.state, IgnoreRules(), scan_index, index_directory,
+                                    keep_entries=False)
+    return file_structures
+#end
@@ -0,0 +1,138 @@
+"""
+Partition Benchmark
+
+Compares the partition engine (TextPartition) with the previous part length search and line split, on generated
+log-like, source-like and minified (single line) texts. For each input it reports the time to compute the part
+boundaries, the time to also slice out every part, the part count and the largest part, which for the previous
+split exceeds the limit when a line is longer than the limit.
+
+Runs without the interactive dependencies:
+    python PartitionBenchmark.py --size-mb 8 --limit 20000 --repeat 3
+"""
+
+import random
+import argparse
+import time
+from typing import List, Callable
+
+from TextPartition import fit_parts, split_text_starts, get_text_part
+
+## ================= Previous Implementation [Reference] =================
+
+def legacy_part_text_length(full_file_size: int, absolute_limit: int, overhead: Callable[[int], int]) -> int:
+    p = 1
+    while True:
+        hf_length = overhead(p)
+        text_limit = absolute_limit - hf_length
+        new_p = full_file_size // text_limit
+        if full_file_size % text_limit != 0:
+            new_p += 1
+        #end
+        if text_limit * new_p + hf_length * new_p <= absolute_limit or new_p == p:
+            return text_limit
+        #end
+        p = new_p
+    #end
+#end
+
+def legacy_split_text_into_parts(text_content: str, character_limit: int) -> List[str]:
+    parts = []
+    part = []
+    part_length = 0
+    for line in text_content.split('\n'):
+        line_length = len(line) + 1
+        if part_length + line_length > character_limit:
+            parts.append("".join(part))
+            part = []
+            part_length = 0
+        #end
+        part.append(line + '\n')
+        part_length += line_length
+    #end
+    if part:
+        parts.append("".join(part))
+    #end
+    return parts
+#end
+
+## ================= Inputs [Generated] =================
+
+def make_log_text(size: int, rng: random.Random) -> str:
+    levels = ['INFO', 'DEBUG', 'WARN', 'ERROR']
+    lines = []
+    length = 0
+    while length < size:
+        line = (f"2024-01-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d} "
+                f"{rng.choice(levels)} worker-{rng.randint(1, 16)} request {rng.getrandbits(32):08x} took {rng.randint(1, 999)}ms")
+        lines.append(line)
+        length += len(line) + 1
+    #end
+    return '\n'.join(lines)
+#end
+
+def make_source_text(size: int, rng: random.Random) -> str:
+    lines = []
+    length = 0
+    while length < size:
+        depth = rng.randint(0, 3)
+        line = '    ' * depth + rng.choice(['', 'return value', 'if index < count:', 'items.append(entry)',
+                                            'result = compute(first, second) # Combine the inputs', '#end'])
+        lines.append(line)
+        length += len(line) + 1
+    #end
+    return '\n'.join(lines)
+#end
+
+def make_minified_text(size: int, rng: random.Random) -> str:
+    tokens = ['var a=', 'function(b){', 'return b+1}', ';', '{"key":', '"value"}', ',', '[1,2,3]']
+    return ''.join(rng.choice(tokens) for _ in range(size // 6))[:size]
+#end
+
+## ================= Benchmark [Main] =================
+
+def best_time(function: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    #end
+    return best
+#end
+
+def run_benchmark(name: str, text: str, limit: int, repeat: int) -> None:
+    overhead = lambda p: 40 + 2 * len(str(p)) # A header and footer of typical length
+    legacy_limit = legacy_part_text_length(len(text), limit, overhead)
+
+    legacy_time = best_time(lambda: legacy_split_text_into_parts(text, legacy_limit), repeat)
+    legacy_parts = legacy_split_text_into_parts(text, legacy_limit)
+
+    new_starts_time = best_time(lambda: fit_parts(len(text), limit, overhead, lambda l: split_text_starts(text, l)), repeat)
+    _, starts = fit_parts(len(text), limit, overhead, lambda l: split_text_starts(text, l))
+    new_parts_time = best_time(lambda: [get_text_part(text, starts, n) for n in range(1, len(starts))], repeat)
+    new_parts = [get_text_part(text, starts, n) for n in range(1, len(starts))]
+
+    assert ''.join(new_parts) == text + '\n'
+    assert all(len(part) + overhead(len(new_parts)) <= limit for part in new_parts)
+
+    print(f"{name:<10} {len(text) / 2**20:6.1f} MB | "
+          f"legacy: {legacy_time * 1000:8.1f} ms, {len(legacy_parts):6d} parts, largest {max(map(len, legacy_parts)):9d} | "
+          f"new: {new_starts_time * 1000:7.1f} ms starts, {(new_starts_time + new_parts_time) * 1000:7.1f} ms all parts, "
+          f"{len(new_parts):6d} parts, largest {max(map(len, new_parts)):9d}")
+#end
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the partition engine against the previous line split.')
+    parser.add_argument('--size-mb', type=float, default=8, help='Size of each generated input in MB.')
+    parser.add_argument('--limit', type=int, default=20000, help='Character limit of a part, header and footer included.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement, the best time is reported.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the generated inputs.')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    size = int(args.size_mb * 2**20)
+    print(f"Limit {args.limit} characters, best of {args.repeat}")
+    run_benchmark('log', make_log_text(size, rng), args.limit, args.repeat)
+    run_benchmark('source', make_source_text(size, rng), args.limit, args.repeat)
+    run_benchmark('minified', make_minified_text(size, rng), args.limit, args.repeat)
+#end
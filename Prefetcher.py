@@ -0,0 +1,64 @@
+"""
+Prefetcher
+
+Background worker that warms the content cache with what the file view is likely to show next.
+
+The worker runs the tasks of the latest batch only: scheduling a new batch (on every key press) drops the pending
+tasks of the previous one and flags the running task as cancelled, so fast key repeats never pile up work.
+Tasks are called with an is_cancelled() callback and are expected to check it between their steps.
+"""
+
+import threading
+from typing import List, Callable
+
+PrefetchTask = Callable[[Callable[[], bool]], None]
+
+class Prefetcher:
+    """A single daemon worker thread running the latest batch of prefetch tasks."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.tasks: List[PrefetchTask] = []
+        self.generation = 0 # Incremented by every batch, the tasks of older batches are cancelled
+        self.thread = None
+        self.completedCount = 0
+        self.cancelledCount = 0
+    #end
+
+    def schedule(self, tasks: List[PrefetchTask]) -> None:
+        """Replace the pending tasks with a new batch, in priority order."""
+        with self.condition:
+            self.generation += 1
+            self.cancelledCount += len(self.tasks)
+            self.tasks = list(tasks)
+            if self.tasks and self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="Prefetcher", daemon=True)
+                self.thread.start()
+            #end
+            self.condition.notify()
+        #end
+    #end
+
+    def cancel(self) -> None:
+        self.schedule([])
+    #end
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                while not self.tasks:
+                    self.condition.wait()
+                #end
+                task = self.tasks.pop(0)
+                generation = self.generation
+            #end
+
+            try:
+                task(lambda: generation != self.generation)
+            except Exception:
+                pass # The error is reported when the file is actually shown
+            #end
+            self.completedCount += 1
+        #end
+    #end
+#end
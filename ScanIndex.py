@@ -0,0 +1,544 @@
+"""
+Scan Index
+
+Persistent, per-root SQLite index of the scanned files (path, type, size, mtime and content hash).
+
+The index is loaded once per session and the scanned files are matched against it by path, size, mtime and
+inode, so on startup only the files that changed since the last run are classified again.
+The content hash is filled in lazily by the readers that need it and is kept for as long as the size and
+mtime of the file do not change.
+The index also keeps the listing of its root as of the last walk: the files in scan order, as the columns of the
+file record store, with the signature of every directory listed. As long as no directory changed, a warm start
+serves the files from the listing and only stats them, without walking the tree or inserting them one by one.
+"""
+
+import os
+import sqlite3
+import hashlib
+import marshal
+from array import array
+from typing import List, Dict, Tuple, Optional, Callable, Any
+
+from IgnoreRules import IgnoreRules, get_directory_signature
+from FileScanner import ScanEntry, join_path, get_relative_base_length
+from FileRecordStore import FileRecordStore, fileTypeFlags
+
+hashChunkSize = 1 << 20 # Read 1MB at a time when hashing file content
+
+def get_default_index_directory() -> str:
+    if os.name == 'nt':  # Windows
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:  # Linux, macOS, etc.
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    #end
+    return os.path.join(base, "chatgpt-fileparse")
+#end
+
+def compute_content_hash(path: str) -> str:
+    """Stream the file through SHA-1 without holding its content in memory."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(hashChunkSize), b""):
+            digest.update(chunk)
+        #end
+    #end
+    return digest.hexdigest()
+#end
+
+class ScanIndex:
+    """
+    The index of a single root directory, stored as a single SQLite file in the index directory.
+
+    Rows are keyed by the path relative to the root. The columns needed to match a scan are mirrored in memory
+    (self.rows[relative_path] = (type, size, mtime_ns, ino)), the content hashes are only queried when needed.
+    The in-memory rows are also stored as a marshalled snapshot, so a warm start loads them in a single read.
+    The root is kept as given on the command line, so that relative paths can be sliced off the scanned paths,
+    while the index file is named after the absolute root.
+    """
+
+    def __init__(self, root: str, index_directory: str = None):
+        self.root = root
+        self.relative_start = len(join_path(root, "")) if root else 0
+        index_directory = index_directory or get_default_index_directory()
+        os.makedirs(index_directory, exist_ok=True)
+
+        absolute_root = os.path.abspath(root or ".").replace("\\", "/")
+        root_id = hashlib.sha1(absolute_root.encode("utf-8")).hexdigest()[:16]
+        self.db_path = os.path.join(index_directory, f"{root_id}.sqlite")
+
+        self.connection = sqlite3.connect(self.db_path)
+        self.connection.execute("PRAGMA synchronous=OFF") # It is a cache, it can always be rebuilt
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS files (
+                                   path TEXT PRIMARY KEY, type TEXT, size INTEGER, mtime_ns INTEGER,
+                                   dev INTEGER, ino INTEGER, hash TEXT)""")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('root', ?)", (absolute_root,))
+        self.connection.commit()
+
+        self.loaded_rows: Optional[Dict[str, Tuple]] = None
+    #end
+
+    @property
+    def rows(self) -> Dict[str, Tuple]:
+        """The in-memory rows, loaded on first use (a warm start served from the listing does not need them)."""
+        if self.loaded_rows is None:
+            snapshot = self.connection.execute("SELECT value FROM meta WHERE key = 'snapshot'").fetchone()
+            try:
+                self.loaded_rows = marshal.loads(snapshot[0])
+            except (TypeError, ValueError, EOFError):
+                query = self.connection.execute("SELECT path, type, size, mtime_ns, ino FROM files")
+                self.loaded_rows = {row[0]: row[1:] for row in query}
+            #end
+        #end
+        return self.loaded_rows
+    #end
+
+    def relative(self, path: str) -> str:
+        return path[self.relative_start:]
+    #end
+
+    def absolute(self, relative_path: str) -> str:
+        return join_path(self.root, relative_path) if self.root else relative_path
+    #end
+
+    def match_types(self, entries: List[ScanEntry]) -> List[Optional[str]]:
+        """
+        This function looks the scanned files up in the index.
+
+        Args:
+            entries (List[ScanEntry]): The scanned files under this root.
+
+        Returns:
+            List[Optional[str]]: The stored type of each unchanged file, None for new and changed files.
+        """
+        rows = self.rows
+        start = self.relative_start
+        known_types = []
+        for entry in entries:
+            row = rows.get(entry.path[start:])
+            stat = entry.stat
+            if row and row[1] == stat.st_size and row[2] == stat.st_mtime_ns and row[3] == stat.st_ino:
+                known_types.append(row[0])
+            else:
+                known_types.append(None)
+            #end
+        #end
+        return known_types
+    #end
+
+    def update(self, entries: List[ScanEntry], file_types: List[str], known_types: List[Optional[str]],
+               full_scan: bool) -> int:
+        """
+        This function writes the scan results back to the index.
+
+        Args:
+            entries (List[ScanEntry]): The scanned files under this root.
+            file_types (List[str]): The file types of the entries.
+            known_types (List[Optional[str]]): The result of match_types, only the unmatched entries are written.
+            full_scan (bool): If the whole root was walked, files no longer found are removed from the index.
+
+        Returns:
+            int: The number of rows inserted, updated or removed.
+        """
+        changed = []
+        for entry, file_type, known_type in zip(entries, file_types, known_types):
+            if known_type is not None:
+                continue
+            #end
+            path = self.relative(entry.path)
+            stat = entry.stat
+            self.rows[path] = (file_type, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+            changed.append((path, file_type, stat.st_size, stat.st_mtime_ns, stat.st_dev, stat.st_ino))
+        #end
+
+        removed = []
+        if full_scan and len(self.rows) > len(entries):
+            seen = set(self.relative(entry.path) for entry in entries)
+            removed = [(path,) for path in self.rows if path not in seen]
+            for (path,) in removed:
+                del self.rows[path]
+            #end
+        #end
+
+        if changed or removed:
+            with self.connection:
+                # The content hash is kept only if the content did not change
+                self.connection.executemany("""INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, NULL)
+                                               ON CONFLICT(path) DO UPDATE SET
+                                               hash = CASE WHEN size = excluded.size AND mtime_ns = excluded.mtime_ns
+                                                           THEN hash ELSE NULL END,
+                                               type = excluded.type, size = excluded.size, mtime_ns = excluded.mtime_ns,
+                                               dev = excluded.dev, ino = excluded.ino""", changed)
+                self.connection.executemany("DELETE FROM files WHERE path = ?", removed)
+                self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('snapshot', ?)", (marshal.dumps(self.rows),))
+            #end
+        #end
+        return len(changed) + len(removed)
+    #end
+
+    def get_content_hash(self, path: str, stat: os.stat_result = None) -> Optional[str]:
+        """
+        This function returns the content hash of a file, computing and storing it if it is not known yet.
+
+        Args:
+            path (str): The path of the file, under the index root.
+            stat (os.stat_result): The current stat of the file, stat-ed if not given.
+
+        Returns:
+            Optional[str]: The hex digest, or None if the file cannot be read.
+        """
+        try:
+            stat = stat or os.stat(path)
+        except OSError:
+            return None
+        #end
+
+        relative_path = self.relative(path)
+        row = self.rows.get(relative_path)
+        is_indexed = row is not None and row[1] == stat.st_size and row[2] == stat.st_mtime_ns
+        if is_indexed:
+            stored = self.connection.execute("SELECT hash FROM files WHERE path = ?", (relative_path,)).fetchone()
+            if stored and stored[0]:
+                return stored[0]
+            #end
+        #end
+
+        try:
+            content_hash = compute_content_hash(path)
+        except OSError:
+            return None
+        #end
+
+        if is_indexed:
+            with self.connection:
+                self.connection.execute("UPDATE files SET hash = ? WHERE path = ?", (content_hash, relative_path))
+            #end
+        #end
+        return content_hash
+    #end
+
+    def load_listing(self, signature: Tuple) -> Optional[Dict[str, Any]]:
+        """
+        This function returns the listing of the root kept by the last walk (see save_listing).
+
+        Args:
+            signature (Tuple): The signature of the scan (see get_listing_signatures).
+
+        Returns:
+            Optional[Dict[str, Any]]: The listing, or None if there is none, it was made with another signature or
+                one of its directories changed since.
+        """
+        stored = self.connection.execute("SELECT value FROM meta WHERE key = 'listing'").fetchone()
+        try:
+            listing = marshal.loads(stored[0])
+        except (TypeError, ValueError, EOFError):
+            return None
+        #end
+        if listing["signature"] != signature:
+            return None
+        #end
+        for relative_directory, directory_signature in listing["directories"].items():
+            if get_directory_signature(self.absolute(relative_directory)) != directory_signature:
+                return None
+            #end
+        #end
+        return listing
+    #end
+
+    def save_listing(self, signature: Tuple, directories: Dict[str, Tuple], entries: List[ScanEntry],
+                     file_types: List[str]) -> None:
+        """
+        This function keeps the listing of the root made by a walk.
+
+        Args:
+            signature (Tuple): The signature of the scan (see get_listing_signatures).
+            directories (Dict[str, Tuple]): The signature of each directory listed under this root, by path.
+            entries (List[ScanEntry]): The scanned files under this root, in scan order.
+            file_types (List[str]): The file types of the entries.
+        """
+        relative_paths = [self.relative(entry.path) for entry in entries]
+        splits = [path.rfind('/') + 1 for path in relative_paths]
+        prefixes: Dict[str, int] = {}
+        directory_column = array('I', [prefixes.setdefault(path[:split], len(prefixes))
+                                       for path, split in zip(relative_paths, splits)])
+        stats = [entry.stat for entry in entries]
+        self.store_listing({
+            "signature": signature,
+            "directories": {self.relative(directory): directory_signature
+                            for directory, directory_signature in directories.items()},
+            "prefixes": list(prefixes),
+            "directory_column": directory_column.tobytes(),
+            "names": [path[split:] for path, split in zip(relative_paths, splits)],
+            "type_flags": bytes(map(fileTypeFlags.__getitem__, file_types)),
+            "sizes": array('q', [stat.st_size for stat in stats]).tobytes(),
+            "mtimes": array('q', [stat.st_mtime_ns for stat in stats]).tobytes(),
+            "inodes": array('Q', [stat.st_ino for stat in stats]).tobytes(),
+        })
+    #end
+
+    def store_listing(self, listing: Dict[str, Any]) -> None:
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('listing', ?)", (marshal.dumps(listing),))
+        #end
+    #end
+
+    def close(self) -> None:
+        self.connection.close()
+    #end
+#end
+
+def get_index_root(path: str) -> str:
+    """A directory root is indexed on its own, a file root is indexed under its parent directory."""
+    if os.path.isdir(path):
+        return path
+    #end
+    if '/' not in path:
+        return ""
+    #end
+    return path[:path.rfind('/')] or '/'
+#end
+
+def open_scan_indexes(paths: List[str], opened: Dict[str, ScanIndex], index_directory: str = None) -> Dict[str, ScanIndex]:
+    """
+    This function returns the index of every input path, opening the indexes that are not open yet.
+
+    Args:
+        paths (List[str]): The input paths.
+        opened (Dict[str, ScanIndex]): The indexes opened so far by index root, updated in place.
+        index_directory (str): Where the index files are stored, defaults to the user cache directory.
+
+    Returns:
+        Dict[str, ScanIndex]: The index by input path. Paths whose index cannot be opened are left out.
+    """
+    indexes = {}
+    for path in paths:
+        if not path:
+            continue
+        #end
+        index_root = get_index_root(path)
+        if index_root not in opened:
+            try:
+                opened[index_root] = ScanIndex(index_root, index_directory)
+            except (OSError, sqlite3.Error) as e:
+                print(f"[WARNING] The scan index for [{index_root}] is not available: {e}")
+                opened[index_root] = None
+        #end
+        if opened[index_root]:
+            indexes[path] = opened[index_root]
+        #end
+    #end
+    return indexes
+#end
+
+def get_root_ranges(entries: List[ScanEntry]) -> Dict[int, Tuple[int, int]]:
+    """The scanner emits the files of each root contiguously and in root order, return the (start, stop) range of each root."""
+    ranges = {}
+    start = 0
+    while start < len(entries):
+        # Binary search the end of the files of the root
+        root_index = entries[start].root_index
+        low, high = start + 1, len(entries)
+        while low < high:
+            middle = (low + high) // 2
+            if entries[middle].root_index == root_index:
+                low = middle + 1
+            else:
+                high = middle
+            #end
+        #end
+        ranges[root_index] = (start, low)
+        start = low
+    #end
+    return ranges
+#end
+
+def match_scan_indexes(indexes: Dict[str, ScanIndex], paths: List[str], entries: List[ScanEntry]) -> List[Optional[str]]:
+    """
+    This function looks the scanned files up in their per-root indexes.
+
+    Args:
+        indexes (Dict[str, ScanIndex]): The open indexes by input path.
+        paths (List[str]): The input paths, in the same order as the root indices of the entries.
+        entries (List[ScanEntry]): The scanned files.
+
+    Returns:
+        List[Optional[str]]: The stored type of each unchanged file, None for new and changed files.
+    """
+    roots = [path for path in paths if path]
+    known_types = [None] * len(entries)
+    for root_index, (start, stop) in get_root_ranges(entries).items():
+        index = indexes.get(roots[root_index])
+        if index is not None:
+            known_types[start:stop] = index.match_types(entries[start:stop])
+        #end
+    #end
+    return known_types
+#end
+
+def update_scan_indexes(indexes: Dict[str, ScanIndex], paths: List[str], entries: List[ScanEntry],
+                        file_types: List[str], known_types: List[Optional[str]], recursive: bool) -> None:
+    """
+    This function writes the results of a scan back to the per-root indexes.
+
+    Args:
+        indexes (Dict[str, ScanIndex]): The open indexes by input path.
+        paths (List[str]): The input paths, in the same order as the root indices of the entries.
+        entries (List[ScanEntry]): The scanned files.
+        file_types (List[str]): The file types of the entries.
+        known_types (List[Optional[str]]): The result of match_scan_indexes.
+        recursive (bool): Whether the directory roots were walked.
+    """
+    roots = [path for path in paths if path]
+    ranges = get_root_ranges(entries)
+    for root_index, root in enumerate(roots):
+        index = indexes.get(root)
+        if index is None:
+            continue
+        #end
+        start, stop = ranges.get(root_index, (0, 0))
+        index.update(entries[start:stop], file_types[start:stop], known_types[start:stop],
+                     full_scan=recursive and os.path.isdir(root))
+    #end
+#end
+
+## ================= Indexed listings =================
+
+def get_listing_signatures(paths: List[str], rules: Optional[IgnoreRules]) -> List[Tuple]:
+    """
+    This function returns what the listing of each root depends on besides its directories: the roots of the scan
+    (a linked directory is followed once across all of them) and the ignore rules at the root. It is taken before
+    the walk, so that a change during the walk invalidates the listing it saves.
+    """
+    roots = [path for path in paths if path]
+    absolute_roots = tuple(os.path.abspath(root) for root in roots)
+    return [(absolute_roots, root_index, rules.get_root_signature(root) if rules is not None else None)
+            for root_index, root in enumerate(roots)]
+#end
+
+def save_scan_listings(indexes: Dict[str, ScanIndex], paths: List[str], signatures: List[Tuple], entries: List[ScanEntry],
+                       file_types: List[str], directories: Dict[Tuple[int, str], Tuple]) -> None:
+    """
+    This function keeps the listing of every directory root walked, for load_indexed_scan.
+
+    Args:
+        indexes (Dict[str, ScanIndex]): The open indexes by input path.
+        paths (List[str]): The input paths, in the same order as the root indices of the entries.
+        signatures (List[Tuple]): The signatures of the roots (see get_listing_signatures), taken before the walk.
+        entries (List[ScanEntry]): The scanned files.
+        file_types (List[str]): The file types of the entries.
+        directories (Dict[Tuple[int, str], Tuple]): The signatures of the directories listed by the walk.
+    """
+    roots = [path for path in paths if path]
+    ranges = get_root_ranges(entries)
+    root_directories = [{} for _ in roots]
+    for (root_index, directory), directory_signature in directories.items():
+        root_directories[root_index][directory] = directory_signature
+    #end
+    for root_index, root in enumerate(roots):
+        index = indexes.get(root)
+        if index is None or index.root != root: # File roots are not listed
+            continue
+        #end
+        start, stop = ranges.get(root_index, (0, 0))
+        index.save_listing(signatures[root_index], root_directories[root_index], entries[start:stop], file_types[start:stop])
+    #end
+#end
+
+def load_indexed_scan(indexes: Dict[str, ScanIndex], paths: List[str], signatures: List[Tuple],
+                      classify: Callable[[List[ScanEntry]], List[str]],
+                      keep_entries: bool = True) -> Optional[Tuple[FileRecordStore, Optional[List[ScanEntry]]]]:
+    """
+    This function serves a scan from the listings kept by the indexes, when every input path is a directory whose
+    listing is still valid. The files are only stat-ed, those that changed are classified again.
+
+    Args:
+        indexes (Dict[str, ScanIndex]): The open indexes by input path.
+        paths (List[str]): The input paths.
+        signatures (List[Tuple]): The signatures of the roots (see get_listing_signatures).
+        classify (Callable[[List[ScanEntry]], List[str]]): Classifies the changed files.
+        keep_entries (bool): Make the entries of all the files as well, not only the store.
+
+    Returns:
+        Optional[Tuple[FileRecordStore, Optional[List[ScanEntry]]]]: The file record store and the entries (None
+            unless keep_entries), as a walk would make them, or None if the roots have to be walked.
+    """
+    roots = [path for path in paths if path]
+    if not roots or len(set(id(indexes.get(root)) for root in roots)) != len(roots):
+        return None # A root given twice
+    #end
+    listings = []
+    for root_index, root in enumerate(roots):
+        index = indexes.get(root)
+        listing = index.load_listing(signatures[root_index]) if index is not None and index.root == root else None
+        if listing is None:
+            return None
+        #end
+        listings.append(listing)
+    #end
+
+    # Concatenate the columns of the roots, the directory prefixes are made absolute again
+    directories = []
+    directory_column = array('I')
+    root_column = array('H')
+    names = []
+    type_flags = bytearray()
+    sizes, mtimes, inodes = array('q'), array('q'), array('Q')
+    ranges = []
+    for root_index, (root, listing) in enumerate(zip(roots, listings)):
+        offset = len(directories)
+        prefix = join_path(root, "")
+        directories.extend([prefix + directory for directory in listing["prefixes"]])
+        column = array('I', listing["directory_column"])
+        directory_column.extend(column if not offset else array('I', [directory_id + offset for directory_id in column]))
+        ranges.append((len(names), len(names) + len(column)))
+        root_column.extend(array('H', [root_index]) * len(column))
+        names.extend(listing["names"])
+        type_flags.extend(listing["type_flags"])
+        sizes.frombytes(listing["sizes"])
+        mtimes.frombytes(listing["mtimes"])
+        inodes.frombytes(listing["inodes"])
+    #end
+
+    # Stat every file, the files that changed in place are classified again
+    file_paths = [directories[directory_id] + name for directory_id, name in zip(directory_column, names)]
+    try:
+        stats = list(map(os.stat, file_paths))
+    except OSError:
+        return None # Removed without its directory changing (within the mtime granularity)
+    #end
+    changed = [slot for slot, stat in enumerate(stats)
+               if stat.st_size != sizes[slot] or stat.st_mtime_ns != mtimes[slot] or stat.st_ino != inodes[slot]]
+
+    base_length = get_relative_base_length(roots)
+    relative_starts = [base_length + (join_path(root, "")[base_length:base_length + 1] == '/') for root in roots]
+    make_entry = lambda slot: ScanEntry(file_paths[slot], file_paths[slot][relative_starts[root_column[slot]]:],
+                                        root_column[slot], stats[slot])
+    if changed:
+        changed_entries = [make_entry(slot) for slot in changed]
+        changed_types = classify(changed_entries)
+        for slot, file_type in zip(changed, changed_types):
+            stat = stats[slot]
+            type_flags[slot] = fileTypeFlags[file_type]
+            sizes[slot], mtimes[slot], inodes[slot] = stat.st_size, stat.st_mtime_ns, stat.st_ino
+        #end
+
+        # Write the changes back to the indexes of their roots
+        for root_index, (start, stop) in enumerate(ranges):
+            positions = [position for position, slot in enumerate(changed) if start <= slot < stop]
+            if not positions:
+                continue
+            #end
+            index = indexes[roots[root_index]]
+            index.update([changed_entries[position] for position in positions], [changed_types[position] for position in positions],
+                         [None] * len(positions), full_scan=False)
+            listing = listings[root_index]
+            listing.update(type_flags=bytes(type_flags[start:stop]), sizes=sizes[start:stop].tobytes(),
+                           mtimes=mtimes[start:stop].tobytes(), inodes=inodes[start:stop].tobytes())
+            index.store_listing(listing)
+        #end
+    #end
+
+    store = FileRecordStore.from_columns(paths, directories, directory_column, root_column, names, type_flags, sizes, mtimes)
+    return store, [make_entry(slot) for slot in range(len(names))] if keep_entries else None
+#end
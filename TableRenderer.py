@@ -0,0 +1,69 @@
+"""
+Table Renderer
+
+Fixed-width renderer for the Table directory view, drawn in the same 'fancy_grid' style tabulate produces.
+
+The column widths are given up front (from maximum lengths maintained by the file record store), so any window
+of rows is formatted on its own, without measuring the rest of the table. The full table is only produced when
+the listing is copied to the clipboard.
+"""
+
+from typing import List, Iterable, Iterator, Sequence
+
+headerPadding = 2 # Extra width of the header cells, as in tabulate
+
+class FixedWidthTable:
+    """
+    A table with fixed column widths.
+
+    Args:
+        headers (List[str]): The column headers.
+        widths (List[int]): The maximum cell length of each column.
+    """
+
+    def __init__(self, headers: List[str], widths: List[int]):
+        self.headers = headers
+        self.widths = [max(width, len(header) + headerPadding) for header, width in zip(headers, widths)]
+
+        self.top_rule = self.rule("╒", "═", "╤", "╕")
+        self.header_rule = self.rule("╞", "═", "╪", "╡")
+        self.row_rule = self.rule("├", "─", "┼", "┤")
+        self.bottom_rule = self.rule("╘", "═", "╧", "╛")
+    #end
+
+    def rule(self, left: str, fill: str, middle: str, right: str) -> str:
+        return left + middle.join(fill * (width + 2) for width in self.widths) + right
+    #end
+
+    def format_row(self, cells: Sequence[str]) -> str:
+        return "│ " + " │ ".join(cell.ljust(width) for cell, width in zip(cells, self.widths)) + " │"
+    #end
+
+    def iter_lines(self, rows: Iterable[Sequence[str]]) -> Iterator[str]:
+        """
+        This function renders the table (or a window of it) line by line.
+
+        Args:
+            rows (Iterable[Sequence[str]]): The rows to render, the cells of each row in column order.
+
+        Returns:
+            Iterator[str]: The lines of the table, with the header and the borders.
+        """
+        yield self.top_rule
+        yield self.format_row(self.headers)
+        yield self.header_rule
+        first = True
+        for row in rows:
+            if not first:
+                yield self.row_rule
+            #end
+            yield self.format_row(row)
+            first = False
+        #end
+        yield self.bottom_rule
+    #end
+
+    def render(self, rows: Iterable[Sequence[str]]) -> str:
+        return "\n".join(self.iter_lines(rows))
+    #end
+#end
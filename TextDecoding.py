@@ -0,0 +1,134 @@
+"""
+Text Decoding
+
+Encoding detection and streaming decoding of the text files.
+
+The encoding of a file is detected once from its BOM, or else from a sample of its first bytes (UTF-8 if the
+sample decodes as UTF-8, the single-byte fallback encoding otherwise), and is then kept in the file records.
+Files are decoded a chunk at a time through an incremental decoder with universal newline translation, so
+a multi-byte sequence or a '\\r\\n' split across two chunks is decoded as in a single read. A file that does
+not decode with its detected encoding (a stray Latin-1 byte past the sample) is decoded again with the fallback
+encoding, undefined bytes replaced, instead of failing.
+"""
+
+import io
+import codecs
+from typing import Iterator, Tuple
+
+encodingSampleSize = 64 << 10 # Bytes read to detect the encoding of a file without a BOM
+decodeChunkSize = 1 << 20 # Bytes decoded at a time
+fallbackEncoding = 'cp1252' # For the files that are not UTF-8, a superset of the printable Latin-1
+
+# Byte order marks, the UTF-32 ones first as the UTF-32-LE BOM starts with the UTF-16-LE one.
+# Each BOM maps to the encoding that skips it and to the codec that reads the rest of the file.
+byteOrderMarks = (
+    (codecs.BOM_UTF32_LE, 'utf-32', 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32', 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8-sig', 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16', 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16', 'utf-16-be'),
+)
+
+# Codecs with one character per byte, whose byte offsets are the character offsets (codecs.lookup names)
+singleByteEncodings = frozenset(['cp1252', 'iso8859-1', 'ascii'])
+
+def detect_encoding(sample: bytes, is_complete: bool = False) -> str:
+    """
+    This function detects the encoding of a file from its first bytes.
+
+    Args:
+        sample (bytes): The first bytes of the file.
+        is_complete (bool): If the sample is the whole file (a multi-byte sequence cut at its end is an error).
+
+    Returns:
+        str: The encoding to decode the file with.
+    """
+    for bom, encoding, _ in byteOrderMarks:
+        if sample.startswith(bom):
+            return encoding
+        #end
+    #end
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, is_complete)
+    except UnicodeDecodeError:
+        return fallbackEncoding
+    #end
+    return 'utf-8'
+#end
+
+def detect_file_encoding(path: str) -> str:
+    with open(path, 'rb') as file:
+        sample = file.read(encodingSampleSize)
+    #end
+    return detect_encoding(sample, len(sample) < encodingSampleSize)
+#end
+
+def split_bom(head: bytes, encoding: str) -> Tuple[int, str]:
+    """
+    This function resolves the BOM of an encoding that has one, for the readers that start within the file.
+
+    Args:
+        head (bytes): The first (up to 4) bytes of the file.
+        encoding (str): The encoding of the file.
+
+    Returns:
+        Tuple[int, str]: The length of the BOM, and the codec that decodes the bytes after it.
+    """
+    name = codecs.lookup(encoding).name
+    for bom, bom_encoding, codec in byteOrderMarks:
+        if name == bom_encoding and head.startswith(bom):
+            return len(bom), codec
+        #end
+    #end
+    return 0, 'utf-8' if name == 'utf-8-sig' else encoding
+#end
+
+def is_single_byte_encoding(encoding: str) -> bool:
+    return codecs.lookup(encoding).name in singleByteEncodings
+#end
+
+def iter_decoded_chunks(path: str, encoding: str, errors: str = 'strict', chunk_size: int = decodeChunkSize) -> Iterator[str]:
+    """
+    This function decodes a file a chunk at a time.
+
+    Args:
+        path (str): The path of the file.
+        encoding (str): The encoding of the file, a BOM is skipped by the encodings that have one.
+        errors (str): The error handler of the decoder.
+        chunk_size (int): The number of bytes decoded at a time.
+
+    Returns:
+        Iterator[str]: The decoded chunks, with the newlines translated to '\\n'.
+    """
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(errors), translate=True)
+    with open(path, 'rb') as file:
+        for data in iter(lambda: file.read(chunk_size), b''):
+            text = decoder.decode(data)
+            if text:
+                yield text
+            #end
+        #end
+    #end
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+    #end
+#end
+
+def read_decoded_text(path: str, encoding: str) -> Tuple[str, str]:
+    """
+    This function reads a whole text file through the streaming decoder.
+
+    Args:
+        path (str): The path of the file.
+        encoding (str): The detected encoding of the file.
+
+    Returns:
+        Tuple[str, str]: The text, and the encoding it was decoded with (the fallback if it did not decode).
+    """
+    try:
+        return ''.join(iter_decoded_chunks(path, encoding)), encoding
+    except UnicodeDecodeError:
+        return ''.join(iter_decoded_chunks(path, fallbackEncoding, 'replace')), fallbackEncoding
+    #end
+#end
@@ -0,0 +1,237 @@
+"""
+Text Partition
+
+Linear-time partition engine, splitting a text into parts of at most a given number of characters.
+
+A part is cut after the last newline that fits in it, so lines are kept whole whenever they fit. A line longer than
+the limit (minified JS, JSON blobs) is hard-split at the limit instead of making an oversized part. As before, the
+text is partitioned as if it ended with one more '\\n'.
+
+Parts are found with str.rfind over index ranges of the text itself, no per-line list or copy of the text is made:
+the result is the array of the part start offsets, and a part is sliced out only when it is shown.
+The text limit is computed directly from the header/footer overhead, which only changes with the number of digits
+of the part count, so it takes one overhead evaluation per digit instead of one pass per candidate part count.
+
+A text too large to hold (the unified stream of the headless export) is partitioned with SegmentPartitioner, which
+gives the same parts from the lengths and line ends of its segments, and cut with iter_chunked_parts a chunk at a time.
+"""
+
+from array import array
+from bisect import bisect_right
+from typing import Callable, Tuple, Sequence, Iterable, Iterator
+
+def compute_part_text_limit(text_length: int, absolute_limit: int, overhead: Callable[[int], int],
+                            min_parts: int = 1) -> Tuple[int, int]:
+    """
+    This function computes the text limit of the parts, so that a part plus its header and footer fits the absolute limit.
+
+    Args:
+        text_length (int): The length of the text in characters.
+        absolute_limit (int): The character limit of a part including its header and footer.
+        overhead (Callable[[int], int]): The header plus footer length of part p of p.
+        min_parts (int): The minimum part count to size the overhead for.
+
+    Returns:
+        Tuple[int, int]: The text limit (at least 1), and the largest part count it stays valid for.
+
+    Raises:
+        ValueError: If the header and footer take the whole absolute limit, for the number of parts the text needs.
+    """
+    digits = len(str(max(1, min_parts)))
+    while True:
+        max_parts = 10 ** digits - 1
+        text_limit = absolute_limit - overhead(max_parts)
+        if text_limit < 1:
+            raise ValueError(f"The limit of {absolute_limit} characters leaves no room for the text of a part, "
+                             f"the header and footer take {overhead(max_parts)} characters")
+        #end
+        needed = -(-(text_length + 1) // text_limit) # Ceiling division, with the final '\n'
+        if needed <= max_parts:
+            return text_limit, max_parts
+        #end
+        digits += 1
+    #end
+#end
+
+def split_text_starts(text: str, text_limit: int, start: int = 0, end: int = None) -> array:
+    """
+    This function partitions a text, or the range [start, end) of it.
+
+    Args:
+        text (str): The text.
+        text_limit (int): The maximum number of characters of a part.
+        start (int): The start of the range.
+        end (int): The end of the range, len(text) + 1 (the whole text with the final '\\n') if None.
+
+    Returns:
+        array: The start offset of each part, followed by the end.
+    """
+    end = len(text) + 1 if end is None else end
+    rfind = text.rfind
+    starts = array('q', [start])
+    while start < end:
+        limit = start + text_limit
+        if limit >= end:
+            start = end
+        else:
+            newline = rfind('\n', start, limit)
+            start = newline + 1 if newline >= 0 else limit # Hard split of a line longer than the limit
+        #end
+        starts.append(start)
+    #end
+    return starts
+#end
+
+def get_text_part(text: str, starts: array, part_n: int) -> str:
+    """Slice part part_n (starting from 1) out of the text."""
+    start, stop = starts[part_n - 1], starts[part_n]
+    if stop > len(text):
+        return text[start:] + '\n'
+    #end
+    return text[start:stop]
+#end
+
+def fit_parts(text_length: int, absolute_limit: int, overhead: Callable[[int], int],
+              split: Callable[[int], array]) -> Tuple[int, array]:
+    """
+    This function partitions a text so that every part fits the absolute limit with its header and footer.
+    Whole lines may leave some room at the end of the parts, if that takes the part count to more digits than
+    the overhead was computed for, the text limit is computed again for the actual count.
+
+    Args:
+        text_length (int): The length of the text in characters.
+        absolute_limit (int): The character limit of a part including its header and footer.
+        overhead (Callable[[int], int]): The header plus footer length of part p of p.
+        split (Callable[[int], array]): Partitions the text for a text limit (e.g. split_text_starts).
+
+    Returns:
+        Tuple[int, array]: The text limit and the part starts.
+
+    Raises:
+        ValueError: If the absolute limit cannot hold the header and footer (see compute_part_text_limit).
+    """
+    min_parts = 1
+    while True:
+        text_limit, max_parts = compute_part_text_limit(text_length, absolute_limit, overhead, min_parts)
+        starts = split(text_limit)
+        if len(starts) - 1 <= max_parts:
+            return text_limit, starts
+        #end
+        min_parts = len(starts) - 1
+    #end
+#end
+
+def get_line_ends(text: str) -> array:
+    """The offsets just after each '\\n' of a text, as SegmentPartitioner takes them."""
+    ends = array('q')
+    find = text.find
+    position = find('\n')
+    while position >= 0:
+        ends.append(position + 1)
+        position = find('\n', position + 1)
+    #end
+    return ends
+#end
+
+class SegmentPartitioner:
+    """
+    Streaming version of split_text_starts, for a text given as consecutive segments described by their length
+    and line ends only (e.g. the framing strings and the part indexes of the files of the unified stream).
+    The part starts are the same as split_text_starts gives for the concatenated text, without the text itself.
+
+    A cut can only be placed once a newline at or past the end of the window of the current part is seen (or the
+    end of the text is reached): all the newlines within the window are then known, and the last one gives the cut.
+    Each segment is searched with a binary search per cut, so a segment costs O(parts in it * log lines).
+
+    Args:
+        text_limit (int): The maximum number of characters of a part.
+    """
+
+    def __init__(self, text_limit: int):
+        self.text_limit = text_limit
+        self.starts = array('q', [0])
+        self.length = 0 # Length of the segments added so far
+        self.last_end = 0 # Offset just after the last newline seen, the cut candidate
+    #end
+
+    def cut_before(self, newline_end: int) -> None:
+        """Place the cuts of the parts whose window ends before a newline (given by the offset just after it)."""
+        text_limit = self.text_limit
+        start = self.starts[-1]
+        while newline_end > start + text_limit:
+            start = self.last_end if self.last_end > start else start + text_limit # Hard split without a newline
+            self.starts.append(start)
+        #end
+    #end
+
+    def add(self, length: int, line_ends: Sequence[int]) -> None:
+        """
+        This function adds a segment.
+
+        Args:
+            length (int): The length of the segment in characters.
+            line_ends (Sequence[int]): The offsets (within the segment) just after each of its '\\n', ascending.
+        """
+        base = self.length
+        text_limit = self.text_limit
+        count = len(line_ends)
+        index = 0
+        while index < count:
+            # The last newline end within the window, and whether a newline past the window is in this segment
+            window_end = self.starts[-1] + text_limit - base
+            last = bisect_right(line_ends, window_end, index) - 1
+            if last >= index:
+                self.last_end = base + line_ends[last]
+            #end
+            if last + 1 >= count:
+                break
+            #end
+            self.cut_before(base + line_ends[last + 1])
+            index = last + 1
+        #end
+        self.length += length
+    #end
+
+    def finish(self) -> array:
+        """Return the part starts, followed by the end (the length plus the final '\\n'), as split_text_starts does."""
+        end = self.length + 1
+        self.cut_before(end)
+        self.starts.append(end)
+        return self.starts
+    #end
+#end
+
+def iter_chunked_parts(chunks: Iterable[str], starts: array) -> Iterator[str]:
+    """
+    This function cuts a text, given as a sequence of chunks, into the parts given by their starts.
+    Only the part being assembled is held in memory.
+
+    Args:
+        chunks (Iterable[str]): The text, a chunk at a time.
+        starts (array): The part starts, as split_text_starts or SegmentPartitioner give them.
+
+    Returns:
+        Iterator[str]: The text of each part, the last one with the final '\\n'.
+    """
+    part_n = 1
+    position = 0 # Offset of the start of the current chunk
+    pieces = []
+    for chunk in chunks:
+        offset = 0
+        while part_n < len(starts) - 1 and starts[part_n] < position + len(chunk):
+            pieces.append(chunk[offset:starts[part_n] - position])
+            offset = starts[part_n] - position
+            yield "".join(pieces)
+            pieces = []
+            part_n += 1
+        #end
+        pieces.append(chunk[offset:])
+        position += len(chunk)
+    #end
+    while part_n < len(starts) - 1: # A cut at the end of the text, the last part is the final '\n' alone
+        yield "".join(pieces)
+        pieces = []
+        part_n += 1
+    #end
+    yield "".join(pieces) + "\n"
+#end
@@ -0,0 +1,60 @@
+"""
+Viewport
+
+Scrollable window over a directory listing (the rows of the List and Table views, the lines of the Tree view).
+
+The viewport only keeps the position, the listing itself is never materialized here: the views ask for the
+[first, last) range to format and print, and render the full listing only when it is copied.
+"""
+
+from typing import Tuple
+
+class Viewport:
+    """
+    A page of rows over a listing.
+
+    Args:
+        page_rows (int): The number of rows shown per page.
+    """
+
+    def __init__(self, page_rows: int = 20):
+        self.page_rows = max(1, page_rows)
+        self.first_row = 0
+    #end
+
+    def page_up(self) -> None:
+        self.first_row -= self.page_rows
+    #end
+
+    def page_down(self) -> None:
+        self.first_row += self.page_rows
+    #end
+
+    def home(self) -> None:
+        self.first_row = 0
+    #end
+
+    def end(self) -> None:
+        self.first_row = float('inf') # Clamped to the last page by window()
+    #end
+
+    def window(self, total: int, page_rows: int = None) -> Tuple[int, int]:
+        """
+        This function clamps the position to a listing and returns the visible range.
+
+        Args:
+            total (int): The number of rows in the listing.
+            page_rows (int): Override of the page size (e.g. for rows taking more than one line).
+
+        Returns:
+            Tuple[int, int]: The (first, last) rows to show, last excluded.
+        """
+        page_rows = max(1, page_rows or self.page_rows)
+        self.first_row = int(max(0, min(self.first_row, total - page_rows)))
+        return self.first_row, min(self.first_row + page_rows, total)
+    #end
+
+    def status(self, first: int, last: int, total: int) -> str:
+        return f"Rows {first + 1 if total else 0}-{last} of {total}"
+    #end
+#end
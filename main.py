@@ -32,20 +32,53 @@ SOFTWARE.
 """
 
 import os
+import sys
 import platform
 import shlex
 import argparse
-import keyboard
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional, Union
 import time
-import pyperclip
-import win32gui
-from tabulate import tabulate
-from WelcomeScreen import *
+# The keyboard and window dependencies are only used by the interactive control loop, the headless export
+# (--export) runs without them (the clipboard backend imports pyperclip on use)
+try:
+    import keyboard
+    import win32gui
+except ImportError:
+    keyboard = win32gui = None
+#end
+from IgnoreRules import IgnoreRules
+from FileScanner import ScanEntry, make_relative_path, get_scan_order_key
+from FileRecordStore import FileRecordStore
+from Viewport import Viewport
+from ContentCache import ContentCache, SharedPartsCache, FileContentReader, contentCacheBudget
+from Prefetcher import Prefetcher
+from TextPartition import fit_parts, split_text_starts, get_text_part
+from TextDecoding import detect_file_encoding
+from PartExport import PartExporter
+from PartGenerator import (Part, PARTS_FILES, PARTS_UNIFIED, PARTS_DELTA, scan_files, persistent_file_classifier,
+                           get_file_encoding, get_directory_renderer, compute_header_footer, get_header_footer_overhead,
+                           partNewlineCount, unifiedStreamName, get_unified_preamble, get_unified_file_framing,
+                           find_duplicate_files, get_deduplication_summary, iter_file_parts, iter_unified_parts,
+                           iter_delta_parts, make_snapshot, check_export_limit)
+from FileSnapshot import load_snapshot, save_snapshot, snapshotFileName
+from ChunkedText import ChunkedText
+from ClipboardWriter import ClipboardWriter, PyperclipClipboard, FileClipboard
+from PartPacking import pack_parts, get_packed_part, PackItem, PACK_STREAM, PACK_IN_ORDER, PACK_FIRST_FIT_DECREASING
+from FileWatcher import create_watcher, BackgroundWatcher, DELTA_ADD, DELTA_MODIFY
 
 # Create a global variable for progress update timeout
 progressUpdateTimeout = 0.05  # Update every 100ms
 
+# Number of rows shown per page in the directory views
+directoryPageRows = 20
+
+# Off for the headless export, which does not clear the terminal
+interactiveMode = True
+
+# Copies the text buffer to the clipboard in the background, after every key press
+persistent_clipboard_writer = ClipboardWriter(PyperclipClipboard())
+clipboardExitTimeout = 5.0 # Seconds
+
 ## ================= Control Class, Default Control Structures and Control Loop [1] =================
 class ControlStateVariable:
     varCounter = 0
@@ -209,6 +242,15 @@ class ControlStructure:
                 data_type=bool,
             )
         
+        self.IgnoreRules = ControlStateVariable(
+                state_name = "Ignore Rules",
+                default_state=True,
+                kbKey="g",
+                help_message=pressStr + "to apply the include/exclude patterns and .gitignore files",
+                options=[True, False],
+                data_type=bool,
+            )
+
         self.AbsolutePath = ControlStateVariable(
                 state_name = "Absolute Path",
                 default_state=True,
@@ -254,11 +296,34 @@ class ControlStructure:
                 data_type=bool,
             )
         
+        self.Packing = ControlStateVariable(
+                state_name = "Unified Packing",
+                default_state=PACK_STREAM,
+                kbKey="k",
+                help_message=pressStr + "to pack whole files into the parts of the unified stream (in order or first-fit decreasing)",
+                options=[PACK_STREAM, PACK_IN_ORDER, PACK_FIRST_FIT_DECREASING],
+                data_type=str,
+            )
+
+        self.Deduplicate = ControlStateVariable(
+                state_name = "Unified Deduplicate",
+                default_state=True,
+                kbKey="x",
+                help_message=pressStr + "to show the files with the same content as an earlier file as a reference to it in the unified stream",
+                options=[True, False],
+                data_type=bool,
+            )
+
         # Navigation action Keys
         self.kbKey_nextFile = 'right'
         self.kbKey_previousFile = 'left'
         self.kbKey_nextPart = 'down'
         self.kbKey_previousPart = 'up'
+        self.kbKey_pageUp = 'page up'
+        self.kbKey_pageDown = 'page down'
+        self.kbKey_home = 'home'
+        self.kbKey_end = 'end'
+        self.kbKey_copyListing = 'c' # Copy the full directory listing instead of the visible rows
 
         # This section is for file the navigation and display
         self.numberOfBinaryFiles = 0
@@ -268,7 +333,11 @@ class ControlStructure:
         self.currentFile_TotalParts = 1
         self.currentFile_CurrentPart = 1
 
-        self.buff = "";# The text buffer that will be displayed and copied to the clipboard 
+        # Scrolling of the directory views, only the visible rows are rendered
+        self.directoryViewport = Viewport(directoryPageRows)
+        self.copyListing = False
+
+        self.buff = ChunkedText()# The text buffer that will be displayed and copied to the clipboard
     #end
 
     def nextFile(self):
@@ -359,31 +428,46 @@ class ControlStructure:
                 print(f"Current File Index: {self.currentFile_Ind} out of {self.numberOfFiles} ({self.kbKey_previousFile}/{self.kbKey_nextFile})")
             #end
             print(f"Current Part: {self.currentFile_CurrentPart} out of {self.currentFile_TotalParts} ({self.kbKey_previousPart}/{self.kbKey_nextPart})")
+            print(persistent_content_cache.get_stats_str())
+            print(persistent_clipboard_writer.get_stats_str())
+            if self.Continuous.state:
+                print(persistent_unified_stream_cache.get_stats_str())
+            #end
                 
             print("-" * sepLineLen)  # print dashes at the end
         #end
     #end
 
     # --- Methods for printing, copying and clearing the text buffer ---
-    def bufferAndPrint(self, s: str, bufferOutSubstitute="") -> None:
-        """Custom function that appends to a buffer."""
-        self.buff += s + "\n"
+    def bufferAndPrint(self, s: str, bufferOutSubstitute="", end="\n") -> None:
+        """Custom function that appends to a buffer (the text is appended as a chunk, it is not copied)."""
+        self.buff.append(s)
+        self.buff.append(end)
         # If the verbose substitution is empty then print the buffer otherwise print a substitute message
         if not bufferOutSubstitute:
-            print(s)
+            print(s, end=end)
         else:
-            print(bufferOutSubstitute)
+            print(bufferOutSubstitute, end=end)
         #end
     #end
 
     def copyBufferToClipboardAndClear(self) -> None:
-        """Copy the text buffer to the clipboard and clear it."""
-        pyperclip.copy(self.buff)
-        self.buff = ""
+        """Copy the text buffer to the clipboard (in the background, see ClipboardWriter) and clear it."""
+        error = persistent_clipboard_writer.pop_error()
+        if error is not None:
+            print(f"[ERROR] The clipboard could not be written: {error}")
+        #end
+        persistent_clipboard_writer.submit(self.buff) # The buffer is replaced below, never appended to again
+        self.buff = ChunkedText()
     #end
 #end
 
 def controlLoopProcess(file_list: List[str]):
+    if keyboard is None:
+        print("[ERROR] The interactive mode needs the keyboard and pywin32 packages (see requirements.txt), use --export to run without them.")
+        return
+    #end
+    from WelcomeScreen import printWelcomeScreen # Interactive only, like the dependencies above
     CTL = ControlStructure()# Make the default control structure
     file_structures = process_input(file_list, CTL)# The the file tree
     CTL.printStateAndLegend()
@@ -412,6 +496,14 @@ def controlLoopProcess(file_list: List[str]):
             continue # Just ignore keys that are not control input
         #end
 
+        # Apply the file changes picked up by the watcher since the last key press
+        if persistent_file_watcher:
+            apply_file_deltas(file_structures, persistent_file_watcher['watcher'].get_deltas(), CTL)
+        #end
+
+        # Drop the prefetch work of the previous key press, the next files are scheduled again below
+        persistent_prefetcher.cancel()
+
         clearScreen()
 
         # Update the Control structure for the Global states
@@ -439,6 +531,14 @@ def controlLoopProcess(file_list: List[str]):
         if keyboard.is_pressed(CTL.SimpleHeaderFooter.kbKey):
             CTL.SimpleHeaderFooter.nextState()
         #end
+        if keyboard.is_pressed(CTL.Packing.kbKey):
+            CTL.Packing.nextState()
+            CTL.currentFile_CurrentPart = 1
+        #end
+        if keyboard.is_pressed(CTL.Deduplicate.kbKey):
+            CTL.Deduplicate.nextState()
+            CTL.currentFile_CurrentPart = 1
+        #end
         # Quick change before screen is even updated
         if keyboard.is_pressed(CTL.Limit.kbKey[0]):
             CTL.Limit.nextState()
@@ -461,12 +561,18 @@ def controlLoopProcess(file_list: List[str]):
         # Update the Control structure for the Global states per panel # TODO: decide if this will be panel specific of global switch
         if keyboard.is_pressed(CTL.DirectoryViewMode.kbKey):
             CTL.DirectoryViewMode.nextState()
+            CTL.directoryViewport.home()
         #end
         if keyboard.is_pressed(CTL.Recursive.kbKey):
             CTL.Recursive.nextState()
             # Update the file Structure
             file_structures = process_input(file_list, CTL)
         #end
+        if keyboard.is_pressed(CTL.IgnoreRules.kbKey):
+            CTL.IgnoreRules.nextState()
+            # Update the file Structure
+            file_structures = process_input(file_list, CTL)
+        #end
         if keyboard.is_pressed(CTL.AbsolutePath.kbKey):
             CTL.AbsolutePath.nextState()
         #end
@@ -492,6 +598,21 @@ def controlLoopProcess(file_list: List[str]):
             # Print the legend
             # CTL.printStateAndLegend()
 
+            # Scroll the directory view and check if the full listing should be copied
+            if keyboard.is_pressed(CTL.kbKey_pageUp):
+                CTL.directoryViewport.page_up()
+            #end
+            if keyboard.is_pressed(CTL.kbKey_pageDown):
+                CTL.directoryViewport.page_down()
+            #end
+            if keyboard.is_pressed(CTL.kbKey_home):
+                CTL.directoryViewport.home()
+            #end
+            if keyboard.is_pressed(CTL.kbKey_end):
+                CTL.directoryViewport.end()
+            #end
+            CTL.copyListing = keyboard.is_pressed(CTL.kbKey_copyListing)
+
             # Print file structure
             print_directory_structures(file_structures, CTL)
         #end
@@ -518,12 +639,14 @@ def controlLoopProcess(file_list: List[str]):
                 process_unified_continuous_mode(CTL, file_structures)
             else:
                 process_selected_file(file_structures, CTL)
+                schedule_prefetch(file_structures, CTL)
             #end
         #end
 
         # Clear the print buffer
         CTL.copyBufferToClipboardAndClear()
     #end
+    persistent_clipboard_writer.flush(clipboardExitTimeout) # Let the last copy complete before exiting
 #end
 
 ## ================= Input File path processing functions [2] =================
@@ -559,74 +682,158 @@ def sanitizePath(input_path):
     return sanitized_path
 #end
 
-def process_input(paths: List[str], CTL: ControlStructure) -> List[Dict]:
-    file_structures = []
-    progress = [{'total': len(paths), 'processed': 0}]
-    last_update_time = [time.time()] # Initialize a variable to store the last update time
-    
-    # Determine the common prefix-path initially
-    common_prefix = os.path.commonprefix(paths)
+# Scan index settings, the index is stored in the user cache directory unless a directory is given
+scanIndexEnabled = True
+scanIndexDirectory = None
+
+# File watcher settings, the watcher applies file changes in place instead of rescanning
+fileWatchEnabled = False
+fileWatchInterval = 1.0 # Seconds between polls
+persistent_file_watcher = {}
+
+# Ignore rule settings, applied while walking the directories when the Ignore Rules control is ON
+ignoreIncludePatterns = []
+ignoreExcludePatterns = []
+ignoreGitignoreFiles = True
+ignoreDefaultDirectories = True
+
+def get_ignore_rules(CTL: ControlStructure) -> IgnoreRules:
+    if not CTL.IgnoreRules.state:
+        return None
+    #end
+    return IgnoreRules(ignoreIncludePatterns, ignoreExcludePatterns, ignoreGitignoreFiles, ignoreDefaultDirectories)
+#end
 
-    def update_progress(level, path):
-        progress[level]['processed'] += 1
+def process_input(paths: List[str], CTL: ControlStructure) -> FileRecordStore:
+    last_update_time = [time.time()] # Initialize a variable to store the last update time
 
+    def update_progress(stage, processed, total, path):
         # Check if the specified timeout has passed since the last update
         if time.time() - last_update_time[0] < progressUpdateTimeout:
             return # If not enough time has passed, return without updating
         #end
         if CTL.Verbose.state:
             clearScreen()
-            print(f"Current file : [{path}]")
-            for i, p in enumerate(progress):
-                printProgressBar(p['processed'], p['total'], prefix=f'Level {i} Progress:', suffix='Complete', length=50)
-            #end
+            print(f"Current path : [{path}]")
+            printProgressBar(processed, total, prefix=f'{stage} Progress:', suffix='Complete', length=50)
         #end
         last_update_time[0] = time.time()
     #end
 
-    def process_path(path: str, level: int) -> None:
-        if os.path.isfile(path):
-            with open(path, "rb") as file:
-                content = file.read(512)
-                is_binary = b'\x00' in content
-                file_type = "bin" if is_binary else "txt"
-            #end
-            # relative_path = path.replace(common_prefix, '', 1)
-            relative_path = os.path.relpath(path, common_prefix)[1:]
-            file_structures.append({"absolute_path": path, "relative_path": relative_path, "type": file_type})
-            update_progress(level,path)
-        elif os.path.isdir(path) and CTL.Recursive.state:
-            files = os.listdir(path)
-            progress.append({'total': len(files), 'processed': 0})
-            level += 1
-            for f in files:
-                process_path(os.path.join(path, f), level)
-            #end
-            progress.pop()
-            level -= 1
-        else:
-            return
-        #end
-    #end
-    
-    for path in paths:
-        process_path(path, 0)
-    #end
+    # Scan and classify the files, through the persistent scan index unless it is disabled
+    rules = get_ignore_rules(CTL)
+    file_structures, entries = scan_files(paths, CTL.Recursive.state, rules, scanIndexEnabled, scanIndexDirectory, update_progress,
+                                          keep_entries=fileWatchEnabled)
 
     clearScreen()
 
     # Update the CTL structure after compiling the data
-    CTL.numberOfBinaryFiles = len([f for f in file_structures if f["type"] == "bin"])
-    CTL.numberOfTextFiles = len([f for f in file_structures if f["type"] == "txt"])
+    CTL.numberOfBinaryFiles = file_structures.count_type("bin")
+    CTL.numberOfTextFiles = file_structures.count_type("txt")
     CTL.numberOfFiles = CTL.numberOfBinaryFiles+CTL.numberOfTextFiles if CTL.Binary.state else CTL.numberOfTextFiles
     CTL.currentFile_Ind = 0 if not file_structures else 1
     CTL.currentFile_TotalParts = 0 if not file_structures else 1
     CTL.currentFile_CurrentPart = 0 if not file_structures else 1
 
+    # (Re)start the file watcher on the freshly scanned files
+    if fileWatchEnabled:
+        start_file_watcher(paths, entries, CTL.Recursive.state, rules)
+    #end
+
     return file_structures
 #end
 
+def start_file_watcher(paths: List[str], entries: List[ScanEntry], recursive: bool, rules: IgnoreRules) -> None:
+    if persistent_file_watcher:
+        persistent_file_watcher['watcher'].stop()
+    #end
+    watcher = create_watcher(paths, recursive, entries, rules)
+    persistent_file_watcher['watcher'] = BackgroundWatcher(watcher, fileWatchInterval).start()
+#end
+
+def get_selected_slot(file_structures: FileRecordStore, CTL: ControlStructure) -> int:
+    # The view matching the Binary switch is maintained by the store, the lookup is O(1)
+    files_view = file_structures.view(CTL.Binary.state)
+    if 1 <= CTL.currentFile_Ind <= len(files_view):
+        return files_view[CTL.currentFile_Ind - 1]
+    #end
+    return None
+#end
+
+def get_selected_file_path(file_structures: FileRecordStore, CTL: ControlStructure) -> str:
+    slot = get_selected_slot(file_structures, CTL)
+    return None if slot is None else file_structures.absolute_path(slot)
+#end
+
+def apply_file_deltas(file_structures: FileRecordStore, deltas: List[Tuple[str, str]], CTL: ControlStructure) -> int:
+    """
+    This function applies the file watcher deltas to the file structures and the CTL counters in place.
+    Each delta costs a binary search plus an insertion/removal in the store views, the rest of the tree is not looked at.
+    The selected file stays selected if it still exists.
+
+    Args:
+        file_structures (FileRecordStore): The file record store, updated in place.
+        deltas (List[Tuple[str, str]]): The (kind, path) deltas from the watcher.
+        CTL (ControlStructure): Control structure that keeps track of application state.
+
+    Returns:
+        int: The number of deltas applied.
+    """
+    if not deltas:
+        return 0
+    #end
+
+    root_prefixes = file_structures.root_prefixes
+    selected_path = get_selected_file_path(file_structures, CTL)
+
+    applied = 0
+    for kind, path in deltas:
+        key = get_scan_order_key(path, root_prefixes)
+        if key is None:
+            continue
+        #end
+        position, exists = file_structures.find_position(path)
+
+        if exists: # An add for a known file (e.g. reported twice) replaces it like a modify
+            file_structures.pop(position)
+            applied += 1
+        #end
+
+        if kind in (DELTA_ADD, DELTA_MODIFY):
+            try:
+                if not os.path.isfile(path):
+                    continue
+                #end
+                entry = ScanEntry(path, make_relative_path(path, file_structures.base_length), key[0], os.stat(path))
+            except OSError:
+                continue # Removed again before the delta was applied
+            #end
+            file_type = persistent_file_classifier.classify([entry])[0]
+            file_structures.insert(position, entry, file_type)
+            applied += 1
+        #end
+    #end
+
+    # Update the CTL structure and keep the selected file if it still exists
+    CTL.numberOfBinaryFiles = file_structures.count_type("bin")
+    CTL.numberOfTextFiles = file_structures.count_type("txt")
+    CTL.numberOfFiles = CTL.numberOfBinaryFiles+CTL.numberOfTextFiles if CTL.Binary.state else CTL.numberOfTextFiles
+    selected_position, exists = file_structures.view(CTL.Binary.state).find_position(selected_path) if selected_path else (0, False)
+    if exists:
+        CTL.currentFile_Ind = selected_position + 1
+    else:
+        CTL.currentFile_Ind = min(max(CTL.currentFile_Ind, 1), CTL.numberOfFiles)
+        CTL.currentFile_CurrentPart = 1 if CTL.numberOfFiles else 0
+        CTL.currentFile_TotalParts = 1 if CTL.numberOfFiles else 0
+    #end
+
+    # The unified streams have to be reassembled, only the changed files are read again
+    persistent_unified_stream_cache.clear()
+    return applied
+#end
+
 def printProgressBar (iteration, total, prefix = '', suffix = '', decimals = 1, length = 100, fill = '█', printEnd = "\r"):
+    total = max(total, 1)
     percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
     filledLength = int(length * iteration // total)
     bar = fill * filledLength + '-' * (length - filledLength)
@@ -638,94 +845,91 @@ def printProgressBar (iteration, total, prefix = '', suffix = '', decimals = 1,
 
 ## ================= DIrectory processing functions [3] =================
 
-def print_directory_structures(file_structures: List[Dict], CTL: ControlStructure) -> None:
-    # Filter out binary files if Binary is set to False
-    if not CTL.Binary.state:
-        file_structures = [fs for fs in file_structures if fs['type'] != 'bin']
-    #end
-
-    # Choose the key to access the path to display based on the AbsolutePath setting
-    path_key = 'absolute_path' if CTL.AbsolutePath.state else 'relative_path'
+def print_directory_structures(file_structures: FileRecordStore, CTL: ControlStructure, full_listing: bool = False) -> None:
+    total, render, row_lines = get_directory_renderer(file_structures, CTL)
+    page_rows = CTL.directoryViewport.page_rows // row_lines
 
-    if CTL.DirectoryViewMode.state == CTL.DirectoryViewMode.options[0]:  # Tree
-        # Print as a tree
-        tree = {}
-        for file_structure in file_structures:
-            parts = file_structure[path_key].split('/')
-            node = tree
-            for part in parts:
-                node = node.setdefault(part, {})
-            #end
-        #end
-                
-        def print_tree(node, prefix=""):
-            for key, value in node.items():
-                if value:
-                    CTL.bufferAndPrint(f"{prefix}├── {key}")
-                    print_tree(value, prefix + "│   ")
-                else:
-                    CTL.bufferAndPrint(f"{prefix}└── {key}")
-                #end
-            #end
+    if full_listing:
+        listing = render(0, total)
+        if listing:
+            CTL.bufferAndPrint(listing)
         #end
-                    
-        print_tree(tree)
+        return
+    #end
 
-    elif CTL.DirectoryViewMode.state == CTL.DirectoryViewMode.options[1]:  # List
-        # Print as a list
-        for file_structure in file_structures:
-            CTL.bufferAndPrint(f"[{file_structure['type']}] {file_structure[path_key]}")
+    # Print the visible page, the full listing is rendered only if it is copied
+    first, last = CTL.directoryViewport.window(total, page_rows)
+    window = render(first, last)
+    if window:
+        if CTL.copyListing:
+            CTL.bufferAndPrint(render(0, total), bufferOutSubstitute=window)
+        else:
+            CTL.bufferAndPrint(window)
         #end
-
-    elif CTL.DirectoryViewMode.state == CTL.DirectoryViewMode.options[2]:  # Table
-        # Print as a table
-        table = [["Type", "Path"]] + [[fs['type'], fs[path_key]] for fs in file_structures]
-        CTL.bufferAndPrint(tabulate(table, headers='firstrow', tablefmt='fancy_grid'))
-
-    else:
-        raise Exception("Invalid DirectoryViewMode state")
     #end
+    print(f"{CTL.directoryViewport.status(first, last, total)} ({CTL.kbKey_pageUp}/{CTL.kbKey_pageDown}, "
+          f"{CTL.kbKey_home}/{CTL.kbKey_end}, '{CTL.kbKey_copyListing}' to copy the full listing)")
 #end
   
 ## ================= File processing functions [4] =================
    
-def process_selected_file(file_structures: List[Dict], CTL: ControlStructure) -> None:
+def process_selected_file(file_structures: FileRecordStore, CTL: ControlStructure) -> None:
     """
     This function processes the content of the selected file to be printed.
 
     Args:
-        file_structures (List[Dict]): List of file structures.
+        file_structures (FileRecordStore): The file record store.
         CTL (ControlStructure): Control structure that keeps track of application state.
     """
 
-    # If the binary switch is off, filter out binary files
-    if not CTL.Binary.state:
-        filtered_Structures = [fs for fs in file_structures if fs['type'] != 'bin']
-    else:
-        filtered_Structures = file_structures
-    #end
+    # Find the selected file, skipping the binary files if the binary switch is off
+    slot = get_selected_slot(file_structures, CTL)
 
     # If there's no file to process, return early
-    if CTL.currentFile_Ind == 0 or CTL.currentFile_Ind > len(filtered_Structures):
+    if slot is None:
         print("[ERROR] No file selected for display.")
         return
     #end
 
-    selected_file_structure = filtered_Structures[CTL.currentFile_Ind - 1]
+    selected_file_structure = file_structures.record(slot)
 
     if selected_file_structure['type'] == 'bin':
         print("[INFO] The selected file is a binary file and cannot be displayed.")
         return
     #end
 
+    file_path = selected_file_structure['absolute_path']
+    display_path = selected_file_structure['absolute_path' if CTL.AbsolutePath.state else 'relative_path']
     try:
-        with open(selected_file_structure['absolute_path'], 'r', encoding='utf-8') as file:
-            # Get the file content
-            file_content = file.read()
-            # Process the partitioning
-            partitionTextPrint(file_content, 
-                               selected_file_structure['absolute_path' if CTL.AbsolutePath.state else 'relative_path'], 
-                               CTL.Limit.state, CTL)
+        encoding = get_file_encoding(file_structures, slot)
+        if CTL.Partition.state:
+            # Read only the selected part, through the (cached) part index of the file
+            index = persistent_content_reader.get_index(file_path, encoding)
+            if index.encoding != encoding: # It did not decode past the detection sample
+                file_structures.set_encoding(slot, index.encoding)
+            #end
+            parts_key = (CTL.Limit.state, get_header_mode(CTL))
+            try:
+                starts = persistent_content_reader.get_part_starts(index, parts_key, CTL.Limit.state,
+                                                                   get_header_footer_overhead(CTL, display_path))
+            except ValueError as e:
+                print(f"[ERROR] {e}, increase the character limit.")
+                return
+            #end
+            CTL.currentFile_TotalParts = len(starts) - 1
+            if CTL.currentFile_CurrentPart > CTL.currentFile_TotalParts:
+                print(f"[INFO] No more parts to display for file: {display_path}")
+                return
+            #end
+            printTextPart(persistent_content_reader.read_part(index, starts, parts_key, CTL.currentFile_CurrentPart), display_path, CTL)
+        else:
+            # Get the file content (cached)
+            file_content, file_encoding = persistent_content_reader.read_text(file_path, encoding)
+            if file_encoding != encoding: # It did not decode past the detection sample
+                file_structures.set_encoding(slot, file_encoding)
+            #end
+            # Print the whole file
+            partitionTextPrint(file_content, display_path, CTL.Limit.state, CTL)
         #end
 
     except Exception as e:
@@ -736,7 +940,16 @@ def process_selected_file(file_structures: List[Dict], CTL: ControlStructure) ->
 
 ## ================= Unified Continuous File processing functions [5] =================
 
-persistent_unified_mode_state = {}
+# The unified streams built so far, keyed by the sub-control states they were built with, so that toggling a
+# state back is a cache hit. The streams share the file bodies, a body counts once in the budget as long as a
+# cached stream or the kept segments below hold it
+unifiedStreamCacheBudget = 64 << 20
+persistent_unified_stream_cache = SharedPartsCache(unifiedStreamCacheBudget, "Unified Stream Cache")
+
+# The body of every text file of the unified stream, as path -> ((size, mtime_ns), text). The stream is rebuilt
+# from these bodies and new framing, only the files whose record changed since are read again. They are pinned
+# in the budget of the stream cache, and not kept if they do not fit it
+persistent_unified_segments: Dict[str, Tuple[Tuple[int, int], str]] = {}
 
 def get_current_sub_control_state(CTL: ControlStructure) -> Dict:
     """
@@ -751,232 +964,336 @@ def get_current_sub_control_state(CTL: ControlStructure) -> Dict:
     return {
         'binary_mode': CTL.Binary.state,
         'recursive_mode': CTL.Recursive.state,
+        'ignore_rules_mode': CTL.IgnoreRules.state,
         'directory_view_mode': CTL.DirectoryViewMode.state,
         'character_limit': CTL.Limit.state,
         'absolute_path': CTL.AbsolutePath.state,
         'continuous_unified_mode': True,  # Always True in this function
         # 'partition_mode': CTL.Partition.state,
         'simple_header_footer_mode': CTL.SimpleHeaderFooter.state,
+        'deduplicate_mode': CTL.Deduplicate.state,
     }
 #end
 
-def compare_mode_states(CTL: ControlStructure) -> bool:
+def get_body_sizes(segments: Dict[str, Tuple[Tuple[int, int], str]]) -> Dict[int, int]:
+    """The size of each file body of the segments, by id, as the shared parts of the stream cache."""
+    return {id(segment[1]): sys.getsizeof(segment[1]) for segment in segments.values()}
+#end
+
+def estimate_unified_stream_size(stream: ChunkedText, blocks: List[PackItem], body_sizes: Dict[int, int]) -> int:
+    """The memory held by a unified stream (and its blocks) on top of the file bodies it shares with the other streams."""
+    framing_size = sum(sys.getsizeof(chunk) for chunk in stream.chunks if id(chunk) not in body_sizes)
+    blocks_size = sys.getsizeof(blocks) + sum(sys.getsizeof(block) + sys.getsizeof(block[0]) for block in blocks)
+    return framing_size + sys.getsizeof(stream.chunks) + sys.getsizeof(stream.offsets) + blocks_size
+#end
+
+def refresh_file_stats(file_structures: FileRecordStore, slots: List[int]) -> int:
     """
-    This function compares the current state and the persistent state.
+    This function stats the text files and updates the records of the files changed on disk since they were
+    scanned (without the watcher, nothing else notices an edit).
 
     Args:
-        CTL (ControlStructure): Control structure that keeps track of application state.
+        file_structures (FileRecordStore): The file record store.
+        slots (List[int]): The files to check.
 
     Returns:
-        bool: True if the states are the same, False otherwise.
+        int: The number of records updated.
     """
-    current_state = get_current_sub_control_state(CTL)
-    persistent_state = {k: v for k, v in persistent_unified_mode_state.items() if k != 'data'}
-    return current_state == persistent_state
+    changed = 0
+    for slot in slots:
+        if file_structures.is_binary(slot):
+            continue
+        #end
+        try:
+            changed += file_structures.update_stat(slot, os.stat(file_structures.absolute_path(slot)))
+        except OSError:
+            continue # Reported when the file is read
+        #end
+    #end
+    return changed
 #end
 
-def process_unified_continuous_mode(CTL: ControlStructure, file_structures: List[Dict]) -> None:
+def process_unified_continuous_mode(CTL: ControlStructure, file_structures: FileRecordStore) -> None:
     """
     This function reads all the files, combines them into a single stream, and prints them out.
     It adds a header and footer to each file and respects the control structure states.
+    When the states or the files change, the stream is reassembled from the kept file bodies: a change of the
+    framing (headers, paths, listing) reads nothing, and a changed file (a new size or mtime on disk) is the only
+    one read again. The files are only checked on disk when a stream is built, moving between the parts of a
+    cached stream costs no file system call (the watcher, if enabled, reports the changes in between).
     """
-    if not persistent_unified_mode_state or not compare_mode_states(CTL):
-        # Compute the unified mode state
-        persistent_unified_mode_state.update(get_current_sub_control_state(CTL))
-        
-        ns = 0 if CTL.SimpleHeaderFooter.state else 30
-        sepLine = lambda n=ns: '\n'+n*'='+'\n'
-        CTL.bufferAndPrint(f"{sepLine()}File structure:{sepLine()}")
+    state_key = tuple(get_current_sub_control_state(CTL).values())
+    cached = persistent_unified_stream_cache.get(state_key, None)
+    if cached is None:
+        # A changed file invalidates the streams of the other states, built with its old content
+        if refresh_file_stats(file_structures, file_structures.view(False)):
+            persistent_unified_stream_cache.clear()
+        #end
+        stream_start = len(CTL.buff)
         # Add the directory file structure
-        print_directory_structures(file_structures, CTL) 
-        CTL.bufferAndPrint(f"{sepLine()}File(s) Content:{sepLine()}")
-
-        # Overwrite partition state
-        partitionState = CTL.Partition.state
-        CTL.Partition.state = False
-        CTL.Continuous.state = False
-        # Loop over all files and load them into memory
-        for file_structure in file_structures:
-            file_path = file_structure['absolute_path']
-            if file_structure['type'] != 'bin':
-                try:    
-                    with open(file_path, 'r', encoding='utf-8') as file:
-                        # Get the file content
-                        file_content = file.read()
-                        
-                        # Compute and add header and footer
-                        header, footer = compute_header_footer(CTL, file_path)
-                        fileContent = sepLine() + header + file_content + footer
-                        # CTL.buff += fileContent
-                        CTL.bufferAndPrint(fileContent)
+        CTL.bufferAndPrint(get_unified_preamble(file_structures, CTL), end="")
+        blocks = [("File structure", stream_start, len(CTL.buff))] # The (label, start, stop) range of each block, for the packing
+
+        # The files with the same content as an earlier one are only referenced, they are not read
+        files_view = file_structures.view()
+        duplicates = find_duplicate_files(file_structures, files_view) if CTL.Deduplicate.state else {}
+        saved_characters = 0
+
+        # Only the new and changed files are loaded into memory, they are read in parallel and consumed in order
+        get_validator = lambda slot: (file_structures.sizes[slot], file_structures.mtimes[slot])
+        to_read = [slot for slot in files_view if not file_structures.is_binary(slot) and slot not in duplicates and
+                   persistent_unified_segments.get(file_structures.absolute_path(slot), (None,))[0] != get_validator(slot)]
+        reads = persistent_content_reader.read_texts((file_structures.absolute_path(slot), file_structures.get_encoding(slot),
+                                                      file_structures.sizes[slot]) for slot in to_read)
+
+        # Loop over all files
+        segments = {}
+        for slot in files_view:
+            file_path = file_structures.absolute_path(slot)
+            block_start = len(CTL.buff)
+            if slot in duplicates:
+                reference = get_unified_file_framing(file_structures, slot, CTL, duplicates[slot])[0]
+                CTL.bufferAndPrint(reference, end="")
+                original = segments.get(file_structures.absolute_path(duplicates[slot]))
+                if original is not None:
+                    saved_characters += sum(map(len, get_unified_file_framing(file_structures, slot, CTL))) + len(original[1]) - len(reference)
+                #end
+            elif not file_structures.is_binary(slot):
+                try:
+                    # Get the file content, decoded with its detected encoding
+                    validator = get_validator(slot)
+                    segment = persistent_unified_segments.get(file_path)
+                    if segment is None or segment[0] != validator:
+                        encoding, file_content, error = next(reads)
+                        if error is not None:
+                            raise error
+                        #end
+                        file_structures.set_encoding(slot, encoding)
+                        segment = (validator, file_content)
                     #end
+                    segments[file_path] = segment
+                    file_content = segment[1]
+
+                    # Compute and add header and footer, the content is added as a chunk of its own (not copied)
+                    prefix, suffix = get_unified_file_framing(file_structures, slot, CTL)
+                    CTL.bufferAndPrint(prefix, end="")
+                    CTL.bufferAndPrint(file_content, end="")
+                    CTL.bufferAndPrint(suffix, end="")
 
                 except Exception as e:
                     print(f"[ERROR] An error occurred while reading the file: {e}")
                 #end
             else:
-                CTL.bufferAndPrint(sepLine()+"[INFO] binary file: " + file_path)
+                CTL.bufferAndPrint(get_unified_file_framing(file_structures, slot, CTL)[0], end="")
+            #end
+            if len(CTL.buff) > block_start:
+                blocks.append((file_path, block_start, len(CTL.buff)))
             #end
         #end
-        CTL.Partition.state = partitionState# Restore original state
-        CTL.Continuous.state = True
+        reads.close() # Shut the reading threads down
+
+        # Keep the bodies of the files still in the stream
+        reused_count = sum(1 for path, segment in segments.items() if persistent_unified_segments.get(path) is segment)
+        persistent_unified_segments.clear()
+        persistent_unified_segments.update(segments)
+        body_sizes = get_body_sizes(segments)
+        if not persistent_unified_stream_cache.pin(body_sizes):
+            persistent_unified_segments.clear() # Larger than the budget, read again on the next rebuild
+        #end
+        print(f"[INFO] Unified stream: {len(to_read)} text file(s) read, {reused_count} reused")
+        if duplicates:
+            summary = get_deduplication_summary(duplicates, file_structures, saved_characters, len(CTL.buff) - stream_start, CTL)
+            print(f"[INFO] Unified stream: {summary['duplicates']} duplicate file(s) referenced, {summary['saved_bytes']} bytes and "
+                  f"{summary['saved_characters']} characters saved (about {summary['saved_parts']} part(s) at the current limit)")
+        #end
 
-        persistent_unified_mode_state['data'] = CTL.buff# Initialize the data field
+        # Keep the stream for this state, even over the budget (the streams of the other states are evicted first).
+        # The buffer is replaced, not cleared, after the copy
+        persistent_unified_stream_cache.put_shared(state_key, None, (CTL.buff, blocks),
+                                                   estimate_unified_stream_size(CTL.buff, blocks, body_sizes), body_sizes)
+    elif CTL.Partition.state and CTL.Packing.state != PACK_STREAM:
+        # Print the part of the packed files
+        packedTextPrint(cached[0], cached[1], unifiedStreamName, CTL.Limit.state, CTL)
     else:
         # Print the combined text
-        partitionTextPrint(persistent_unified_mode_state['data'], "Continuous file stream.", CTL.Limit.state, CTL)
+        partitionTextPrint(cached[0], unifiedStreamName, CTL.Limit.state, CTL)
     #end
 #end
 
 ## ================= Text Partitioning Functions [*Utility] =================
 
-def compute_header_footer(CTL: ControlStructure, file_path: str, part_n: int = None, tot_parts: int = None) -> Tuple[str, str]:
+persistent_content_cache = ContentCache(contentCacheBudget)# Decoded text, part indexes and parts of the recently viewed files
+persistent_content_reader = FileContentReader(persistent_content_cache)
+
+# Prefetch of the neighbouring files and the next part, through a reader that does not count in the cache statistics
+prefetchEnabled = True
+persistent_prefetcher = Prefetcher()
+persistent_prefetch_reader = FileContentReader(persistent_content_cache, count_stats=False)
+
+def make_prefetch_task(file_path: str, display_path: str, encoding: Optional[str], part_numbers: List[int], CTL: ControlStructure):
     """
-    This function computes and returns the header and footer strings.
+    This function makes a prefetch task that reads a file into the content cache, the way process_selected_file reads it.
 
     Args:
+        file_path (str): The absolute path of the file.
+        display_path (str): The path shown in the header, the part lengths depend on it.
+        encoding (Optional[str]): The encoding in the file records, detected by the task if None (but not stored,
+            the records are only updated from the main thread).
+        part_numbers (List[int]): The parts to read when partitioning is ON.
         CTL (ControlStructure): Control structure that keeps track of application state.
-        file_path (str): The path to the file.
-        part_n: int = 0 Default total file parts 
-        tot_parts: int = 0 Default file part 
-
-    Returns:
-        Tuple[str, str]: The header and footer strings.
     """
-    part_info = None
-    if CTL.Partition.state:
-        if tot_parts is None or part_n is None:
-            tot_parts = CTL.currentFile_TotalParts
-            part_n = CTL.currentFile_CurrentPart
+    partition = CTL.Partition.state
+    parts_key = (CTL.Limit.state, get_header_mode(CTL))
+    overhead = get_header_footer_overhead(CTL, display_path)
+
+    def task(is_cancelled) -> None:
+        file_encoding = encoding or detect_file_encoding(file_path)
+        if not partition:
+            persistent_prefetch_reader.read_text(file_path, file_encoding)
+            return
+        #end
+        index = persistent_prefetch_reader.get_index(file_path, file_encoding)
+        if is_cancelled():
+            return
+        #end
+        starts = persistent_prefetch_reader.get_part_starts(index, parts_key, parts_key[0], overhead)
+        for part_n in part_numbers:
+            if is_cancelled():
+                return
+            #end
+            if part_n < len(starts):
+                persistent_prefetch_reader.read_part(index, starts, parts_key, part_n)
+            #end
         #end
-        part_info = f'Part {part_n}/{tot_parts}'
     #end
+    return task
+#end
 
-    if CTL.Continuous.state:
-        stream = "Text Stream"
-    else:
-        stream = "File"
-    #end
+def schedule_prefetch(file_structures: FileRecordStore, CTL: ControlStructure) -> None:
+    """
+    This function schedules the prefetch of what the arrow keys lead to: the next part of the current file,
+    then the first part of the next and of the previous file. It replaces the tasks of the previous key press.
 
-    if CTL.SimpleHeaderFooter.state:    
-        header = f'{stream}: "{file_path}" {part_info if part_info else ""}:\n"\n'
-        footer = f'"'
-    else:
-        header = f'{stream}: "{file_path}"\n--- Beginning of {stream} {part_info if part_info else ""} ---\n'
-        footer = f'\n--- End of {stream} {part_info if part_info else ""} ---\n'
+    Args:
+        file_structures (FileRecordStore): The file record store.
+        CTL (ControlStructure): Control structure that keeps track of application state.
+    """
+    if not prefetchEnabled:
+        return
     #end
+    files_view = file_structures.view(CTL.Binary.state)
+    tasks = []
+    for file_ind, part_numbers in ((CTL.currentFile_Ind, [CTL.currentFile_CurrentPart + 1]),
+                                   (CTL.currentFile_Ind + 1, [1]),
+                                   (CTL.currentFile_Ind - 1, [1])):
+        if not 1 <= file_ind <= len(files_view):
+            continue
+        #end
+        slot = files_view[file_ind - 1]
+        if file_structures.is_binary(slot) or (file_ind == CTL.currentFile_Ind and not CTL.Partition.state):
+            continue
+        #end
+        tasks.append(make_prefetch_task(file_structures.absolute_path(slot), file_structures.display_path(slot, CTL.AbsolutePath.state),
+                                        file_structures.get_encoding(slot), part_numbers, CTL))
+    #end
+    persistent_prefetcher.schedule(tasks)
+#end
 
-    return header, footer
+def get_header_mode(CTL: ControlStructure) -> Tuple:
+    """The control states the header and footer depend on (besides the part numbers)."""
+    return (CTL.SimpleHeaderFooter.state, CTL.AbsolutePath.state, CTL.Continuous.state)
 #end
 
-def partitionTextPrint(text_content: str, file_path:str, characterLimit:int, CTL: ControlStructure):
+def partitionTextPrint(text_content: Union[str, ChunkedText], file_path:str, characterLimit:int, CTL: ControlStructure):
     # Edit if there is character limit, i.e. partitioning is ON
     if CTL.Partition.state:
-        # Compute optimal text character length
-        optimal_text_part_length = get_optimal_part_text_length(text_content, file_path, characterLimit, CTL)
-
-        parts = split_text_into_parts(text_content, optimal_text_part_length)
-        CTL.currentFile_TotalParts = len(parts)
-        if CTL.currentFile_CurrentPart > len(parts):
+        # Partition the text so that each part fits the limit with its header and footer. The part offsets of
+        # the same text (e.g. the unified streams) are cached, keyed by its hash (or by its id, for the chunked
+        # unified streams, which only grow) and validated by its length
+        text_id = text_content.text_id if isinstance(text_content, ChunkedText) else hash(text_content)
+        parts_key = ('text parts', file_path, characterLimit, get_header_mode(CTL), text_id)
+        text_validator = len(text_content)
+        starts = persistent_content_cache.get(parts_key, text_validator)
+        if starts is None:
+            try:
+                _, starts = fit_parts(len(text_content), characterLimit, get_header_footer_overhead(CTL, file_path),
+                                      lambda text_limit: split_text_starts(text_content, text_limit))
+            except ValueError as e:
+                print(f"[ERROR] {e}, increase the character limit.")
+                return
+            #end
+            persistent_content_cache.put(parts_key, text_validator, starts)
+        #end
+        CTL.currentFile_TotalParts = len(starts) - 1
+        if CTL.currentFile_CurrentPart > CTL.currentFile_TotalParts:
             print(f"[INFO] No more parts to display for file: {file_path}")
             return
         #end
 
-        text_content = parts[CTL.currentFile_CurrentPart - 1]
-    #end
-    
-    verbosePrintOut = ""
-    if not CTL.Verbose.state:
-        verbosePrintOut = " [Text content console output only - Verbose State (OFF) ] "
+        text_content = get_text_part(text_content, starts, CTL.currentFile_CurrentPart)
     #end
 
-    # Compute and print header and footer based on the control settings
-    header, footer = compute_header_footer(CTL, file_path)
-    # Read and print the file content or the selected part
-    CTL.bufferAndPrint(header)
-    CTL.bufferAndPrint(text_content, verbosePrintOut)
-    CTL.bufferAndPrint(footer)
-    print([f'INFO: File[ {file_path} ]'])
-    
-    print(f"\n Total character length : {len(header)+len(text_content)+len(footer)}")
+    printTextPart(text_content, file_path, CTL)
 #end
 
-def get_optimal_part_text_length(text_content: str, file_path:str, absolute_limit:int, CTL: ControlStructure) -> int:
+def packedTextPrint(text_content: ChunkedText, blocks: List[PackItem], file_path: str, characterLimit: int, CTL: ControlStructure) -> None:
     """
-    This function determines the optimal text part length so that 
-    each part does not exceed the absolute character limit when the header and footer are included.
+    This function prints a part of the unified stream packed with whole files, and lists the files in the part.
 
     Args:
-        text_content (str): The content of the file.
+        text_content (ChunkedText): The unified stream.
+        blocks (List[PackItem]): The (label, start, stop) range of each file of the stream.
+        file_path (str): The name shown in the header.
+        characterLimit (int): The character limit of a part including its header and footer.
         CTL (ControlStructure): Control structure that keeps track of application state.
-
-    Returns:
-        int: The optimal part text length.
     """
-    # Get the full file size in characters
-    full_file_size = len(text_content)
-
-    # Start with an estimate of 1 part
-    p = 1 # number of parts
-
-    while True:
-        # Compute the length of the header and footer for the current part count
-        header, footer = compute_header_footer(CTL, file_path,p,p)
-        hf_length = len(header) + len(footer)
-
-        # Compute the text character limit for the file content
-        text_limit = absolute_limit - hf_length
-
-        # Compute the new number of parts
-        new_p = full_file_size // text_limit
-        if full_file_size % text_limit != 0:
-            new_p += 1
-        #end
-        # TODO: test the algorithm in more detail
-        # If the total characters (file content + header/footer) is less than the absolute character limit,
-        # or the number of parts didn't change, return the current text character limit
-        if text_limit * new_p + hf_length * new_p <= absolute_limit or new_p == p:
-            return text_limit
+    parts_key = ('packed parts', file_path, characterLimit, get_header_mode(CTL), CTL.Packing.state, text_content.text_id)
+    parts = persistent_content_cache.get(parts_key, len(text_content))
+    if parts is None:
+        try:
+            parts = pack_parts(text_content, blocks, characterLimit, get_header_footer_overhead(CTL, file_path), CTL.Packing.state)
+        except ValueError as e:
+            print(f"[ERROR] {e}, increase the character limit.")
+            return
         #end
+        persistent_content_cache.put(parts_key, len(text_content), parts)
+    #end
+    CTL.currentFile_TotalParts = len(parts)
+    if CTL.currentFile_CurrentPart > CTL.currentFile_TotalParts:
+        print(f"[INFO] No more parts to display for file: {file_path}")
+        return
+    #end
 
-        # Otherwise, continue the loop with the new part count
-        p = new_p
+    part = parts[CTL.currentFile_CurrentPart - 1]
+    printTextPart(get_packed_part(text_content, part), file_path, CTL)
+    print(f" Part {CTL.currentFile_CurrentPart} ({CTL.Packing.state}) contains {len(part)} file(s):")
+    for label, _, _ in part:
+        print(f"   {label}")
     #end
 #end
 
-def split_text_into_parts(text_content: str, character_limit: int) -> List[str]:
-    """
-    This function reads a text from memory and splits it into parts. Each part will not exceed 
-    the character limit and will not break in the middle of a line. 
-
-    Args:
-        text_content (str): The content of the file.
-        character_limit (int): The maximum number of characters for each part.
-
-    Returns:
-        List[str]: A list of strings where each string is a part of the file.
-    """
-    parts = []
-    part = []
-    part_length = 0
-    for line in text_content.split('\n'):
-        line_length = len(line) + 1  # Adding 1 for the newline character
-        if part_length + line_length > character_limit:
-            parts.append("".join(part))
-            part = []
-            part_length = 0
-        #end
-        part.append(line + '\n')  # Adding back the newline character
-        part_length += line_length
-    #end
-    if part:
-        parts.append("".join(part))
+def printTextPart(text_content: str, file_path: str, CTL: ControlStructure) -> None:
+    verbosePrintOut = ""
+    if not CTL.Verbose.state:
+        verbosePrintOut = " [Text content console output only - Verbose State (OFF) ] "
     #end
-    return parts
+
+    # Compute and print header and footer based on the control settings
+    header, footer = compute_header_footer(CTL, file_path)
+    # Read and print the file content or the selected part
+    CTL.bufferAndPrint(header)
+    CTL.bufferAndPrint(text_content, verbosePrintOut)
+    CTL.bufferAndPrint(footer)
+    print([f'INFO: File[ {file_path} ]'])
+    
+    print(f"\n Total character length : {len(header)+len(text_content)+len(footer)+partNewlineCount}")
 #end
 
 ## ================= Screen & Custom Print/Buffer Functions [*Utility] =================
 def clearScreen():
+    if not interactiveMode:
+        return
+    #end
     # Clear the terminal
     if os.name == 'nt':  # Windows
         os.system('cls')
@@ -1014,16 +1331,140 @@ def create_executable(file_list: List[str]) -> None:
     #end
 #end
 
+def export_parts(paths: List[str], directory: str, groups: List[str], CTL: ControlStructure, since: Optional[str] = None) -> None:
+    """
+    This function exports the parts of the files to numbered files in a directory, with a JSON manifest, without
+    the interactive control loop (e.g. in a CI job). The snapshot of the files is written next to them, for the
+    delta of the next export.
+
+    Args:
+        paths (List[str]): The files and directories to process.
+        directory (str): The export directory.
+        groups (List[str]): The parts to export, PARTS_FILES, PARTS_UNIFIED and/or PARTS_DELTA.
+        CTL (ControlStructure): Control structure with the settings of the export (limit, headers, paths).
+        since (Optional[str]): The snapshot the delta is made against, the one of the previous export to the
+            directory if None.
+
+    Raises:
+        FileNotFoundError: If the since snapshot does not exist (nothing is written then).
+        ValueError: If the limit cannot hold the header and footer of a part (nothing is written then).
+    """
+    # Only the snapshot of the previous export may be missing (the first export adds all the files)
+    if since and not os.path.isfile(since):
+        raise FileNotFoundError(f"Snapshot does not exist: {since}")
+    #end
+    file_structures = process_input(paths, CTL)
+    check_export_limit(file_structures, groups, CTL)
+    snapshot_path = os.path.join(directory, snapshotFileName)
+    snapshot = load_snapshot(since or snapshot_path)
+    current = make_snapshot(file_structures, snapshot[1] if snapshot else {})
+
+    settings = dict(paths=paths, limit=CTL.Limit.state, groups=groups, simple_headers=CTL.SimpleHeaderFooter.state,
+                    absolute_paths=CTL.AbsolutePath.state, binary=CTL.Binary.state, deduplicate=CTL.Deduplicate.state,
+                    files=len(file_structures), since=snapshot[0] if snapshot else None)
+    with PartExporter(directory, settings) as exporter:
+        for group in groups:
+            errors = []
+            summary = {}
+            exporter.start_group(group)
+            if group == PARTS_FILES:
+                parts = iter_file_parts(file_structures, CTL, errors)
+            elif group == PARTS_UNIFIED:
+                parts = iter_unified_parts(file_structures, CTL, errors, summary)
+            else:
+                parts = iter_delta_parts(file_structures, CTL, errors, snapshot, current, summary)
+            #end
+            for part in parts:
+                exporter.write_part(group, part)
+            #end
+            exporter.add_summary(group, summary)
+            for source, error in errors:
+                exporter.add_error(group, source, error)
+                print(f"[ERROR] {source}: {error}")
+            #end
+            print(f"[INFO] Export {group}: {exporter.counts[group]} part(s), {exporter.characters[group]} characters" +
+                  "".join(f", {key.replace('_', ' ')}: {value}" for key, value in summary.items() if value))
+        #end
+    #end
+    save_snapshot(snapshot_path, current)
+    print(f"[INFO] Exported to: {directory}")
+#end
+
+def positive_int(value: str) -> int:
+    """The argparse type of the limits."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, not {value}")
+    #end
+    return number
+#end
+
 ## ================= Call the main function [0] =================
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="File and directory processing tool that copies file content to the clipboard in a continuous way.")
     parser.add_argument("paths", nargs="+", help="List of files and directories to process")
+    parser.add_argument("--no-index", action="store_true", help="Do not use the persistent scan index")
+    parser.add_argument("--index-dir", default=None, help="Directory where the scan index files are stored")
+    parser.add_argument("--include", action="append", default=[], metavar="GLOB", help="Only keep the files matching this glob (repeatable)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB", help="Exclude the files and directories matching this glob (repeatable)")
+    parser.add_argument("--no-gitignore", action="store_true", help="Do not honour the .gitignore files")
+    parser.add_argument("--no-default-excludes", action="store_true", help="Do not exclude .git, node_modules, build, virtual environments etc. by default")
+    parser.add_argument("--page-rows", type=int, default=20, help="Number of rows per page in the directory views")
+    parser.add_argument("--cache-mb", type=float, default=contentCacheBudget / 2**20, help="Memory budget of the file content cache in MB")
+    parser.add_argument("--unified-cache-mb", type=float, default=unifiedStreamCacheBudget / 2**20, help="Memory budget of the unified streams kept per control state in MB")
+    parser.add_argument("--no-prefetch", action="store_true", help="Do not prefetch the neighbouring files and parts in the background")
+    parser.add_argument("--watch", action="store_true", help="Watch the paths and update the file tree in place when files change")
+    parser.add_argument("--watch-interval", type=float, default=1.0, help="Seconds between file watcher polls")
+    parser.add_argument("--export", default=None, metavar="DIR", help="Write all the parts to numbered files in DIR with a JSON manifest, without the interactive mode")
+    parser.add_argument("--export-mode", choices=["files", "unified", "both", "delta"], default="both", help="Export the parts of each file, of the unified stream, both, or only the changes since the last export (see --since)")
+    parser.add_argument("--since", default=None, metavar="SNAPSHOT", help="Snapshot file the delta is made against, defaults to the snapshot.json of the previous export to the export directory")
+    parser.add_argument("--limit", type=positive_int, default=None, help="Character limit of an exported part, header and footer included")
+    parser.add_argument("--simple-headers", action="store_true", help="Use the simple headers and footers in the exported parts")
+    parser.add_argument("--absolute-paths", action="store_true", help="Show the absolute paths in the exported parts")
+    parser.add_argument("--no-binary", action="store_true", help="Leave the binary files out of the exported listing")
+    parser.add_argument("--clipboard-file", default=None, metavar="FILE", help="Write the copied text to FILE instead of the system clipboard (e.g. on a machine without one)")
+    parser.add_argument("--no-dedup", action="store_true", help="Export the files with the same content as an earlier file in full in the unified stream")
     
     args = parser.parse_args()
     paths = args.paths
+    scanIndexEnabled = not args.no_index
+    scanIndexDirectory = args.index_dir
+    ignoreIncludePatterns = args.include
+    ignoreExcludePatterns = args.exclude
+    ignoreGitignoreFiles = not args.no_gitignore
+    ignoreDefaultDirectories = not args.no_default_excludes
+    directoryPageRows = args.page_rows
+    persistent_content_cache.max_bytes = int(args.cache_mb * 2**20)
+    persistent_unified_stream_cache.max_bytes = int(args.unified_cache_mb * 2**20)
+    prefetchEnabled = not args.no_prefetch
+    fileWatchEnabled = args.watch
+    fileWatchInterval = args.watch_interval
+    if args.clipboard_file:
+        persistent_clipboard_writer.backend = FileClipboard(args.clipboard_file)
+    #end
 
     # Sanitize the Paths    
     paths = [sanitizePath(path) for path in paths]
 
-    controlLoopProcess(paths)
+    if args.export:
+        interactiveMode = False
+        CTL = ControlStructure()
+        CTL.Verbose.state = False
+        CTL.SimpleHeaderFooter.state = args.simple_headers
+        CTL.AbsolutePath.state = args.absolute_paths
+        CTL.Binary.state = not args.no_binary
+        CTL.Deduplicate.state = not args.no_dedup
+        if args.limit is not None:
+            CTL.Limit.state = args.limit
+        #end
+        try:
+            export_parts(paths, args.export, [PARTS_FILES, PARTS_UNIFIED] if args.export_mode == "both" else [args.export_mode], CTL, args.since)
+        except FileNotFoundError as e:
+            parser.error(f"argument --since: {e}")
+        except ValueError as e:
+            parser.error(f"argument --limit: {e}")
+        #end
+    else:
+        controlLoopProcess(paths)
+    #end
 #end
\ No newline at end of file
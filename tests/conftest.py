@@ -0,0 +1,8 @@
+"""
+The modules of the tool live at the repository root, next to main.py, make them importable from the tests.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
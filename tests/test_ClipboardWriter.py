@@ -0,0 +1,95 @@
+"""
+Tests of the background clipboard writer.
+"""
+
+import threading
+
+from ClipboardWriter import ClipboardWriter, MemoryClipboard, FileClipboard
+
+class BlockingClipboard(MemoryClipboard):
+    """A memory clipboard whose writes wait until they are released."""
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+    #end
+
+    def copy(self, text: str) -> None:
+        self.started.set()
+        self.release.wait(5)
+        super().copy(text)
+    #end
+#end
+
+class FailingClipboard:
+    """A clipboard whose writes fail."""
+
+    def copy(self, text: str) -> None:
+        raise OSError("no clipboard")
+    #end
+#end
+
+def test_quick_submits_write_the_last_text():
+    backend = MemoryClipboard()
+    writer = ClipboardWriter(backend)
+    for i in range(50):
+        writer.submit(f"text {i}")
+    #end
+    assert writer.flush(5)
+    assert backend.text == "text 49"
+    assert 1 <= backend.writeCount <= 50
+    assert backend.writeCount == writer.writtenCount
+    assert writer.pop_error() is None
+#end
+
+def test_texts_submitted_during_a_write_are_coalesced():
+    backend = BlockingClipboard()
+    writer = ClipboardWriter(backend)
+    writer.submit("first")
+    assert backend.started.wait(5)
+    for i in range(10):
+        writer.submit(f"text {i}")
+    #end
+    backend.release.set()
+    assert writer.flush(5)
+    assert backend.writeCount == 2
+    assert backend.text == "text 9"
+    assert writer.coalescedCount == 9
+#end
+
+def test_unchanged_text_is_not_written_again():
+    backend = MemoryClipboard()
+    writer = ClipboardWriter(backend)
+    writer.submit("same")
+    assert writer.flush(5)
+    writer.submit("same")
+    assert writer.flush(5)
+    assert backend.writeCount == 1
+    assert writer.unchangedCount == 1
+#end
+
+def test_errors_are_reported_once():
+    writer = ClipboardWriter(FailingClipboard())
+    writer.submit("text")
+    assert writer.flush(5)
+    assert isinstance(writer.pop_error(), OSError)
+    assert writer.pop_error() is None
+
+    # The writer keeps going after a failed write
+    writer.backend = MemoryClipboard()
+    writer.submit("text")
+    assert writer.flush(5)
+    assert writer.backend.text == "text"
+    assert writer.pop_error() is None
+#end
+
+def test_file_clipboard(tmp_path):
+    path = str(tmp_path / "clipboard.txt")
+    writer = ClipboardWriter(FileClipboard(path))
+    writer.submit("line\r\nnext")
+    assert writer.flush(5)
+    with open(path, encoding='utf-8', newline='') as file:
+        assert file.read() == "line\r\nnext"
+    #end
+#end
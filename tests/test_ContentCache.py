@@ -0,0 +1,71 @@
+"""
+Tests of the reads through the content cache.
+"""
+
+import os
+
+from ContentCache import ContentCache, SharedPartsCache, FileContentReader
+from TextDecoding import encodingSampleSize, fallbackEncoding
+
+def test_read_file_returns_the_encoding_it_decoded_with(tmp_path):
+    path = os.path.join(str(tmp_path), "latin.txt")
+    with open(path, 'wb') as file:
+        file.write(b"plain ascii line\n" * (encodingSampleSize // 17 + 1) + b"caf\xe9\n") # Not UTF-8, past the sample
+    #end
+    reader = FileContentReader(ContentCache())
+    encoding, text, error = reader.read_file(path, None)
+    assert error is None
+    assert encoding == fallbackEncoding
+    assert text.endswith("caf\xe9\n")
+
+    # Cached, still with the encoding it decoded with
+    assert reader.read_text(path, 'utf-8') == (text, fallbackEncoding)
+    assert reader.cache.hits == 1
+#end
+
+def test_read_file_keeps_the_detected_encoding(tmp_path):
+    path = os.path.join(str(tmp_path), "utf8.txt")
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write("caf\xe9\r\nsecond line\n")
+    #end
+    assert FileContentReader(ContentCache()).read_file(path, None) == ('utf-8', "caf\xe9\nsecond line\n", None)
+#end
+
+def test_shared_parts_count_once():
+    cache = SharedPartsCache(1000)
+    cache.put_shared("a", None, "value a", 10, {1: 300, 2: 200})
+    cache.put_shared("b", None, "value b", 10, {2: 200, 3: 100})
+    assert cache.current_bytes == 10 + 10 + 300 + 200 + 100
+    cache.clear()
+    assert cache.current_bytes == 0 and not cache.part_holders
+#end
+
+def test_shared_parts_are_released_by_eviction():
+    cache = SharedPartsCache(1000)
+    cache.put_shared("a", None, "value a", 10, {1: 400})
+    cache.put_shared("b", None, "value b", 10, {2: 400})
+    cache.put_shared("c", None, "value c", 10, {3: 400}) # Evicts a, and its part
+    assert cache.get("a", None) is None
+    assert cache.get("b", None) == "value b"
+    assert cache.current_bytes == 2 * (10 + 400) <= cache.max_bytes
+    assert cache.put_shared("d", None, "value d", 10, {4: 1000}) == "value d" # Larger than the budget
+    assert cache.get("d", None) == "value d" # Kept as the current value, the others are evicted
+    assert cache.get("b", None) is None and cache.get("c", None) is None
+    assert cache.current_bytes == 10 + 1000
+    cache.put_shared("e", None, "value e", 10, {5: 400}) # A new current value, d is evicted
+    assert cache.get("d", None) is None
+    assert cache.current_bytes == 10 + 400
+#end
+
+def test_pinned_parts_count_in_the_budget():
+    cache = SharedPartsCache(1000)
+    cache.put_shared("a", None, "value a", 10, {1: 400})
+    cache.put_shared("b", None, "value b", 10, {2: 400})
+    assert cache.pin({2: 400, 3: 400}) # The parts of b and a new one, a is evicted
+    assert cache.get("a", None) is None
+    assert cache.current_bytes == 10 + 400 + 400
+    cache.clear() # The pinned parts stay
+    assert cache.current_bytes == 800
+    assert not cache.pin({4: 2000})
+    assert cache.current_bytes == 0 and not cache.pinned_parts
+#end
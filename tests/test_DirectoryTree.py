@@ -0,0 +1,88 @@
+"""
+Tests of the tree model of the Tree directory view.
+"""
+
+import os
+
+from DirectoryTree import DirectoryTree
+from FileRecordStore import FileRecordStore
+from FileScanner import ScanEntry, scan_paths
+
+def make_tree(root):
+    for path in ("src/main.py", "src/lib/util.py", "src/lib/logo.png", "docs/readme.md", "setup.py"):
+        (root / "tree" / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / "tree" / path).write_text("text\n")
+    #end
+    return str(root / "tree").replace("\\", "/")
+#end
+
+def make_store(root):
+    entries = scan_paths([root])
+    return FileRecordStore.from_scan(entries, ["bin" if entry.path.endswith(".png") else "txt" for entry in entries], [root])
+#end
+
+expected_lines = [
+    "├── docs",
+    "│   └── readme.md",
+    "└── setup.py",
+    "├── src",
+    "│   ├── lib",
+    "│   │   └── logo.png",
+    "│   │   └── util.py",
+    "│   └── main.py",
+]
+
+def test_render(tmp_path):
+    tree = DirectoryTree(False, True)
+    tree.attach(make_store(make_tree(tmp_path)))
+    assert tree.render() == expected_lines
+    assert len(tree) == len(expected_lines)
+
+    # Any window renders the same lines as the slice of the whole tree
+    for start in range(len(expected_lines) + 1):
+        for stop in range(start, len(expected_lines) + 1):
+            assert list(tree.iter_lines(start, stop)) == expected_lines[start:stop]
+        #end
+    #end
+#end
+
+def test_render_without_the_binary_files(tmp_path):
+    tree = DirectoryTree(False, False)
+    tree.attach(make_store(make_tree(tmp_path)))
+    assert tree.render() == [line for line in expected_lines if not line.endswith("logo.png")]
+#end
+
+def test_store_changes_update_the_tree(tmp_path):
+    root = make_tree(tmp_path)
+    store = make_store(root)
+    tree = DirectoryTree(False, True)
+    tree.attach(store)
+    tree.render()
+
+    path = root + "/src/new/added.py"
+    os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as file:
+        file.write("text\n")
+    #end
+    store.insert(store.find_position(path)[0], ScanEntry(path, "src/new/added.py", 0, os.stat(path)), "txt")
+    assert tree.render()[6:] == ["│   │   └── util.py", "│   └── main.py", "│   ├── new", "│   │   └── added.py"]
+
+    # Removing the last file of a directory removes the directory
+    store.pop(store.find_position(path)[0])
+    assert tree.render() == expected_lines
+    store.pop(store.find_position(root + "/docs/readme.md")[0])
+    assert tree.render() == expected_lines[2:]
+#end
+
+def test_rescan_is_diffed_into_the_tree(tmp_path):
+    root = make_tree(tmp_path)
+    tree = DirectoryTree(False, True)
+    old_store = make_store(root)
+    tree.attach(old_store)
+    os.remove(root + "/setup.py")
+    new_store = make_store(root)
+    tree.attach(new_store)
+    assert tree.render() == [line for line in expected_lines if not line.endswith("setup.py")]
+    assert tree.on_store_change not in old_store.listeners
+    assert tree.on_store_change in new_store.listeners
+#end
@@ -0,0 +1,127 @@
+"""
+Tests of the columnar file record store.
+"""
+
+import os
+
+from FileRecordStore import FileRecordStore, TYPE_FREE
+from FileScanner import ScanEntry, scan_paths
+
+def make_tree(root):
+    for path, content in (("src/main.py", "print(1)\n"), ("src/lib/util.py", "x = 1\n"), ("src/logo.png", "\x00png"),
+                          ("docs/readme.md", "# Doc\n")):
+        (root / "tree" / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / "tree" / path).write_text(content)
+    #end
+    return str(root / "tree").replace("\\", "/")
+#end
+
+def make_store(root):
+    entries = scan_paths([root])
+    file_types = ["bin" if entry.path.endswith(".png") else "txt" for entry in entries]
+    return FileRecordStore.from_scan(entries, file_types, [root]), entries
+#end
+
+def make_entry(root, relative_path):
+    path = os.path.join(root, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write("new\n")
+    #end
+    return ScanEntry(path.replace("\\", "/"), relative_path, 0, os.stat(path))
+#end
+
+def test_columns_match_the_scan(tmp_path):
+    root = make_tree(tmp_path)
+    store, entries = make_store(root)
+    assert len(store) == len(entries) == 4
+    for position, entry in enumerate(entries):
+        record = store[position]
+        assert record.absolute_path == entry.path
+        assert record.relative_path == entry.relative_path
+        assert record.name == os.path.basename(entry.path)
+        assert record.size == entry.stat.st_size
+        assert record.mtime_ns == entry.stat.st_mtime_ns
+        assert record["type"] == ("bin" if entry.path.endswith(".png") else "txt")
+    #end
+    assert len(store.directories) == 3 # Each directory prefix is stored once
+    assert store.count_type("txt") == 3 and store.count_type("bin") == 1
+#end
+
+def test_insert_and_pop_reuse_the_slots(tmp_path):
+    root = make_tree(tmp_path)
+    store, _ = make_store(root)
+    slot_count = len(store.names)
+    position, exists = store.find_position(root + "/src/main.py")
+    assert exists
+    assert store.pop(position) == "txt"
+    assert store.type_flags[store.free_slots[-1]] == TYPE_FREE
+    assert store.count_type("txt") == 2
+
+    entry = make_entry(root, "src/added.py")
+    position, exists = store.find_position(entry.path)
+    assert not exists
+    slot = store.insert(position, entry, "txt")
+    assert len(store.names) == slot_count # The freed slot was reused
+    assert store.record(slot).relative_path == "src/added.py"
+    assert store.get_encoding(slot) is None
+    assert store.count_type("txt") == 3
+#end
+
+def test_encoding_is_reset_when_the_file_changes(tmp_path):
+    root = make_tree(tmp_path)
+    store, _ = make_store(root)
+    slot = store.order[0]
+    store.set_encoding(slot, "utf-16")
+    assert store.record(slot).encoding == "utf-16"
+    stat = os.stat(store.absolute_path(slot))
+    assert not store.update_stat(slot, stat)
+    assert store.get_encoding(slot) == "utf-16"
+    os.utime(store.absolute_path(slot), ns=(0, 0))
+    assert store.update_stat(slot, os.stat(store.absolute_path(slot)))
+    assert store.get_encoding(slot) is None
+#end
+
+def test_max_path_length_is_maintained(tmp_path):
+    root = make_tree(tmp_path)
+    store, _ = make_store(root)
+    assert store.max_path_length(True, False) == len("src/lib/util.py")
+    slot = store.insert(store.find_position(root + "/src/lib/a_much_longer_name.py")[0],
+                        make_entry(root, "src/lib/a_much_longer_name.py"), "txt")
+    assert store.max_path_length(True, False) == len("src/lib/a_much_longer_name.py")
+    store.pop(list(store.order).index(slot))
+    assert store.max_path_length(True, False) == len("src/lib/util.py")
+    assert store.max_path_length(True, True) == len(root + "/src/lib/util.py")
+#end
+
+def test_views_keep_the_scan_order(tmp_path):
+    root = make_tree(tmp_path)
+    store, _ = make_store(root)
+    all_paths = [store.relative_path(slot) for slot in store.view(True)]
+    assert all_paths == ["docs/readme.md", "src/lib/util.py", "src/logo.png", "src/main.py"]
+    assert [store.relative_path(slot) for slot in store.view(False)] == ["docs/readme.md", "src/lib/util.py", "src/main.py"]
+
+    # Inserted files take their place in the scan order of both views, or of the full view only for a binary file
+    for relative_path, file_type in (("src/a.txt", "txt"), ("src/lib/z.bin", "bin"), ("zz.txt", "txt")):
+        entry = make_entry(root, relative_path)
+        store.insert(store.find_position(entry.path)[0], entry, file_type)
+    #end
+    assert [store.relative_path(slot) for slot in store.view(True)] == [
+        "docs/readme.md", "src/a.txt", "src/lib/util.py", "src/lib/z.bin", "src/logo.png", "src/main.py", "zz.txt"]
+    assert [store.relative_path(slot) for slot in store.view(False)] == [
+        "docs/readme.md", "src/a.txt", "src/lib/util.py", "src/main.py", "zz.txt"]
+#end
+
+def test_find_position(tmp_path):
+    root = make_tree(tmp_path)
+    store, _ = make_store(root)
+    text_view = store.view(False)
+    for position, slot in enumerate(text_view):
+        assert text_view.find_position(store.absolute_path(slot)) == (position, True)
+    #end
+    assert text_view.find_position(root + "/src/logo.png") == (2, False) # Not in the text view
+    assert store.find_position(root + "/src/logo.png") == (2, True)
+    assert store.find_position(root + "/a.txt") == (0, False)
+    assert store.find_position(root + "/src/lib/zz.py") == (2, False)
+    assert store.find_position(root + "/zz.txt") == (4, False)
+#end
@@ -0,0 +1,52 @@
+"""
+Tests of the directory walk and of the binary/text classification of the sniffed file headers.
+"""
+
+import os
+import time
+
+import pytest
+
+import FileScanner
+from FileScanner import classify_sample
+
+@pytest.mark.parametrize("encoding", ['utf-8-sig', 'utf-16-le', 'utf-16-be', 'utf-32-le', 'utf-32-be'])
+def test_text_with_a_byte_order_mark_is_text(encoding):
+    text = "text with a byte order mark\n"
+    bom = "\ufeff" if encoding != 'utf-8-sig' else ""
+    assert classify_sample((bom + text).encode(encoding)) == "txt"
+#end
+
+def test_binary_samples():
+    assert classify_sample(b"\x7fELF\x02\x01\x01") == "bin"
+    assert classify_sample(b"data\x00more data") == "bin"
+    assert classify_sample(b"plain text\n") == "txt"
+#end
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="symbolic links are not supported")
+def test_first_link_in_scan_order_is_followed(tmp_path, monkeypatch):
+    (tmp_path / "target").mkdir()
+    (tmp_path / "target" / "file.txt").write_text("text\n")
+    (tmp_path / "t" / "a").mkdir(parents=True)
+    (tmp_path / "t" / "b").mkdir()
+    try:
+        os.symlink(str(tmp_path / "target"), str(tmp_path / "t" / "a" / "link1"), target_is_directory=True)
+        os.symlink(str(tmp_path / "target"), str(tmp_path / "t" / "b" / "link2"), target_is_directory=True)
+    except OSError:
+        pytest.skip("symbolic links cannot be created")
+    #end
+
+    # The listing of t/a finishes last, so the walk reaches link2 first
+    list_directory = FileScanner.list_directory
+    def slow_list_directory(path, *args):
+        if path.endswith("/a"):
+            time.sleep(0.2)
+        #end
+        return list_directory(path, *args)
+    #end
+    monkeypatch.setattr(FileScanner, "list_directory", slow_list_directory)
+
+    root = str(tmp_path / "t").replace("\\", "/")
+    paths = [entry.relative_path for entry in FileScanner.scan_paths([root], max_workers=4)]
+    assert paths == ["a/link1/file.txt"]
+#end
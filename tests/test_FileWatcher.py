@@ -0,0 +1,59 @@
+"""
+Tests of the polling watcher, driven by hand, and of the delta coalescing.
+"""
+
+import os
+
+from FileScanner import scan_paths
+from FileWatcher import PollingWatcher, coalesce_deltas, DELTA_ADD, DELTA_REMOVE, DELTA_MODIFY
+
+def write_file(path, text):
+    with open(path, 'w') as file:
+        file.write(text)
+    #end
+#end
+
+def make_watcher(root):
+    return PollingWatcher([root], True, scan_paths([root], True))
+#end
+
+def test_polling_watcher_reports_nothing_without_changes(tmp_path):
+    root = str(tmp_path)
+    write_file(os.path.join(root, "a.txt"), "a")
+    watcher = make_watcher(root)
+    assert watcher.poll() == []
+#end
+
+def test_polling_watcher_reports_add_modify_remove(tmp_path):
+    root = str(tmp_path)
+    a, b, c = (os.path.join(root, name) for name in ("a.txt", "b.txt", "c.txt"))
+    write_file(a, "a")
+    write_file(b, "b")
+    watcher = make_watcher(root)
+
+    write_file(a, "a changed")
+    os.remove(b)
+    write_file(c, "c")
+    deltas = watcher.poll()
+    assert sorted(deltas) == sorted([(DELTA_MODIFY, a.replace(os.sep, '/')), (DELTA_REMOVE, b.replace(os.sep, '/')),
+                                     (DELTA_ADD, c.replace(os.sep, '/'))])
+    assert watcher.poll() == [] # Reported once
+#end
+
+def test_polling_watcher_reports_files_of_new_directories(tmp_path):
+    root = str(tmp_path)
+    watcher = make_watcher(root)
+    os.makedirs(os.path.join(root, "sub", "deep"))
+    path = os.path.join(root, "sub", "deep", "d.txt")
+    write_file(path, "d")
+    assert watcher.poll() == [(DELTA_ADD, path.replace(os.sep, '/'))]
+#end
+
+def test_coalesce_deltas():
+    deltas = [(DELTA_ADD, "a"), (DELTA_MODIFY, "a"),
+              (DELTA_ADD, "b"), (DELTA_REMOVE, "b"),
+              (DELTA_REMOVE, "c"), (DELTA_ADD, "c"),
+              (DELTA_MODIFY, "d"), (DELTA_REMOVE, "d"),
+              (DELTA_MODIFY, "e"), (DELTA_MODIFY, "e")]
+    assert coalesce_deltas(deltas) == [(DELTA_ADD, "a"), (DELTA_MODIFY, "c"), (DELTA_REMOVE, "d"), (DELTA_MODIFY, "e")]
+#end
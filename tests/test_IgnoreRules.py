@@ -0,0 +1,56 @@
+"""
+Tests of the ignore rules: the .gitignore patterns and the rules of the parent directories of a root.
+"""
+
+import os
+
+import pytest
+
+from FileScanner import scan_paths
+from IgnoreRules import IgnoreRules
+
+def make_repository(root):
+    (root / ".git").mkdir()
+    (root / ".gitignore").write_text("*.log\n/sub/out/\n!keep.log\n")
+    for path in ("sub/out/a.txt", "sub/src/main.py", "sub/src/debug.log", "sub/src/keep.log", "out/a.txt"):
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text("text\n")
+    #end
+#end
+
+def scan(root):
+    return [entry.relative_path for entry in scan_paths([root], rules=IgnoreRules())]
+#end
+
+def test_patterns():
+    rules = IgnoreRules(exclude_patterns=["*.tmp", "cache/", "!important.tmp", "/top.txt"], use_defaults=False,
+                        use_gitignore=False)
+    chain = rules.root_chain("src")
+    assert rules.is_excluded(chain, "a.tmp", "src/deep/a.tmp", False)
+    assert not rules.is_excluded(chain, "important.tmp", "src/important.tmp", False)
+    assert rules.is_excluded(chain, "cache", "src/deep/cache", True)
+    assert not rules.is_excluded(chain, "cache", "src/deep/cache", False) # Directories only
+    assert rules.is_excluded(chain, "top.txt", "src/top.txt", False)
+    assert not rules.is_excluded(chain, "top.txt", "src/deep/top.txt", False) # Anchored at the root
+#end
+
+@pytest.mark.parametrize("root, cwd", [("sub", ""), ("./sub", ""), (".", "sub"), ("./", "sub"), ("src/..", "sub"),
+                                       ("..", "sub/src"), ("../../sub", "sub/src")])
+def test_gitignore_of_the_repository_applies_below_it(tmp_path, monkeypatch, root, cwd):
+    make_repository(tmp_path)
+    monkeypatch.chdir(str(tmp_path / cwd))
+    assert scan(root) == ["src/keep.log", "src/main.py"]
+#end
+
+def test_gitignore_of_the_repository_applies_to_an_absolute_root(tmp_path):
+    make_repository(tmp_path)
+    assert scan(str(tmp_path / "sub").replace("\\", "/")) == ["src/keep.log", "src/main.py"]
+#end
+
+def test_outside_a_repository_only_the_own_gitignore_applies(tmp_path, monkeypatch):
+    make_repository(tmp_path)
+    os.rmdir(str(tmp_path / ".git"))
+    (tmp_path / "sub" / ".gitignore").write_text("main.py\n")
+    monkeypatch.chdir(str(tmp_path / "sub"))
+    assert scan(".") == [".gitignore", "out/a.txt", "src/debug.log", "src/keep.log"]
+#end
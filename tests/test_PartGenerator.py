@@ -0,0 +1,101 @@
+"""
+Tests of the part generation shared by the tool, the export and the library API.
+"""
+
+import pytest
+
+from PartGenerator import (PartSettings, PARTS_FILES, PARTS_UNIFIED, scan_files, find_duplicate_files,
+                           get_deduplication_summary, iter_file_parts, iter_unified_parts, check_export_limit)
+
+def make_tree(root, same="same content\n" * 200):
+    contents = {"a/one.txt": same, "b/two.txt": same, "c/three.txt": same, "a/other.txt": same.upper(),
+                "a/empty.txt": "", "b/empty.txt": "", "unique.txt": "unique\n"}
+    for path, content in contents.items():
+        (root / "tree" / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / "tree" / path).write_text(content)
+    #end
+    for path in ("a/data.bin", "b/data.bin"):
+        (root / "tree" / path).write_bytes(b"\x00\x01\x02binary")
+    #end
+    store, _ = scan_files([str(root / "tree").replace("\\", "/")], scan_index=False)
+    return store
+#end
+
+def get_paths(store, duplicates):
+    return {store.relative_path(slot): store.relative_path(first) for slot, first in duplicates.items()}
+#end
+
+def test_duplicates_refer_to_the_first_file_in_stream_order(tmp_path):
+    store = make_tree(tmp_path)
+    duplicates = find_duplicate_files(store, list(store.view()))
+    # Same size but other content, empty files and binary files are not duplicates
+    assert get_paths(store, duplicates) == {"b/two.txt": "a/one.txt", "c/three.txt": "a/one.txt"}
+
+    # The first file is the first of the files given
+    slots = [slot for slot in store.view() if not store.relative_path(slot).startswith("a/")]
+    assert get_paths(store, find_duplicate_files(store, slots)) == {"c/three.txt": "b/two.txt"}
+#end
+
+def test_changed_file_is_hashed_again(tmp_path):
+    store = make_tree(tmp_path)
+    assert len(find_duplicate_files(store, list(store.view()))) == 2
+    (tmp_path / "tree" / "b" / "two.txt").write_text("same CONTENT\n" * 200)
+    store, _ = scan_files([str(tmp_path / "tree").replace("\\", "/")], scan_index=False)
+    assert get_paths(store, find_duplicate_files(store, list(store.view()))) == {"c/three.txt": "a/one.txt"}
+#end
+
+def test_deduplication_summary(tmp_path):
+    store = make_tree(tmp_path)
+    duplicates = find_duplicate_files(store, list(store.view()))
+    CTL = PartSettings(limit=1000)
+    summary = get_deduplication_summary(duplicates, store, 2500, 10000, CTL)
+    assert summary["duplicates"] == 2
+    assert summary["saved_bytes"] == 2 * 200 * len("same content\n")
+    assert summary["saved_characters"] == 2500
+    assert summary["saved_parts"] == 2 # 2500 characters at about 900 per part, the headers and footers taken out
+    assert get_deduplication_summary(duplicates, store, 2500, 10000, PartSettings(limit=10))["saved_parts"] == 0 # No room
+#end
+
+def test_saved_characters_of_the_unified_stream(tmp_path):
+    store = make_tree(tmp_path)
+    summary = {}
+    deduplicated = "".join(part.text for part in iter_unified_parts(store, PartSettings(limit=100000), [], summary))
+    full = "".join(part.text for part in iter_unified_parts(store, PartSettings(limit=100000, deduplicate=False), []))
+    assert summary["duplicates"] == 2
+    assert summary["saved_characters"] == len(full) - len(deduplicated)
+    assert summary["saved_parts"] == 0
+    assert "duplicate file" in deduplicated and "duplicate file" not in full
+
+    # A reference longer than the small file it stands for saves no part
+    summary = {}
+    list(iter_unified_parts(make_tree(tmp_path / "small", "x\n"), PartSettings(limit=1000), [], summary))
+    assert summary["saved_characters"] < 0
+    assert summary["saved_parts"] == 0
+#end
+
+@pytest.mark.parametrize("states", [(False, False), (False, True), (True, True)])
+def test_part_states_of_the_tool_are_kept(tmp_path, states):
+    store = make_tree(tmp_path)
+    CTL = PartSettings(limit=600)
+    CTL.Partition.state, CTL.Continuous.state = states
+    get_states = lambda: (CTL.Partition.state, CTL.Continuous.state)
+
+    for parts, stream in ((iter_file_parts(store, CTL, []), "File"), (iter_unified_parts(store, CTL, []), "Text Stream")):
+        for part in parts:
+            assert part.text.startswith(stream + ":") and f"Part {part.part_n}/{part.tot_parts}" in part.text
+            assert get_states() == states # Between the parts as well
+        #end
+    #end
+    parts = iter_file_parts(store, CTL, [])
+    next(parts)
+    parts.close()
+    assert get_states() == states
+
+    check_export_limit(store, [PARTS_FILES, PARTS_UNIFIED], CTL)
+    assert get_states() == states
+    CTL.Limit.state = 10
+    with pytest.raises(ValueError):
+        check_export_limit(store, [PARTS_FILES, PARTS_UNIFIED], CTL)
+    #end
+    assert get_states() == states
+#end
@@ -0,0 +1,53 @@
+"""
+Tests of the part-offset index: its parts are the parts split_text_starts makes of the decoded text.
+"""
+
+import os
+import random
+
+import pytest
+
+import PartIndex
+from PartIndex import FilePartIndex
+from TextDecoding import read_decoded_text
+from TextPartition import split_text_starts
+
+def make_text(rng, size):
+    return "".join(rng.choice(["word ", "é ", "\n", "\r\n", "\r", "x" * 20]) for _ in range(size))
+#end
+
+@pytest.mark.parametrize("encoding", ["utf-8", "latin-1", "utf-16"])
+@pytest.mark.parametrize("chunk_size", [7, 1 << 20])
+def test_parts_match_the_decoded_text(tmp_path, monkeypatch, encoding, chunk_size):
+    monkeypatch.setattr(PartIndex, "scanChunkSize", chunk_size)
+    rng = random.Random(11)
+    for n in range(20):
+        path = str(tmp_path / f"{n}.txt")
+        content = make_text(rng, rng.randint(0, 60))
+        if n % 4 == 0:
+            content += "\r" # A lone '\r' ending the file
+        #end
+        with open(path, 'wb') as file:
+            file.write(content.encode(encoding))
+        #end
+        text, _ = read_decoded_text(path, encoding)
+        index = FilePartIndex(path, os.stat(path), encoding)
+        for limit in (1, 5, 30):
+            starts = index.part_starts(limit)
+            assert list(starts) == list(split_text_starts(text, limit))
+            parts = [index.read_part(starts, part_n) for part_n in range(1, len(starts))]
+            assert "".join(parts) == text + "\n"
+        #end
+    #end
+#end
+
+def test_lone_carriage_returns_are_line_breaks(tmp_path):
+    path = str(tmp_path / "mac.txt")
+    with open(path, 'wb') as file:
+        file.write(b"one\rtwo\r\nthree\nfour")
+    #end
+    index = FilePartIndex(path, os.stat(path))
+    starts = index.part_starts(6)
+    assert list(starts) == [0, 4, 8, 14, 19]
+    assert [index.read_part(starts, part_n) for part_n in range(1, len(starts))] == ["one\n", "two\n", "three\n", "four\n"]
+#end
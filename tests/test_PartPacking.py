@@ -0,0 +1,90 @@
+"""
+Tests of the packing of the unified stream blocks into parts.
+"""
+
+import random
+
+import pytest
+
+from PartPacking import (make_pack_items, pack_in_order, pack_first_fit_decreasing, pack_parts, get_packed_part,
+                         PACK_IN_ORDER, PACK_FIRST_FIT_DECREASING)
+
+def make_items(sizes):
+    items = []
+    start = 0
+    for n, size in enumerate(sizes):
+        items.append((f"file{n}", start, start + size))
+        start += size
+    #end
+    return items
+#end
+
+def check_parts(parts, items, text_limit):
+    assert sorted(item for part in parts for item in part) == sorted(items) # Every item exactly once
+    for part in parts:
+        assert part
+        assert sum(stop - start for _, start, stop in part) <= text_limit or len(part) == 1
+        assert part == sorted(part, key=lambda item: item[1]) # In stream order within the part
+    #end
+#end
+
+@pytest.mark.parametrize("pack", [pack_in_order, pack_first_fit_decreasing])
+def test_empty_input(pack):
+    assert pack([], 100) == []
+#end
+
+@pytest.mark.parametrize("pack", [pack_in_order, pack_first_fit_decreasing])
+def test_random_items_fit(pack):
+    rng = random.Random(20)
+    for _ in range(50):
+        items = make_items([rng.randint(1, 100) for _ in range(rng.randint(1, 40))])
+        check_parts(pack(items, 100), items, 100)
+    #end
+#end
+
+def test_in_order_looks_ahead_for_items_that_fit():
+    items = make_items([60, 50, 30, 70])
+    assert pack_in_order(items, 100) == [[items[0], items[2]], [items[1]], [items[3]]]
+    assert pack_in_order(items, 100, lookahead=0) == [[items[0]], [items[1], items[2]], [items[3]]]
+#end
+
+def test_first_fit_decreasing_takes_the_fewest_parts():
+    items = make_items([60, 50, 40, 30, 20])
+    parts = pack_first_fit_decreasing(items, 100)
+    assert parts == [[items[0], items[2]], [items[1], items[3], items[4]]]
+    assert len(pack_in_order(items, 100, lookahead=0)) == 3
+#end
+
+@pytest.mark.parametrize("pack", [pack_in_order, pack_first_fit_decreasing])
+def test_item_larger_than_the_limit_takes_a_part_of_its_own(pack):
+    items = make_items([30, 250, 40, 100, 20])
+    parts = pack(items, 100)
+    check_parts(parts, items, 100)
+    assert [items[1]] in parts
+    assert len(parts) == 3
+#end
+
+@pytest.mark.parametrize("mode", [PACK_IN_ORDER, PACK_FIRST_FIT_DECREASING])
+def test_pack_parts_fit_the_absolute_limit(mode):
+    rng = random.Random(21)
+    text = ""
+    blocks = []
+    for n in range(30):
+        block = "".join(f"line {i} of file {n}\n" for i in range(rng.choice([1, 3, 40])))
+        blocks.append((f"file{n}", len(text), len(text) + len(block)))
+        text += block
+    #end
+    overhead = lambda p: 30 + 2 * len(str(p))
+    parts = pack_parts(text, blocks, 400, overhead, mode)
+    for part in parts:
+        assert len(get_packed_part(text, part)) + overhead(len(parts)) <= 400
+    #end
+    ranges = sorted((start, stop) for part in parts for _, start, stop in part)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(text)
+    assert all(previous[1] == following[0] for previous, following in zip(ranges, ranges[1:])) # The whole stream
+
+    # Only the blocks larger than a part are split, at line boundaries
+    items = make_pack_items(text, blocks, 300)
+    assert all(stop - start <= 300 for _, start, stop in items)
+    assert all(text[stop - 1] == "\n" for _, _, stop in items)
+#end
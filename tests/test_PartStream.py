@@ -0,0 +1,89 @@
+"""
+Tests of the PartStream library API.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import PartStream
+from PartStream import iter_parts, take_snapshot, PARTS_FILES, PARTS_UNIFIED, PARTS_DELTA, HEADERS_SIMPLE
+
+def make_tree(root):
+    (root / "src").mkdir()
+    (root / "src" / "a.py").write_text("".join(f"line {i} of a\n" for i in range(300)), encoding="utf-8")
+    (root / "src" / "b.txt").write_text("short file\n", encoding="utf-8")
+    (root / "src" / "data.bin").write_bytes(bytes(range(256)) * 4)
+    return str(root / "src")
+#end
+
+@pytest.mark.parametrize("mode", [PARTS_FILES, PARTS_UNIFIED, PARTS_DELTA])
+@pytest.mark.parametrize("limit", [300, 2000])
+def test_parts_fit_the_limit(tmp_path, mode, limit):
+    source = make_tree(tmp_path)
+    parts = list(iter_parts([source], limit=limit, mode=mode))
+    assert parts
+    assert max(len(part.text) for part in parts) <= limit
+    for part in parts:
+        assert 1 <= part.part_n <= part.tot_parts
+    #end
+    covered = {path for part in parts for path, _, _ in part.files}
+    assert any(path.endswith("a.py") for path in covered)
+    assert any(path.endswith("b.txt") for path in covered)
+#end
+
+def test_file_parts_cover_the_content(tmp_path):
+    source = make_tree(tmp_path)
+    parts = [part for part in iter_parts([source], limit=400, mode=PARTS_FILES, header_style=HEADERS_SIMPLE)
+             if part.source.endswith("a.py")]
+    assert [part.part_n for part in parts] == list(range(1, parts[0].tot_parts + 1))
+    assert parts[0].start == 0
+    for previous, part in zip(parts, parts[1:]):
+        assert previous.stop == part.start
+    #end
+    assert parts[-1].stop == len((tmp_path / "src" / "a.py").read_text(encoding="utf-8"))
+#end
+
+def test_delta_since_a_snapshot(tmp_path):
+    source = make_tree(tmp_path)
+    snapshot_path = str(tmp_path / "snapshot.json")
+    take_snapshot([source], snapshot_path)
+    (tmp_path / "src" / "b.txt").write_text("modified file, longer than before\n", encoding="utf-8")
+    parts = list(iter_parts([source], limit=2000, mode=PARTS_DELTA, since=snapshot_path))
+    covered = {path for part in parts for path, _, _ in part.files}
+    assert any(path.endswith("b.txt") for path in covered)
+    assert not any(path.endswith("a.py") for path in covered)
+#end
+
+def test_missing_path(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        list(iter_parts([str(tmp_path / "missing")]))
+    #end
+#end
+
+def test_missing_since_snapshot(tmp_path):
+    source = make_tree(tmp_path)
+    with pytest.raises(FileNotFoundError):
+        list(iter_parts([source], mode=PARTS_DELTA, since=str(tmp_path / "missing.json")))
+    #end
+#end
+
+def test_scan_index_is_off_by_default(tmp_path, monkeypatch):
+    source = make_tree(tmp_path)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "cache"))
+    assert list(iter_parts([source]))
+    assert not os.path.exists(str(tmp_path / "cache"))
+
+    index_directory = str(tmp_path / "index")
+    assert list(iter_parts([source], scan_index=True, index_directory=index_directory))
+    assert os.listdir(index_directory)
+    assert not os.path.exists(str(tmp_path / "cache"))
+#end
+
+def test_does_not_import_the_tool():
+    code = "import sys, PartStream; sys.exit('main' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(PartStream.__file__)).returncode == 0
+#end
@@ -0,0 +1,92 @@
+"""
+Tests of the persistent scan index and of the scans it serves.
+"""
+
+import os
+
+import pytest
+
+import PartGenerator
+from IgnoreRules import IgnoreRules
+from PartGenerator import scan_files
+
+def make_tree(root):
+    for directory in ("src", "src/lib", "docs"):
+        os.makedirs(os.path.join(str(root), "tree", directory))
+    #end
+    for path, content in (("src/main.py", "print(1)\n"), ("src/lib/util.py", "x = 1\n"), ("docs/readme.md", "# Doc\n")):
+        with open(os.path.join(str(root), "tree", path), 'w') as file:
+            file.write(content)
+        #end
+    #end
+    return str(root / "tree").replace("\\", "/")
+#end
+
+def scan(root, tmp_path, rules=None):
+    store, _ = scan_files([root], True, rules, True, str(tmp_path / "index"))
+    return [(store.relative_path(slot), store.file_type(slot), store.sizes[slot]) for slot in store.view()]
+#end
+
+def no_walk(*args, **kwargs):
+    raise AssertionError("the tree was walked")
+#end
+
+def test_unchanged_tree_is_served_from_the_index(tmp_path, monkeypatch):
+    root = make_tree(tmp_path)
+    walked = scan(root, tmp_path)
+    assert [path for path, _, _ in walked] == ["docs/readme.md", "src/lib/util.py", "src/main.py"]
+    monkeypatch.setattr(PartGenerator, "scan_paths", no_walk)
+    assert scan(root, tmp_path) == walked
+#end
+
+def test_new_file_walks_the_tree_again(tmp_path, monkeypatch):
+    root = make_tree(tmp_path)
+    scan(root, tmp_path)
+    with open(os.path.join(root, "src", "lib", "new.py"), 'w') as file:
+        file.write("y = 2\n")
+    #end
+    os.utime(os.path.join(root, "src", "lib"), ns=(0, 0)) # The directory changed, whatever the mtime granularity
+    assert "src/lib/new.py" in [path for path, _, _ in scan(root, tmp_path)]
+
+    # The listing of the new walk is kept
+    monkeypatch.setattr(PartGenerator, "scan_paths", no_walk)
+    assert "src/lib/new.py" in [path for path, _, _ in scan(root, tmp_path)]
+#end
+
+def test_file_changed_in_place_is_classified_again(tmp_path, monkeypatch):
+    root = make_tree(tmp_path)
+    data_path = os.path.join(root, "src", "data") # Classified by its content, not by its extension
+    with open(data_path, 'w') as file:
+        file.write("plain text\n")
+    #end
+    assert ("src/data", "txt", 11) in scan(root, tmp_path)
+    monkeypatch.setattr(PartGenerator, "scan_paths", no_walk)
+    with open(data_path, 'wb') as file:
+        file.write(b"\x00\x01binary now")
+    #end
+    os.utime(data_path, ns=(0, 0)) # Changed, whatever the mtime granularity
+    assert ("src/data", "bin", 12) in scan(root, tmp_path)
+    assert ("src/data", "bin", 12) in scan(root, tmp_path) # Written back to the index
+#end
+
+def test_rules_changes_walk_the_tree_again(tmp_path, monkeypatch):
+    root = make_tree(tmp_path)
+    scan(root, tmp_path, IgnoreRules())
+    scan(root, tmp_path, IgnoreRules(exclude_patterns=["docs/"]))
+
+    with open(os.path.join(root, ".gitignore"), 'w') as file:
+        file.write("lib/\n")
+    #end
+    assert [path for path, _, _ in scan(root, tmp_path, IgnoreRules())] == [".gitignore", "docs/readme.md", "src/main.py"]
+    monkeypatch.setattr(PartGenerator, "scan_paths", no_walk)
+    with pytest.raises(AssertionError):
+        scan(root, tmp_path, IgnoreRules(exclude_patterns=["docs/"])) # Made with other rules
+    #end
+#end
+
+def test_removed_file_walks_the_tree_again(tmp_path):
+    root = make_tree(tmp_path)
+    scan(root, tmp_path)
+    os.remove(os.path.join(root, "docs", "readme.md"))
+    assert [path for path, _, _ in scan(root, tmp_path)] == ["src/lib/util.py", "src/main.py"]
+#end
@@ -0,0 +1,93 @@
+"""
+Tests of the partition engine: the part limits, including the boundaries where the header and footer leave little
+or no room for the text, and the agreement of the streaming partitioner with split_text_starts.
+"""
+
+import random
+
+import pytest
+
+from TextPartition import (compute_part_text_limit, fit_parts, split_text_starts, get_text_part, get_line_ends,
+                           SegmentPartitioner, iter_chunked_parts)
+
+overhead = lambda p: 40 + 2 * len(str(p)) # A header and footer of typical length
+
+def make_text(rng, size):
+    return "".join(rng.choice(["word ", "longer words ", "\n", "x" * 30]) for _ in range(size // 5))
+#end
+
+def get_parts(text, absolute_limit):
+    _, starts = fit_parts(len(text), absolute_limit, overhead, lambda text_limit: split_text_starts(text, text_limit))
+    return [get_text_part(text, starts, part_n) for part_n in range(1, len(starts))]
+#end
+
+def test_compute_part_text_limit():
+    assert compute_part_text_limit(100, 1000, overhead) == (1000 - 42, 9)
+    assert compute_part_text_limit(100000, 1000, overhead) == (1000 - 46, 999)
+    assert compute_part_text_limit(100000, 1000, overhead, min_parts=1000) == (1000 - 48, 9999)
+#end
+
+def test_limit_of_the_overhead_is_refused():
+    with pytest.raises(ValueError):
+        compute_part_text_limit(10, 42, overhead)
+    #end
+    with pytest.raises(ValueError):
+        compute_part_text_limit(10, 0, overhead)
+    #end
+    with pytest.raises(ValueError):
+        fit_parts(10, -5, overhead, lambda text_limit: split_text_starts("x" * 10, text_limit))
+    #end
+#end
+
+def test_overhead_growing_past_the_limit_is_refused():
+    # One character of text per part fits with one digit part numbers, the 100 parts take two digits
+    assert compute_part_text_limit(5, 43, overhead) == (1, 9)
+    with pytest.raises(ValueError):
+        compute_part_text_limit(100, 43, overhead)
+    #end
+#end
+
+def test_smallest_limit():
+    text = "ab\ncd"
+    parts = get_parts(text, 43)
+    assert parts == list(text + "\n")
+#end
+
+@pytest.mark.parametrize("absolute_limit", [60, 100, 1000, 4096])
+def test_parts_fit_the_limit(absolute_limit):
+    rng = random.Random(absolute_limit)
+    text = make_text(rng, 20000)
+    parts = get_parts(text, absolute_limit)
+    assert "".join(parts) == text + "\n"
+    assert all(len(part) + overhead(len(parts)) <= absolute_limit for part in parts)
+#end
+
+def test_lines_are_kept_whole():
+    text = "aaaa\nbbbb\ncccc"
+    starts = split_text_starts(text, 7)
+    assert [get_text_part(text, starts, part_n) for part_n in range(1, len(starts))] == ["aaaa\n", "bbbb\n", "cccc\n"]
+#end
+
+def test_long_lines_are_hard_split():
+    text = "x" * 25
+    starts = split_text_starts(text, 10)
+    assert list(starts) == [0, 10, 20, 26]
+#end
+
+def test_segment_partitioner_matches_split_text_starts():
+    rng = random.Random(0)
+    for _ in range(50):
+        segments = [make_text(rng, rng.randint(0, 400)) for _ in range(rng.randint(1, 10))]
+        text = "".join(segments)
+        text_limit = rng.randint(1, 120)
+        partitioner = SegmentPartitioner(text_limit)
+        for segment in segments:
+            partitioner.add(len(segment), get_line_ends(segment))
+        #end
+        starts = partitioner.finish()
+        assert list(starts) == list(split_text_starts(text, text_limit))
+
+        chunks = [text[i:i + 37] for i in range(0, len(text), 37)]
+        assert list(iter_chunked_parts(chunks, starts)) == [get_text_part(text, starts, part_n) for part_n in range(1, len(starts))]
+    #end
+#end
@@ -0,0 +1,177 @@
+"""
+Tests of the text parts as the tool copies them to the clipboard.
+"""
+
+import os
+import random
+
+import pytest
+
+import main
+from ChunkedText import ChunkedText
+
+@pytest.fixture(autouse=True)
+def scan_index_directory(tmp_path, monkeypatch):
+    # The scan indexes of the tests are written next to their files, not to the user cache directory
+    monkeypatch.setattr(main, "scanIndexDirectory", str(tmp_path / "index"))
+#end
+
+def make_control(limit, simple_headers):
+    CTL = main.ControlStructure()
+    CTL.Partition.state = True
+    CTL.Limit.state = limit
+    CTL.SimpleHeaderFooter.state = simple_headers
+    CTL.Verbose.state = False
+    return CTL
+#end
+
+@pytest.mark.parametrize("simple_headers", [False, True])
+@pytest.mark.parametrize("limit", [150, 1000, 4096])
+def test_copied_parts_fit_the_limit(limit, simple_headers, capsys):
+    rng = random.Random(limit)
+    text = "".join(rng.choice(["word ", "a longer line\n", "\n", "y" * 70]) for _ in range(3000))
+    CTL = make_control(limit, simple_headers)
+    CTL.currentFile_CurrentPart = 1
+    copied = []
+    while True:
+        CTL.buff = ChunkedText()
+        main.partitionTextPrint(text, "folder/file.txt", limit, CTL)
+        if not len(CTL.buff):
+            break
+        #end
+        copied.append(str(CTL.buff))
+        CTL.currentFile_CurrentPart += 1
+    #end
+    assert len(copied) == CTL.currentFile_TotalParts > 1
+    assert max(map(len, copied)) <= limit
+#end
+
+def test_limit_of_the_header_is_refused(capsys):
+    CTL = make_control(60, False)
+    CTL.currentFile_CurrentPart = 1
+    main.partitionTextPrint("some text\n" * 100, "folder/file.txt", 60, CTL)
+    assert not len(CTL.buff)
+    assert "[ERROR]" in capsys.readouterr().out
+#end
+
+def test_unified_stream_follows_files_edited_on_disk(tmp_path, capsys):
+    for name in ("a.txt", "b.txt"):
+        with open(os.path.join(str(tmp_path), name), 'w') as file:
+            file.write(f"original {name}\n")
+        #end
+    #end
+    main.persistent_unified_stream_cache.clear()
+    CTL = make_control(4096, False)
+    CTL.Partition.state = False
+    CTL.Continuous.state = True
+    file_structures = main.process_input([main.sanitizePath(str(tmp_path))], CTL)
+
+    def get_stream():
+        CTL.buff = ChunkedText()
+        main.process_unified_continuous_mode(CTL, file_structures)
+        return str(CTL.buff)
+    #end
+
+    assert "original a.txt" in get_stream()
+    with open(os.path.join(str(tmp_path), "a.txt"), 'a') as file:
+        file.write("edited\n")
+    #end
+    CTL.SimpleHeaderFooter.nextState() # A new stream, from the kept bodies
+    assert "original a.txt\nedited\n" in get_stream()
+    assert "1 text file(s) read, 1 reused" in capsys.readouterr().out
+    CTL.SimpleHeaderFooter.nextState() # Back to the stream built before the edit
+    assert "original a.txt\nedited\n" in get_stream()
+#end
+
+def test_unified_parts_of_a_cached_stream_do_not_stat_the_files(tmp_path, monkeypatch, capsys):
+    with open(os.path.join(str(tmp_path), "a.txt"), 'w') as file:
+        file.write("line of a\n" * 1000)
+    #end
+    main.persistent_unified_stream_cache.clear()
+    CTL = make_control(1000, False)
+    CTL.Continuous.state = True
+    file_structures = main.process_input([main.sanitizePath(str(tmp_path))], CTL)
+    CTL.buff = ChunkedText()
+    main.process_unified_continuous_mode(CTL, file_structures) # Builds the stream
+
+    stats = []
+    monkeypatch.setattr(main, "refresh_file_stats", lambda *args: stats.append(args) or 0)
+    for part in (1, 2, 3):
+        CTL.currentFile_CurrentPart = part
+        CTL.buff = ChunkedText()
+        main.process_unified_continuous_mode(CTL, file_structures)
+        assert len(CTL.buff)
+    #end
+    assert not stats
+    CTL.SimpleHeaderFooter.nextState() # A new stream is built, the files are checked
+    main.process_unified_continuous_mode(CTL, file_structures)
+    assert len(stats) == 1
+#end
+
+def test_unified_stream_larger_than_the_cache_budget_is_kept(tmp_path, capsys):
+    for i in range(7):
+        with open(os.path.join(str(tmp_path), f"file{i}.txt"), 'w') as file:
+            file.write(f"line of file {i}\n" * 700)
+        #end
+    #end
+    main.persistent_unified_stream_cache.clear()
+    budget = main.persistent_unified_stream_cache.max_bytes
+    main.persistent_unified_stream_cache.max_bytes = 50_000
+    try:
+        CTL = make_control(4096, False)
+        CTL.Continuous.state = True
+        file_structures = main.process_input([main.sanitizePath(str(tmp_path))], CTL)
+        CTL.buff = ChunkedText()
+        main.process_unified_continuous_mode(CTL, file_structures) # Builds the stream
+        assert len(CTL.buff) > main.persistent_unified_stream_cache.max_bytes
+        capsys.readouterr()
+        for part in (1, 2, 3):
+            CTL.currentFile_CurrentPart = part
+            CTL.buff = ChunkedText()
+            main.process_unified_continuous_mode(CTL, file_structures) # The parts of the kept stream
+            assert "text file(s) read" not in capsys.readouterr().out
+            assert 0 < len(CTL.buff) <= 4096
+        #end
+        assert CTL.currentFile_TotalParts > 3
+    finally:
+        main.persistent_unified_stream_cache.max_bytes = budget
+        main.persistent_unified_stream_cache.clear()
+    #end
+#end
+
+def test_export_refuses_a_limit_below_the_header_before_writing(tmp_path, capsys):
+    source = os.path.join(str(tmp_path), "source")
+    os.makedirs(source)
+    with open(os.path.join(source, "a.txt"), 'w') as file:
+        file.write("line\n" * 100)
+    #end
+    directory = os.path.join(str(tmp_path), "export")
+    CTL = make_control(60, False)
+    with pytest.raises(ValueError):
+        main.export_parts([main.sanitizePath(source)], directory, [main.PARTS_FILES, main.PARTS_UNIFIED], CTL)
+    #end
+    assert not os.path.exists(directory)
+
+    CTL = make_control(200, False)
+    main.export_parts([main.sanitizePath(source)], directory, [main.PARTS_FILES, main.PARTS_UNIFIED], CTL)
+    assert os.path.isfile(os.path.join(directory, "manifest.json"))
+#end
+
+def test_export_refuses_a_missing_since_snapshot(tmp_path, capsys):
+    source = os.path.join(str(tmp_path), "source")
+    os.makedirs(source)
+    with open(os.path.join(source, "a.txt"), 'w') as file:
+        file.write("line\n" * 100)
+    #end
+    directory = os.path.join(str(tmp_path), "export")
+    CTL = make_control(200, False)
+    with pytest.raises(FileNotFoundError):
+        main.export_parts([main.sanitizePath(source)], directory, [main.PARTS_DELTA], CTL,
+                          os.path.join(str(tmp_path), "missing.json"))
+    #end
+    assert not os.path.exists(directory)
+
+    # The snapshot of the previous export may be missing, the first delta adds all the files
+    main.export_parts([main.sanitizePath(source)], directory, [main.PARTS_DELTA], CTL)
+    assert os.path.isfile(os.path.join(directory, "snapshot.json"))
+#end